@@ -4,11 +4,11 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from typing import Dict, Any
+from typing import Dict, Any, List
 from jose import jwt
 from ..database.connection import get_db
 from ..models.user import User
-from ..schemas.user import Token, UserLogin, TokenValidateRequest, TokenValidateResponse
+from ..schemas.user import Token, UserLogin, TokenValidateRequest, TokenValidateResponse, TokenBatchValidateRequest
 from ..services.password import verify_password
 from ..services.jwt import create_access_token, create_refresh_token, refresh_tokens, blacklist_token, decode_token
 from ..services.rate_limiter import rate_limit
@@ -226,4 +226,32 @@ async def validate_token(
             is_valid=False,
             user_id=None,
             username=None
-        ) 
+        )
+
+
+@router.post("/validate/batch", response_model=List[TokenValidateResponse])
+async def validate_tokens_batch(token_data: TokenBatchValidateRequest) -> List[TokenValidateResponse]:
+    """
+    Пакетная валидация JWT токенов
+    
+    Используется сервисами, которые объединяют одновременные проверки
+    токенов в один запрос
+    
+    Args:
+        token_data: Список токенов для проверки
+        
+    Returns:
+        Результаты проверки в порядке токенов запроса
+    """
+    results = []
+    for token in token_data.tokens:
+        try:
+            payload = decode_token(token)
+            results.append(TokenValidateResponse(
+                is_valid=True,
+                user_id=int(payload.get("sub", 0)),
+                username=payload.get("username")
+            ))
+        except Exception:
+            results.append(TokenValidateResponse(is_valid=False, user_id=None, username=None))
+    return results
@@ -101,4 +101,8 @@ class TokenValidateResponse(BaseModel):
                 "user_id": 1,
                 "username": "testuser"
             }
-        } 
\ No newline at end of file
+        }
+
+class TokenBatchValidateRequest(BaseModel):
+    """Схема для пакетного запроса валидации токенов"""
+    tokens: List[str] = Field(..., min_length=1, max_length=100)
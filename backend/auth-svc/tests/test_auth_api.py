@@ -206,6 +206,72 @@ class TestAuthAPI:
         assert data["user_id"] is None
         assert data["username"] is None
     
+    def test_validate_tokens_batch(self, client):
+        """
+        Тест пакетной валидации токенов (валидные и невалидные токены)
+        """
+        def fake_decode(token):
+            if token == "invalid.token.string":
+                raise ValueError("Invalid token")
+            user_id = token.split("-")[-1]
+            return {"sub": user_id, "username": f"user{user_id}"}
+        
+        # Данные для запроса: результаты должны вернуться в порядке токенов
+        validate_data = {
+            "tokens": ["token-2", "invalid.token.string", "token-1"]
+        }
+        
+        # Отправляем запрос на пакетную валидацию токенов
+        with patch('src.routes.auth.decode_token', side_effect=fake_decode):
+            response = client.post("/validate/batch", json=validate_data)
+        
+        # Проверяем ответ
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert len(data) == 3
+        assert [item["is_valid"] for item in data] == [True, False, True]
+        assert [item["user_id"] for item in data] == [2, None, 1]
+        assert [item["username"] for item in data] == ["user2", None, "user1"]
+    
+    def test_validate_tokens_batch_empty(self, client):
+        """
+        Тест пакетной валидации с пустым списком токенов
+        """
+        response = client.post("/validate/batch", json={"tokens": []})
+        
+        # Проверяем ответ
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    
+    def test_validate_tokens_batch_too_many(self, client):
+        """
+        Тест пакетной валидации с превышением лимита в 100 токенов
+        """
+        validate_data = {
+            "tokens": [f"token-{i}" for i in range(101)]
+        }
+        
+        response = client.post("/validate/batch", json=validate_data)
+        
+        # Проверяем ответ
+        assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    
+    def test_validate_tokens_batch_limit(self, client):
+        """
+        Тест пакетной валидации ровно 100 токенов (верхняя граница)
+        """
+        validate_data = {
+            "tokens": [f"token-{i}" for i in range(100)]
+        }
+        
+        with patch('src.routes.auth.decode_token', side_effect=ValueError("Invalid token")):
+            response = client.post("/validate/batch", json=validate_data)
+        
+        # Проверяем ответ
+        assert response.status_code == status.HTTP_200_OK
+        data = response.json()
+        assert len(data) == 100
+        assert all(item["is_valid"] is False for item in data)
+    
     def test_health_check(self, client):
         """
         Тест проверки состояния сервиса
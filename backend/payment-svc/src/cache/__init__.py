@@ -0,0 +1,3 @@
+from .token_cache import TokenCache, get_token_cache
+
+__all__ = ["TokenCache", "get_token_cache"]
@@ -0,0 +1,160 @@
+"""
+Кэш данных пользователя по токену доступа
+"""
+
+import base64
+import hashlib
+import logging
+import time
+from typing import Any, Dict, Optional
+
+import orjson
+from cachetools import TTLCache
+from redis.exceptions import RedisError
+
+from ..config.settings import get_settings
+from ..database.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+
+def _token_hash(token: str) -> str:
+    """SHA-256 токена: сам токен в ключах кэша не хранится"""
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def token_expires_at(token: str) -> Optional[int]:
+    """
+    Время истечения JWT (claim exp) без проверки подписи
+
+    Используется только для ограничения времени жизни записей кэшей:
+    сам токен по-прежнему проверяется auth-сервисом.
+    """
+    try:
+        payload = token.split(".")[1]
+        claims = orjson.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        return int(claims["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+class TokenCache:
+    """
+    Cache-aside кэш данных пользователя, полученных из auth-сервиса по токену
+
+    Ключ - auth:user:{sha256(token)}. Время жизни записи не превышает
+    TOKEN_CACHE_MAX_TTL и оставшегося срока действия токена. Хранилище
+    выбирается настройкой TOKEN_CACHE_TYPE: redis (общий для всех процессов)
+    или memory (TTLCache в памяти процесса). Для инвалидации при изменении
+    пользователя хэши его токенов хранятся в индексе auth:user:idx:{user_id}.
+    """
+
+    def __init__(self, cache_type: str, max_ttl: int):
+        """
+        Инициализация кэша
+
+        Args:
+            cache_type: Тип хранилища (redis, memory)
+            max_ttl: Максимальное время жизни записи в секундах
+        """
+        self.cache_type = cache_type
+        self.max_ttl = max_ttl
+        self._local: Optional[TTLCache] = TTLCache(maxsize=10_000, ttl=max_ttl) if cache_type == "memory" else None
+
+    def _ttl(self, token: str) -> int:
+        """Время жизни записи для токена (0 - токен уже истек)"""
+        expires_at = token_expires_at(token)
+        if expires_at is None:
+            return self.max_ttl
+        return max(min(expires_at - int(time.time()), self.max_ttl), 0)
+
+    async def get(self, token: str) -> Optional[Dict[str, Any]]:
+        """
+        Получить данные пользователя по токену
+
+        Args:
+            token: Токен доступа
+
+        Returns:
+            Данные пользователя или None при промахе
+        """
+        token_hash = _token_hash(token)
+        if self._local is not None:
+            return self._local.get(token_hash)
+
+        try:
+            cached = await get_redis().get(f"auth:user:{token_hash}")
+        except RedisError as e:
+            logger.warning(f"Не удалось прочитать данные пользователя из кэша: {str(e)}")
+            return None
+        return orjson.loads(cached) if cached is not None else None
+
+    async def set(self, token: str, user_data: Dict[str, Any]) -> None:
+        """
+        Сохранить данные пользователя для токена
+
+        Args:
+            token: Токен доступа
+            user_data: Данные пользователя (должны содержать id)
+        """
+        ttl = self._ttl(token)
+        if not ttl:
+            return
+
+        token_hash = _token_hash(token)
+        if self._local is not None:
+            self._local[token_hash] = user_data
+            return
+
+        index_key = f"auth:user:idx:{user_data['id']}"
+        try:
+            async with get_redis().pipeline(transaction=False) as pipe:
+                pipe.set(f"auth:user:{token_hash}", orjson.dumps(user_data), ex=ttl)
+                pipe.sadd(index_key, token_hash)
+                pipe.expire(index_key, self.max_ttl)
+                await pipe.execute()
+        except RedisError as e:
+            logger.warning(f"Не удалось сохранить данные пользователя в кэш: {str(e)}")
+
+    async def invalidate_user(self, user_id: int) -> None:
+        """
+        Удалить из кэша данные пользователя для всех его токенов
+
+        Args:
+            user_id: ID пользователя
+        """
+        if self._local is not None:
+            for token_hash, user_data in list(self._local.items()):
+                if user_data.get("id") == user_id:
+                    self._local.pop(token_hash, None)
+            return
+
+        index_key = f"auth:user:idx:{user_id}"
+        try:
+            redis_client = get_redis()
+            token_hashes = await redis_client.smembers(index_key)
+            keys = [f"auth:user:{token_hash.decode()}" for token_hash in token_hashes]
+            await redis_client.delete(index_key, *keys)
+        except RedisError as e:
+            logger.warning(f"Не удалось очистить кэш данных пользователя {user_id}: {str(e)}")
+
+
+# Экземпляр кэша (создается при первом обращении)
+_token_cache: Optional[TokenCache] = None
+
+
+def get_token_cache() -> TokenCache:
+    """
+    Получение кэша данных пользователя по токену
+
+    Returns:
+        Экземпляр TokenCache
+    """
+    global _token_cache
+
+    if _token_cache is None:
+        _token_cache = TokenCache(settings.TOKEN_CACHE_TYPE, settings.TOKEN_CACHE_MAX_TTL)
+
+    return _token_cache
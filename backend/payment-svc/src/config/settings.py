@@ -24,6 +24,17 @@ class Settings(BaseSettings):
     REDIS_HOST: str = "redis"
     REDIS_PORT: int = 6379
     REDIS_PASSWORD: Optional[str] = None
+    REDIS_MAX_CONNECTIONS: int = 50
+    
+    # Идемпотентность
+    IDEMPOTENCY_TTL_SECONDS: int = 86400  # 24 часа
+    
+    # Кэш данных пользователя по токену (redis или memory)
+    TOKEN_CACHE_TYPE: str = "redis"
+    TOKEN_CACHE_MAX_TTL: int = 300
+    
+    # Время жизни кэша деталей транзакции (секунды, ограничивается диапазоном 5-60)
+    TX_DETAIL_TTL: int = 30
     
     # Общие настройки
     API_V1_PREFIX: str = "/api/v1"
@@ -39,10 +50,27 @@ class Settings(BaseSettings):
     # Настройки Escrow
     DEFAULT_ESCROW_PERIOD_DAYS: int = 3
     FEE_PERCENTAGE: float = 5.0  # 5% комиссия с транзакций
+    
+    # Очередь webhook-уведомлений Stripe (Redis Stream)
+    STRIPE_WEBHOOK_STREAM: str = "stripe:webhooks"
+    STRIPE_WEBHOOK_STREAM_MAXLEN: int = 100_000
+    # Поток для событий, которые не удалось обработать за STRIPE_WEBHOOK_MAX_DELIVERIES попыток
+    STRIPE_WEBHOOK_DEAD_LETTER_STREAM: str = "stripe:webhooks:dead"
+    STRIPE_WEBHOOK_MAX_DELIVERIES: int = 5
+    # Через сколько мс неподтвержденное событие забирается на повторную обработку
+    STRIPE_WEBHOOK_RECLAIM_IDLE_MS: int = 60_000
+    # Секрет подписи webhook-уведомлений (без него подпись не проверяется - моковый режим)
+    STRIPE_WEBHOOK_SECRET: Optional[str] = None
+    STRIPE_WEBHOOK_TOLERANCE: int = 300
 
     # Настройки для межсервисного взаимодействия
     AUTH_SERVICE_URL: str = "http://auth-svc:8000"
     MARKETPLACE_SERVICE_URL: str = "http://marketplace-svc:8001"
+    HTTP_MAX_CONNECTIONS: int = 1000
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 100
+    # Сети доверенных обратных прокси через запятую (CIDR): только от них
+    # принимается X-Forwarded-For при определении IP-адреса клиента
+    TRUSTED_PROXY_NETWORKS: str = "127.0.0.1/32"
     
     class Config:
         env_file = ".env"
@@ -1,3 +1,3 @@
-from .connection import Base, get_db, engine
+from .connection import Base, get_db, engine, get_async_db, async_engine
 
-__all__ = ["Base", "get_db", "engine"] 
\ No newline at end of file
+__all__ = ["Base", "get_db", "engine", "get_async_db", "async_engine"]
\ No newline at end of file
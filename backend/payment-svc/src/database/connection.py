@@ -1,9 +1,16 @@
-from sqlalchemy import create_engine
+import asyncio
+import itertools
+import logging
+from contextvars import ContextVar
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import sessionmaker, scoped_session
 import os
 from sqlalchemy.orm import Session
-from typing import Generator
+from typing import Generator, AsyncGenerator, Optional
+
+logger = logging.getLogger(__name__)
 
 # Получение переменных окружения
 POSTGRES_USER = os.getenv("POSTGRES_USER", "gametrade")
@@ -14,12 +21,49 @@ POSTGRES_PORT = os.getenv("POSTGRES_PORT", "5432")
 
 # Формирование строки подключения к PostgreSQL
 SQLALCHEMY_DATABASE_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+ASYNC_SQLALCHEMY_DATABASE_URL = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+
+# Параметры пула асинхронного движка
+ASYNC_DB_POOL_SIZE = int(os.getenv("ASYNC_DB_POOL_SIZE", "20"))
+ASYNC_DB_MAX_OVERFLOW = int(os.getenv("ASYNC_DB_MAX_OVERFLOW", "10"))
+
+# Размер кэша скомпилированных SQL-выражений движка
+DB_QUERY_CACHE_SIZE = int(os.getenv("DB_QUERY_CACHE_SIZE", "1200"))
+
+# Параметры пула синхронного движка
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
 
 # Создание движка SQLAlchemy
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+engine = create_engine(
+    SQLALCHEMY_DATABASE_URL,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_pre_ping=True,
+    query_cache_size=DB_QUERY_CACHE_SIZE,
+)
 
 # Создание фабрики сессий
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Область сессии - текущий HTTP-запрос (задается DBSessionMiddleware).
+# Контекстная переменная, а не поток: асинхронные эндпоинты разных запросов
+# выполняются в одном потоке event loop
+_session_scope: ContextVar[Optional[int]] = ContextVar("db_session_scope", default=None)
+_scope_ids = itertools.count(1)
+
+# Сессия, общая для всех обращений к БД в пределах одного запроса
+SessionLocal = scoped_session(session_factory, scopefunc=_session_scope.get)
+
+# Асинхронный движок и фабрика сессий (asyncpg) для эндпоинтов, не блокирующих event loop
+async_engine = create_async_engine(
+    ASYNC_SQLALCHEMY_DATABASE_URL,
+    pool_size=ASYNC_DB_POOL_SIZE,
+    max_overflow=ASYNC_DB_MAX_OVERFLOW,
+    pool_pre_ping=True,
+    query_cache_size=DB_QUERY_CACHE_SIZE,
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 # Базовый класс для моделей
 Base = declarative_base()
@@ -27,13 +71,81 @@ Base = declarative_base()
 def get_db() -> Generator[Session, None, None]:
     """
     Функция-зависимость для внедрения сессии БД в эндпоинты FastAPI.
-    Создаёт новую сессию для каждого запроса и закрывает её после выполнения запроса.
+    Внутри HTTP-запроса возвращает сессию запроса и освобождает ее после выполнения;
+    вне запроса (обработчики очередей, фоновые задачи) создает отдельную сессию.
     
     Yields:
         Session: Сессия SQLAlchemy для работы с базой данных
     """
-    db = SessionLocal()
+    if _session_scope.get() is None:
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+        return
+    
     try:
+        yield SessionLocal()
+    finally:
+        SessionLocal.remove()
+
+
+class DBSessionMiddleware:
+    """
+    ASGI-middleware, задающее область сессии БД для каждого HTTP-запроса
+    
+    После отправки ответа сессия запроса освобождается, даже если она была
+    получена напрямую через SessionLocal(), а не через get_db.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = _session_scope.set(next(_scope_ids))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            SessionLocal.remove()
+            _session_scope.reset(token)
+
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Функция-зависимость для внедрения асинхронной сессии БД в эндпоинты FastAPI.
+    Запросы через эту сессию не блокируют event loop.
+    
+    Yields:
+        AsyncSession: Асинхронная сессия SQLAlchemy
+    """
+    async with AsyncSessionLocal() as db:
         yield db
+
+
+async def warm_async_pool(size: int = ASYNC_DB_POOL_SIZE) -> None:
+    """
+    Предварительное открытие соединений асинхронного пула.
+    Соединения открываются одновременно, чтобы пул заполнился целиком,
+    а первые запросы пользователей не тратили время на установку соединения.
+    
+    Args:
+        size: Количество соединений для открытия
+    """
+    async def _touch(conn) -> None:
+        await conn.execute(text("SELECT 1"))
+
+    connections = []
+    try:
+        for _ in range(size):
+            connections.append(await async_engine.connect())
+        await asyncio.gather(*(_touch(conn) for conn in connections))
+        logger.info(f"Пул соединений с БД прогрет: {len(connections)} соединений")
+    except Exception as e:
+        logger.warning(f"Не удалось прогреть пул соединений с БД: {str(e)}")
     finally:
-        db.close() 
\ No newline at end of file
+        for conn in connections:
+            await conn.close()
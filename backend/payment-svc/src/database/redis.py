@@ -0,0 +1,50 @@
+"""
+Подключение к Redis
+"""
+
+import logging
+from typing import Optional
+
+import redis.asyncio as redis
+
+from ..config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# Клиент Redis (создается при первом обращении)
+_redis_client: Optional[redis.Redis] = None
+
+
+def get_redis() -> redis.Redis:
+    """
+    Получение асинхронного клиента Redis
+
+    Клиент использует общий пул соединений и создается один раз на процесс.
+
+    Returns:
+        Клиент Redis
+    """
+    global _redis_client
+
+    if _redis_client is None:
+        pool = redis.ConnectionPool(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            password=settings.REDIS_PASSWORD,
+            max_connections=settings.REDIS_MAX_CONNECTIONS,
+        )
+        _redis_client = redis.Redis(connection_pool=pool)
+
+    return _redis_client
+
+
+async def close_redis() -> None:
+    """Закрытие соединений с Redis"""
+    global _redis_client
+
+    if _redis_client is not None:
+        await _redis_client.aclose()
+        _redis_client = None
+        logger.info("Соединение с Redis закрыто")
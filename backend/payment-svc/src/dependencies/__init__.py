@@ -2,4 +2,4 @@
 Зависимости для проекта payment-svc
 """
 
-from .auth import get_current_user, get_current_active_user, get_current_admin_user, get_current_seller_user, User 
\ No newline at end of file
+from .auth import get_current_user, get_full_user_data, load_full_user_data, get_current_user_and_token, get_current_active_user, get_current_admin_user, get_current_seller_user, User 
\ No newline at end of file
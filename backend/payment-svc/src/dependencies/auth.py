@@ -3,17 +3,18 @@
 """
 
 import time
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from fastapi import Depends, HTTPException, status, Header, Request
 from sqlalchemy.orm import Session
-from ..services.auth_service import AuthService, UserInfo
+from ..services.auth_service import AuthService, UserInfo, UserResponse
+from ..cache.token_cache import get_token_cache
 from fastapi.security import OAuth2PasswordBearer
 from ..database.connection import get_db
 import httpx
 import logging
 import os
 import json
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 
 logger = logging.getLogger(__name__)
 
@@ -31,8 +32,7 @@ class User(BaseModel):
     is_admin: bool = False
     is_seller: bool = False
     
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 
 async def get_current_user(request: Request) -> UserInfo:
@@ -58,13 +58,49 @@ async def get_token(request: Request) -> str:
         )
     return token.split(" ")[1]
 
-async def get_current_active_user(request: Request) -> User:
-    """Проверка, что пользователь активен и преобразование UserInfo в User"""
-    user_info = await get_current_user(request)
+async def load_full_user_data(user_info: UserInfo) -> UserResponse:
+    """Полные данные пользователя для уже проверенного токена (cache-aside)"""
+    token_cache = get_token_cache()
+    cached = await token_cache.get(user_info.token)
+    if cached is not None:
+        # Кэш заполняется только результатом model_dump этой же схемы,
+        # поэтому повторная валидация не нужна
+        return UserResponse.model_construct(**cached)
+    
     user_data = await AuthService.get_user_data(user_info.token)
-    # Преобразование UserInfo в User
+    if not user_data:
+        raise HTTPException(status_code=401, detail="Не удалось получить данные пользователя")
+    await token_cache.set(user_info.token, user_data.model_dump())
+    return user_data
+
+async def get_full_user_data(user_info: UserInfo = Depends(get_current_user)) -> UserResponse:
+    """
+    Получает полные данные пользователя из кэша, а при промахе - из auth-svc
+    
+    Все зависимости с данными пользователя строятся на этой функции, поэтому
+    в пределах запроса FastAPI вызывает ее один раз.
+    """
+    return await load_full_user_data(user_info)
+
+async def get_current_user_and_token(
+    user_info: UserInfo = Depends(get_current_user),
+    user_data: UserResponse = Depends(get_full_user_data)
+) -> Tuple[User, str]:
+    """
+    Получение текущего пользователя и его токена за одну проверку авторизации
+    
+    Returns:
+        Кортеж (пользователь, токен доступа)
+    """
+    # Преобразование UserResponse в User
     user = User(**user_data.model_dump())
-    return user
+    return user, user_info.token
+
+async def get_current_active_user(
+    user_and_token: Tuple[User, str] = Depends(get_current_user_and_token)
+) -> User:
+    """Проверка, что пользователь активен и преобразование UserInfo в User"""
+    return user_and_token[0]
 
 async def get_current_admin_user(current_user: User = Depends(get_current_active_user)) -> User:
     """Проверка, что текущий пользователь имеет права администратора"""
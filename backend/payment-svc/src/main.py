@@ -1,5 +1,7 @@
 from fastapi import FastAPI, Depends, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from fastapi.openapi.utils import get_openapi
 import logging
 from contextlib import asynccontextmanager
 from sqlalchemy.orm import Session
@@ -7,14 +9,17 @@ import os
 from sqlalchemy import text
 
 # Импорт внутренних модулей
-from .database.connection import engine, Base, get_db
+from .database.connection import engine, async_engine, Base, get_db, warm_async_pool, DBSessionMiddleware
+from .database.redis import close_redis
+from .services.http_client import get_http_client, close_http_client
 from .services.rabbitmq_service import get_rabbitmq_service, RabbitMQService
 from .services.message_handler import setup_rabbitmq_consumers
-from .services.event_rabbit_bridge import setup_event_rabbit_bridge
+from .services.event_rabbit_bridge import setup_event_rabbit_bridge, close_event_rabbit_bridge
 from .services.transaction_timeout_service import setup_transaction_timeout_service
-from .services.idempotency_cleanup_service import setup_idempotency_cleanup_service
+from .services.stripe_webhook_queue import setup_stripe_webhook_consumer, get_stripe_webhook_consumer
 from .services.user_consumer_service import UserConsumerService
 from .config.settings import get_settings
+from .schemas._examples import apply_schema_examples
 from .routers import (
     transaction_router, transaction_history_router, 
     statistics_router, sales_router, wallets_router, 
@@ -37,11 +42,17 @@ async def lifespan(app: FastAPI):
     # Создаем таблицы в БД (в продакшене используйте миграции Alembic)
     Base.metadata.create_all(bind=engine)
     
+    # Открываем соединения асинхронного пула заранее
+    await warm_async_pool()
+    
+    # Создаем общий HTTP-клиент для запросов к другим сервисам
+    get_http_client()
+    
     # Инициализируем сервисы
     await setup_event_rabbit_bridge()
     await setup_rabbitmq_consumers()
     await setup_transaction_timeout_service()
-    await setup_idempotency_cleanup_service()
+    await setup_stripe_webhook_consumer()
     
     # Настраиваем потребителей событий пользователя
     try:
@@ -58,8 +69,13 @@ async def lifespan(app: FastAPI):
     logger.info("Shutting down payment service...")
     
     # Закрываем соединения
+    await get_stripe_webhook_consumer().stop()
+    await close_event_rabbit_bridge()
     rabbitmq_service = get_rabbitmq_service()
     await rabbitmq_service.close()
+    await close_redis()
+    await close_http_client()
+    await async_engine.dispose()
     
     logger.info("Payment service shut down successfully")
 
@@ -94,6 +110,7 @@ app = FastAPI(
     * Поддерживаемые валюты: USD, EUR, RUB
     """,
     version="1.0.0",
+    default_response_class=ORJSONResponse,
     
     openapi_tags=[
         {
@@ -141,6 +158,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Сессия БД на время HTTP-запроса
+app.add_middleware(DBSessionMiddleware)
+
 # Подключение маршрутизаторов
 app.include_router(transaction_history_router)
 app.include_router(transaction_router)
@@ -149,6 +169,22 @@ app.include_router(sales_router)
 app.include_router(wallets_router)
 app.include_router(currency_router)
 
+def custom_openapi():
+    """Схема OpenAPI с примерами базовых схем (строится один раз)"""
+    if app.openapi_schema:
+        return app.openapi_schema
+    app.openapi_schema = apply_schema_examples(get_openapi(
+        title=app.title,
+        version=app.version,
+        description=app.description,
+        routes=app.routes,
+        tags=app.openapi_tags,
+        servers=app.servers
+    ))
+    return app.openapi_schema
+
+app.openapi = custom_openapi
+
 @app.get("/")
 async def root():
     return {"message": "Payment Service API"}
@@ -0,0 +1,27 @@
+"""Add transaction history report indexes
+
+Revision ID: b3e8d2f4a6c1
+Revises: 7a62e69415e0
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3e8d2f4a6c1'
+down_revision = '7a62e69415e0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('idx_transaction_history_status_timestamp', 'transaction_history',
+                    ['new_status', 'timestamp'], unique=False)
+    op.create_index('idx_transaction_history_transaction_timestamp', 'transaction_history',
+                    ['transaction_id', 'timestamp'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('idx_transaction_history_transaction_timestamp', table_name='transaction_history')
+    op.drop_index('idx_transaction_history_status_timestamp', table_name='transaction_history')
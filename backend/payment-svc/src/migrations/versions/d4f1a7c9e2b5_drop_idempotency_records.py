@@ -0,0 +1,36 @@
+"""Drop idempotency_records table
+
+Revision ID: d4f1a7c9e2b5
+Revises: b3e8d2f4a6c1
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4f1a7c9e2b5'
+down_revision = 'b3e8d2f4a6c1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Ключи идемпотентности хранятся в Redis, таблица больше не используется
+    op.drop_index(op.f('ix_idempotency_records_operation_type'), table_name='idempotency_records')
+    op.drop_index(op.f('ix_idempotency_records_key'), table_name='idempotency_records')
+    op.drop_table('idempotency_records')
+
+
+def downgrade() -> None:
+    op.create_table('idempotency_records',
+    sa.Column('key', sa.String(length=255), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('expires_at', sa.DateTime(), nullable=False),
+    sa.Column('operation_type', sa.String(length=100), nullable=False),
+    sa.Column('response_data', sa.Text(), nullable=True),
+    sa.PrimaryKeyConstraint('key')
+    )
+    op.create_index(op.f('ix_idempotency_records_key'), 'idempotency_records', ['key'], unique=False)
+    op.create_index(op.f('ix_idempotency_records_operation_type'), 'idempotency_records', ['operation_type'], unique=False)
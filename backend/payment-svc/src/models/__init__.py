@@ -3,12 +3,10 @@ from .wallet import Wallet, WalletTransaction, Currency, WalletStatus
 from .transaction_history import TransactionHistory
 from .core import Sale, SaleStatus
 from .statistics import SellerStatistics, BuyerStatistics, ProductStatistics
-from ..services.idempotency_service import IdempotencyRecord
 
 __all__ = [
     "Transaction", "TransactionStatus", "TransactionType",
     "Wallet", "WalletTransaction", "Currency", "WalletStatus",
     "TransactionHistory", "Sale", "SaleStatus",
-    "IdempotencyRecord", 
     "SellerStatistics", "BuyerStatistics", "ProductStatistics"
 ] 
\ No newline at end of file
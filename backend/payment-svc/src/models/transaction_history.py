@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Enum, JSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Enum, JSON, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from ..database.connection import Base
@@ -30,6 +30,12 @@ class TransactionHistory(Base):
     # Связи
     transaction = relationship("Transaction", backref="history")
     
+    # Индексы для отчетов и таймлайнов (фильтр + сортировка по времени)
+    __table_args__ = (
+        Index('idx_transaction_history_status_timestamp', 'new_status', 'timestamp'),
+        Index('idx_transaction_history_transaction_timestamp', 'transaction_id', 'timestamp'),
+    )
+    
     def __repr__(self):
         return f"<TransactionHistory(id={self.id}, transaction_id={self.transaction_id}, " \
                f"{self.previous_status} -> {self.new_status}, timestamp={self.timestamp})>" 
\ No newline at end of file
@@ -11,8 +11,7 @@ from pydantic import BaseModel
 from ..database.connection import get_db
 from ..dependencies.auth import get_current_user, get_current_active_user
 from ..models.core import User, Sale
-from ..schemas.base import PaginationParams, SuccessResponse
-from ..schemas.marketplace import PendingSaleResponse, PendingSaleListResponse
+from ..schemas.base import PaginationParams, SuccessEnvelope, success
 from ..services.sale_payment_service import SalePaymentService
 
 router = APIRouter(
@@ -35,7 +34,7 @@ class FundsReleaseRequest(BaseModel):
     wallet_id: int
     withdrawal_details: Optional[Dict[str, Any]] = None
 
-@router.post("/{sale_id}/initiate-payment", response_model=SuccessResponse[Dict[str, Any]])
+@router.post("/{sale_id}/initiate-payment", response_model=None, responses={200: {"model": SuccessEnvelope}})
 async def initiate_payment(
     sale_id: int = Path(..., description="ID продажи"),
     wallet_id: int = Query(..., description="ID кошелька покупателя"),
@@ -54,8 +53,8 @@ async def initiate_payment(
             wallet_id=wallet_id
         )
         
-        return SuccessResponse(
-            data=result,
+        return success(
+            result,
             meta={"message": "Платеж успешно инициирован"}
         )
     except ValueError as e:
@@ -69,7 +68,7 @@ async def initiate_payment(
             detail=f"Ошибка при инициировании платежа: {str(e)}"
         )
 
-@router.post("/{sale_id}/confirm", response_model=SuccessResponse[Dict[str, Any]])
+@router.post("/{sale_id}/confirm", response_model=None, responses={200: {"model": SuccessEnvelope}})
 async def confirm_payment(
     sale_id: int = Path(..., description="ID продажи"),
     transaction_id: int = Query(..., description="ID транзакции"),
@@ -88,8 +87,8 @@ async def confirm_payment(
             transaction_id=transaction_id
         )
         
-        return SuccessResponse(
-            data=result,
+        return success(
+            result,
             meta={"message": "Платеж успешно подтвержден"}
         )
     except ValueError as e:
@@ -103,7 +102,7 @@ async def confirm_payment(
             detail=f"Ошибка при подтверждении платежа: {str(e)}"
         )
 
-@router.post("/{sale_id}/reject", response_model=SuccessResponse[Dict[str, Any]])
+@router.post("/{sale_id}/reject", response_model=None, responses={200: {"model": SuccessEnvelope}})
 async def reject_payment(
     sale_id: int = Path(..., description="ID продажи"),
     transaction_id: int = Query(..., description="ID транзакции"),
@@ -124,8 +123,8 @@ async def reject_payment(
             reason=reason
         )
         
-        return SuccessResponse(
-            data=result,
+        return success(
+            result,
             meta={"message": f"Платеж отклонен: {reason}" if reason else "Платеж отклонен"}
         )
     except ValueError as e:
@@ -139,7 +138,7 @@ async def reject_payment(
             detail=f"Ошибка при отклонении платежа: {str(e)}"
         )
 
-@router.get("/pending", response_model=SuccessResponse[PendingSaleListResponse])
+@router.get("/pending", response_model=None, responses={200: {"model": SuccessEnvelope}})
 async def get_pending_sales(
     pagination: PaginationParams = Depends(),
     seller_id: Optional[int] = Query(None, description="ID продавца"),
@@ -168,9 +167,9 @@ async def get_pending_sales(
         page_size=pagination.limit
     )
     
-    return SuccessResponse(data=result)
+    return success(result)
 
-@router.get("/completed", response_model=SuccessResponse[PendingSaleListResponse])
+@router.get("/completed", response_model=None, responses={200: {"model": SuccessEnvelope}})
 async def get_completed_sales(
     pagination: PaginationParams = Depends(),
     seller_id: Optional[int] = Query(None, description="ID продавца"),
@@ -199,9 +198,9 @@ async def get_completed_sales(
         page_size=pagination.limit
     )
     
-    return SuccessResponse(data=result)
+    return success(result)
 
-@router.post("/{sale_id}/complete-delivery", response_model=SuccessResponse[Dict[str, Any]])
+@router.post("/{sale_id}/complete-delivery", response_model=None, responses={200: {"model": SuccessEnvelope}})
 async def complete_delivery(
     sale_id: int = Path(..., description="ID продажи"),
     transaction_id: int = Query(..., description="ID транзакции"),
@@ -227,8 +226,8 @@ async def complete_delivery(
             buyer_comment=request_data.comment
         )
         
-        return SuccessResponse(
-            data=result,
+        return success(
+            result,
             meta={"message": "Доставка успешно подтверждена. Открыт чат с продавцом."}
         )
     except ValueError as e:
@@ -242,7 +241,7 @@ async def complete_delivery(
             detail=f"Ошибка при подтверждении доставки: {str(e)}"
         )
 
-@router.post("/{sale_id}/release-funds", response_model=SuccessResponse[Dict[str, Any]])
+@router.post("/{sale_id}/release-funds", response_model=None, responses={200: {"model": SuccessEnvelope}})
 async def release_funds(
     sale_id: int = Path(..., description="ID продажи"),
     transaction_id: int = Query(..., description="ID транзакции"),
@@ -287,8 +286,8 @@ async def release_funds(
             withdrawal_details=request_data.withdrawal_details
         )
         
-        return SuccessResponse(
-            data=result,
+        return success(
+            result,
             meta={"message": "Средства успешно зачислены на баланс кошелька"}
         )
     except ValueError as e:
@@ -2,7 +2,7 @@
 Роутер для статистики по продажам и транзакциям
 """
 
-from typing import Optional, List, Dict, Any
+from typing import Optional, Dict, Any
 from fastapi import APIRouter, Depends, Query, HTTPException, status
 from sqlalchemy.orm import Session
 from datetime import datetime
@@ -11,8 +11,7 @@ from pydantic import BaseModel
 from ..dependencies.db import get_db
 from ..dependencies.auth import get_current_user, get_current_active_user
 from ..models.core import User
-from ..schemas.base import SuccessResponse
-from ..schemas.statistics import SellerStatisticsResponse, TransactionSummaryResponse, PopularGame
+from ..schemas.base import SuccessEnvelope, success
 from ..services.statistics_service import get_statistics_service
 
 router = APIRouter(
@@ -27,7 +26,7 @@ router = APIRouter(
 )
 
 
-@router.get("/seller", response_model=SuccessResponse[SellerStatisticsResponse])
+@router.get("/seller", response_model=None, responses={200: {"model": SuccessEnvelope}})
 async def get_seller_statistics(
     seller_id: Optional[int] = Query(None, description="ID продавца"),
     period: str = Query("month", description="Период статистики (week, month, quarter, year, all)"),
@@ -68,7 +67,7 @@ async def get_seller_statistics(
             end_date=end_date
         )
         
-        return SuccessResponse(data=result)
+        return success(result)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -76,7 +75,7 @@ async def get_seller_statistics(
         )
 
 
-@router.get("/transactions/summary", response_model=SuccessResponse[List[TransactionSummaryResponse]])
+@router.get("/transactions/summary", response_model=None, responses={200: {"model": SuccessEnvelope}})
 async def get_transaction_summary(
     seller_id: Optional[int] = Query(None, description="ID продавца"),
     group_by: str = Query("month", description="Параметр группировки (month, game, status, type)"),
@@ -125,7 +124,7 @@ async def get_transaction_summary(
             end_date=end_date
         )
         
-        return SuccessResponse(data=result)
+        return success(result)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -133,7 +132,7 @@ async def get_transaction_summary(
         )
 
 
-@router.get("/popular-games", response_model=SuccessResponse[List[PopularGame]])
+@router.get("/popular-games", response_model=None, responses={200: {"model": SuccessEnvelope}})
 async def get_popular_games(
     limit: int = Query(10, description="Количество игр в результатах", ge=1, le=100),
     period: str = Query("month", description="Период статистики (week, month, quarter, year, all)"),
@@ -162,8 +161,8 @@ async def get_popular_games(
             end_date=end_date
         )
         
-        return SuccessResponse(
-            data=result,
+        return success(
+            result,
             meta={
                 "period": period,
                 "limit": limit,
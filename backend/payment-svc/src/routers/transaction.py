@@ -2,28 +2,33 @@
 API маршруты для работы с транзакциями
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Path, Header, Request, Body
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Path, Header, Request, Response, Body
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import DateTime, Enum as SAEnum, Float
 from sqlalchemy.orm import Session
-from typing import List, Optional, Dict, Any
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional, Dict, Any, Tuple, Callable, Awaitable, Mapping
+import asyncio
 import logging
 from datetime import datetime, timezone
-import httpx
+import orjson
+from redis.exceptions import RedisError
 
-from ..schemas.transaction_history import TransactionHistoryResponse
-from ..services.transaction_history_service import TransactionHistoryService
-from ..database.connection import get_db
-from ..models.transaction import TransactionStatus, TransactionType
+from ..database.connection import get_db, get_async_db
+from ..database.redis import get_redis
+from ..models.transaction import Transaction, TransactionStatus
 from ..schemas.transaction import (
-    TransactionBase, TransactionCreate, TransactionUpdate, 
-    TransactionResponse, TransactionListResponse, TransactionStatusUpdate, TransactionDisputeCreate,
-    TransactionActionResponse, TransactionDetailsResponse
+    TransactionCreate, TransactionResponse, TransactionListResponse, TransactionStatusUpdate, TransactionDisputeCreate,
+    TransactionActionResponse, TransactionDetailsResponse, SellerView, BuyerView, TxAction
 )
-from ..services.transaction_service import get_transaction_service
-from ..services.transaction_state_service import get_transaction_state_service
-from ..services.idempotency_service import get_idempotency_service
-from ..services.sales_service import get_sales_service
-from ..dependencies.auth import User, get_current_active_user, AuthService, get_current_user
-from ..models.core import Sale, User
+from ..schemas.base import from_orm_fast, page_count
+from ..services.transaction_service import get_transaction_service, get_transaction_read_service
+from ..services.transaction_state_service import get_transaction_state_service, TransactionStateService
+from ..services.idempotency_service import idempotent
+from ..services.auth_service import get_users_by_ids, get_cached_user
+from ..services.marketplace_loader import listing_loader, sale_loader
+from ..services.transaction_cache import timeline_cache_key, details_cache_key
+from ..dependencies.auth import User, get_current_active_user, get_current_user_and_token
 from ..config import get_settings
 
 
@@ -32,6 +37,7 @@ settings = get_settings()
 router = APIRouter(
     prefix="/transactions",
     tags=["transactions"],
+    default_response_class=ORJSONResponse,
     responses={
         401: {"description": "Пользователь не авторизован"},
         403: {"description": "Нет прав доступа"},
@@ -44,29 +50,260 @@ router = APIRouter(
 
 logger = logging.getLogger(__name__)
 
-# Функция для получения информации о пользователе из auth-сервиса
-async def get_user_by_id(user_id: int) -> Dict[str, Any]:
+# Время жизни закэшированного объявления (секунды)
+LISTING_CACHE_TTL = 30
+
+
+async def get_listing_cached(listing_id: int, token: str) -> Optional[Dict[str, Any]]:
     """
-    Получает информацию о пользователе из auth-сервиса по его ID
+    Получает объявление из Redis, а при промахе - из marketplace-сервиса
+    
+    Конкурентные промахи по одному и тому же объявлению объединяются
+    загрузчиком в один запрос к marketplace-сервису. Ключ кэша не включает
+    токен: данные объявления одинаковы для всех авторизованных пользователей.
     """
+    cache_key = f"lst:{listing_id}"
     try:
-        auth_service_url = settings.AUTH_SERVICE_URL
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{auth_service_url}/users/{user_id}")
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                logging.error(f"Ошибка при получении пользователя с ID {user_id}: {response.status_code}")
-                return None
-    except Exception as e:
-        logging.error(f"Ошибка при запросе к auth-сервису: {str(e)}")
+        cached = await get_redis().get(cache_key)
+        if cached is not None:
+            return orjson.loads(cached)
+    except RedisError as e:
+        logger.warning(f"Не удалось прочитать объявление {listing_id} из кэша: {str(e)}")
+    
+    listing_data = await listing_loader.load(listing_id, token)
+    if listing_data is not None:
+        try:
+            await get_redis().set(cache_key, orjson.dumps(listing_data), ex=LISTING_CACHE_TTL)
+        except RedisError as e:
+            logger.warning(f"Не удалось сохранить объявление {listing_id} в кэш: {str(e)}")
+    return listing_data
+
+
+def _iso(value: Optional[datetime]) -> Optional[str]:
+    """Дата в формате ISO 8601 или None"""
+    return value.isoformat() if value else None
+
+
+# Поля транзакции в ответе /details (порядок ключей сохраняется)
+TRANSACTION_DETAIL_FIELDS = (
+    "id", "transaction_uid", "buyer_id", "seller_id", "listing_id", "item_id",
+    "amount", "currency", "fee_amount", "fee_percentage", "status", "type",
+    "created_at", "updated_at", "completed_at", "disputed_at", "refunded_at",
+    "canceled_at", "escrow_held_at", "description", "notes", "extra_data",
+    "dispute_reason", "refund_reason", "cancel_reason",
+)
+
+
+def _field_expression(column) -> str:
+    """Выражение преобразования значения колонки в JSON-совместимое значение"""
+    value = f"t.{column.key}"
+    if isinstance(column.type, SAEnum):
+        return f"{value}.value if {value} is not None else None"
+    if isinstance(column.type, DateTime):
+        return f"{value}.isoformat() if {value} else None"
+    if isinstance(column.type, Float):
+        return f"{value} if {value} is not None else 0.0"
+    return value
+
+
+def _compile_transaction_dict_builder(fields: Tuple[str, ...]) -> Callable[[Transaction], Dict[str, Any]]:
+    """
+    Генерирует функцию преобразования транзакции в словарь
+    
+    Тело функции собирается один раз при импорте по типам колонок модели
+    Transaction: в ней нет циклов и проверок типов, только один литерал словаря.
+    
+    Args:
+        fields: Имена колонок в порядке ключей словаря
+        
+    Returns:
+        Функция, принимающая транзакцию и возвращающая словарь
+    """
+    columns = Transaction.__table__.columns
+    items = ",\n        ".join(f"{name!r}: {_field_expression(columns[name])}" for name in fields)
+    source = f"def _build(t):\n    return {{\n        {items},\n    }}\n"
+    namespace: Dict[str, Any] = {}
+    exec(compile(source, "<transaction_dict_builder>", "exec"), namespace)
+    return namespace["_build"]
+
+
+_build_transaction_dict = _compile_transaction_dict_builder(TRANSACTION_DETAIL_FIELDS)
+
+
+def _participant_ids_to_fetch(transaction, user_role: str) -> List[int]:
+    """
+    ID участников сделки, которых нужно запросить в auth-сервисе
+    
+    Данные текущего пользователя уже известны из авторизации, поэтому
+    для покупателя и продавца запрашивается только другая сторона сделки.
+    """
+    if user_role == "buyer":
+        return [transaction.seller_id]
+    if user_role == "seller":
+        return [transaction.buyer_id]
+    return [transaction.seller_id, transaction.buyer_id]
+
+
+def _current_participant(current_user: User) -> Mapping[str, Any]:
+    """Данные текущего пользователя как участника сделки: полный профиль из кэша или данные авторизации"""
+    return get_cached_user(current_user.id) or current_user.model_dump(include={"id", "username", "email"})
+
+
+async def _none() -> None:
+    """Заглушка для asyncio.gather, когда запрос не требуется"""
+    return None
+
+
+# Заголовок Cache-Control для GET-эндпоинтов отдельной транзакции
+TRANSACTION_CACHE_CONTROL = "private, max-age=5, must-revalidate"
+
+
+def _transaction_etag(transaction) -> str:
+    """
+    Слабый ETag транзакции на основе времени ее последнего изменения
+    
+    Args:
+        transaction: Транзакция
+        
+    Returns:
+        Значение заголовка ETag
+    """
+    changed_at = transaction.updated_at or transaction.created_at
+    version = int(changed_at.timestamp() * 1_000_000) if changed_at else 0
+    return f'W/"{transaction.id}-{version}"'
+
+
+def _not_modified(request: Request, response: Response, transaction) -> Optional[Response]:
+    """
+    Проставляет заголовки кэширования и проверяет условный запрос
+    
+    Returns:
+        Ответ 304, если у клиента актуальная версия, иначе None
+    """
+    etag = _transaction_etag(transaction)
+    headers = {"ETag": etag, "Cache-Control": TRANSACTION_CACHE_CONTROL}
+    if request.headers.get("If-None-Match") == etag:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+# Время жизни закэшированного таймлайна транзакции (секунды)
+TIMELINE_CACHE_TTL = 300
+
+
+def _build_timeline(history) -> List[Dict[str, Any]]:
+    """
+    Преобразует записи истории транзакции в элементы таймлайна
+    
+    Args:
+        history: Записи истории, упорядоченные по времени
+        
+    Returns:
+        Список элементов таймлайна
+    """
+    timeline = []
+    for item in history:
+        # Определяем тип действия на основе изменения статуса
+        action = "status_change"
+        previous_status = item.previous_status
+        new_status = item.new_status
+        if previous_status is None and new_status == TransactionStatus.PENDING:
+            action = "create"
+        
+        timeline.append({
+            "id": item.id,
+            "transaction_id": item.transaction_id,
+            "action": action,
+            "from_status": previous_status,
+            "to_status": new_status,
+            "timestamp": _iso(item.timestamp),
+            "user_id": item.initiator_id,
+            "notes": item.reason,
+            "metadata": item.extra_data
+        })
+    return timeline
+
+
+async def _cache_get(key: str) -> Optional[Any]:
+    """
+    Читает JSON-значение из Redis
+    
+    Returns:
+        Значение или None, если его нет в кэше или Redis недоступен
+    """
+    try:
+        cached = await get_redis().get(key)
+    except RedisError as e:
+        logger.warning(f"Не удалось прочитать {key} из кэша: {str(e)}")
         return None
+    return orjson.loads(cached) if cached is not None else None
+
+
+async def _cache_set(key: str, value: Any, ttl: int) -> None:
+    """Сохраняет JSON-значение в Redis"""
+    try:
+        await get_redis().set(key, orjson.dumps(value), ex=ttl)
+    except RedisError as e:
+        logger.warning(f"Не удалось сохранить {key} в кэш: {str(e)}")
+
+
+async def get_cached_timeline(transaction_id: int) -> Optional[List[Dict[str, Any]]]:
+    """Получает таймлайн транзакции из Redis"""
+    return await _cache_get(timeline_cache_key(transaction_id))
+
+
+async def cache_timeline(transaction_id: int, timeline: List[Dict[str, Any]]) -> None:
+    """Сохраняет таймлайн транзакции в Redis"""
+    await _cache_set(timeline_cache_key(transaction_id), timeline, TIMELINE_CACHE_TTL)
+
+
+# Время жизни закэшированных деталей транзакции (секунды): значение из настроек,
+# ограниченное диапазоном 5-60 секунд, так как в ответе есть сроки в днях
+DETAILS_CACHE_TTL = min(max(settings.TX_DETAIL_TTL, 5), 60)
+
+async def run_transaction_action(
+    action: str,
+    operation: Callable[[], Awaitable[Any]]
+) -> Any:
+    """
+    Выполняет операцию изменения транзакции с общей обработкой ошибок
+    
+    ValueError преобразуется в ответ 400, прочие исключения - в ответ 500.
+    Кэш транзакции после смены статуса сбрасывает TransactionStateService.
+    
+    Args:
+        action: Описание операции для сообщений об ошибках (например, "отмене транзакции")
+        operation: Фабрика корутины, выполняющей операцию
+        
+    Returns:
+        Результат операции
+    """
+    try:
+        result = await operation()
+    except HTTPException:
+        raise
+    except ValueError as e:
+        logger.error(f"Ошибка при {action}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except Exception as e:
+        logger.error(f"Ошибка при {action}: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Ошибка сервера при {action}"
+        )
+    
+    return result
 
 
 @router.get("/debug-auth", tags=["debug"])
 async def debug_auth(request: Request):
     """Эндпоинт для отладки авторизации"""
+    from ..services.auth_service import AuthService
+    
     auth_header = request.headers.get("Authorization", "не найден")
     
     user_info = None
@@ -100,6 +337,7 @@ async def debug_auth(request: Request):
     - Автоматически проверяет права доступа и валидирует данные
     """
 )
+@idempotent("create_transaction", response_model=TransactionResponse)
 async def create_transaction(
     transaction_data: TransactionCreate = Body(..., description="Данные для создания транзакции"),
     x_idempotency_key: Optional[str] = Header(None, description="Ключ идемпотентности для предотвращения дублирования операций"),
@@ -109,42 +347,11 @@ async def create_transaction(
     """
     Создать новую транзакцию
     """
-    # Проверка идемпотентности
-    if x_idempotency_key:
-        idempotency_service = get_idempotency_service(db)
-        existing_response = await idempotency_service.check_and_save(
-            idempotency_key=x_idempotency_key,
-            operation_type="create_transaction"
-        )
-        
-        if existing_response:
-            logger.info(f"Возвращаем результат предыдущей операции для ключа {x_idempotency_key}")
-            return existing_response
-    
-    try:
-        transaction_service = get_transaction_service(db)
-        transaction = await transaction_service.create_transaction(transaction_data)
-        
-        # Сохраняем ответ для идемпотентности
-        if x_idempotency_key:
-            idempotency_service = get_idempotency_service(db)
-            # Создаем и сериализуем объект Pydantic вместо __dict__
-            transaction_response = TransactionResponse.model_validate(transaction)
-            await idempotency_service.save_response(x_idempotency_key, transaction_response.model_dump())
-        
-        return transaction
-    except ValueError as e:
-        logger.error(f"Ошибка создания транзакции: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=str(e)
-        )
-    except Exception as e:
-        logger.error(f"Ошибка при создании транзакции: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Ошибка сервера при создании транзакции"
-        )
+    transaction_service = get_transaction_service(db)
+    return await run_transaction_action(
+        "создании транзакции",
+        lambda: transaction_service.create_transaction(transaction_data)
+    )
 
 
 @router.get(
@@ -161,15 +368,17 @@ async def create_transaction(
     """
 )
 async def get_transaction(
+    request: Request,
+    response: Response,
     transaction_id: int = Path(..., description="ID транзакции"),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Получить информацию о транзакции по ID
     """
     try:
-        transaction_service = get_transaction_service(db)
+        transaction_service = get_transaction_read_service(db)
         transaction = await transaction_service.get_transaction(transaction_id)
         
         if not transaction:
@@ -178,6 +387,10 @@ async def get_transaction(
                 detail=f"Транзакция с ID {transaction_id} не найдена"
             )
         
+        not_modified = _not_modified(request, response, transaction)
+        if not_modified is not None:
+            return not_modified
+        
         return transaction
     except Exception as e:
         if isinstance(e, HTTPException):
@@ -191,7 +404,8 @@ async def get_transaction(
 
 @router.get(
     "",
-    response_model=TransactionListResponse,
+    response_model=None,
+    responses={200: {"model": TransactionListResponse}},
     summary="Получение списка транзакций",
     description="""
     Возвращает список транзакций с пагинацией и фильтрацией.
@@ -209,7 +423,7 @@ async def get_transactions(
     page: int = Query(1, ge=1, description="Номер страницы"),
     page_size: int = Query(10, ge=1, le=100, description="Размер страницы"),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     role: Optional[str] = Query(None, description="Роль пользователя"),
     is_seller_view: bool = Query(False, description="Вид транзакций продавца")
 ):
@@ -221,29 +435,35 @@ async def get_transactions(
             role = "seller"
         else:
             role = "buyer"
-        transaction_service = get_transaction_service(db)
+        transaction_service = get_transaction_read_service(db)
         
         # Получаем транзакции с учетом пагинации
         if not user_id:
             user_id=current_user.id
             
         
-        transactions = await transaction_service.get_user_transactions(
+        skip = (page - 1) * page_size
+        transactions, total = await transaction_service.list_and_count_user_transactions(
                 user_id=user_id, 
                 status=status_filter,
-                skip=(page - 1) * page_size,
+                skip=skip,
                 limit=page_size,
                 role=role
         )
-        total = await transaction_service.count_user_transactions(user_id=user_id, status=status_filter,role=role)
+        # Строки БД уже соответствуют типам TransactionResponse - схемы создаются
+        # без валидации; повторной проверки через response_model нет,
+        # ответ сразу сериализуется orjson
+        items = [from_orm_fast(TransactionResponse, transaction) for transaction in transactions]
+        
         # Формируем ответ с пагинацией
-        return {
-            "items": transactions,
+        return ORJSONResponse({
+            "items": TransactionListResponse.serialize_items(items),
             "total": total,
             "page": page,
             "size": page_size,
-            "pages": (total + page_size - 1) // page_size if page_size > 0 else 0
-        }
+            # page_size >= 1 гарантируется валидацией параметра
+            "pages": page_count(total, page_size)
+        })
     except Exception as e:
         logger.error(f"Ошибка при получении списка транзакций: {str(e)}")
         raise HTTPException(
@@ -306,6 +526,7 @@ async def get_available_actions(
     - Возвращает обновленную информацию о транзакции
     """
 )
+@idempotent("process_escrow_payment", response_model=TransactionResponse)
 async def process_escrow_payment(
     transaction_id: int = Path(..., description="ID транзакции"),
     x_idempotency_key: Optional[str] = Header(None, description="Ключ идемпотентности для предотвращения дублирования операций"),
@@ -316,45 +537,15 @@ async def process_escrow_payment(
     """
     Перевести средства в Escrow для транзакции
     """
-    # Проверка идемпотентности
-    if x_idempotency_key:
-        idempotency_service = get_idempotency_service(db)
-        existing_response = await idempotency_service.check_and_save(
-            idempotency_key=x_idempotency_key,
-            operation_type="process_escrow_payment"
-        )
-        
-        if existing_response:
-            logger.info(f"Возвращаем результат предыдущей операции для ключа {x_idempotency_key}")
-            return existing_response
-    
-    try:
-        transaction_state_service = get_transaction_state_service(db)
-        transaction = await transaction_state_service.process_payment(transaction_id, data)
-        
-        # Сохраняем ответ для идемпотентности
-        if x_idempotency_key:
-            idempotency_service = get_idempotency_service(db)
-            # Создаем и сериализуем объект Pydantic вместо __dict__
-            transaction_response = TransactionResponse.model_validate(transaction)
-            await idempotency_service.save_response(x_idempotency_key, transaction_response.model_dump())
-        
-        return transaction
-    except ValueError as e:
-        logger.error(f"Ошибка перевода средств в Escrow: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=str(e)
-        )
-    except Exception as e:
-        logger.error(f"Ошибка при переводе средств в Escrow: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Ошибка сервера при переводе средств в Escrow"
-        )
+    transaction_state_service = get_transaction_state_service(db)
+    return await run_transaction_action(
+        "переводе средств в Escrow",
+        lambda: transaction_state_service.process_payment(transaction_id, data)
+    )
 
 
 @router.post("/{transaction_id}/complete", response_model=TransactionResponse)
+@idempotent("complete_transaction", response_model=TransactionResponse)
 async def complete_transaction(
     transaction_id: int = Path(..., description="ID транзакции"),
     x_idempotency_key: Optional[str] = Header(None, description="Ключ идемпотентности для предотвращения дублирования операций"),
@@ -365,45 +556,15 @@ async def complete_transaction(
     """
     Завершить транзакцию и перевести средства продавцу
     """
-    # Проверка идемпотентности
-    if x_idempotency_key:
-        idempotency_service = get_idempotency_service(db)
-        existing_response = await idempotency_service.check_and_save(
-            idempotency_key=x_idempotency_key,
-            operation_type="complete_transaction"
-        )
-        
-        if existing_response:
-            logger.info(f"Возвращаем результат предыдущей операции для ключа {x_idempotency_key}")
-            return existing_response
-    
-    try:
-        transaction_state_service = get_transaction_state_service(db)
-        transaction = await transaction_state_service.complete_transaction(transaction_id, data)
-        
-        # Сохраняем ответ для идемпотентности
-        if x_idempotency_key:
-            idempotency_service = get_idempotency_service(db)
-            # Создаем и сериализуем объект Pydantic вместо __dict__
-            transaction_response = TransactionResponse.model_validate(transaction)
-            await idempotency_service.save_response(x_idempotency_key, transaction_response.model_dump())
-        
-        return transaction
-    except ValueError as e:
-        logger.error(f"Ошибка завершения транзакции: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=str(e)
-        )
-    except Exception as e:
-        logger.error(f"Ошибка при завершении транзакции: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Ошибка сервера при завершении транзакции"
-        )
+    transaction_state_service = get_transaction_state_service(db)
+    return await run_transaction_action(
+        "завершении транзакции",
+        lambda: transaction_state_service.complete_transaction(transaction_id, data)
+    )
 
 
 @router.post("/{transaction_id}/refund", response_model=TransactionResponse)
+@idempotent("refund_transaction", response_model=TransactionResponse)
 async def refund_transaction(
     transaction_id: int = Path(..., description="ID транзакции"),
     x_idempotency_key: Optional[str] = Header(None, description="Ключ идемпотентности для предотвращения дублирования операций"),
@@ -414,43 +575,12 @@ async def refund_transaction(
     """
     Отменить транзакцию и вернуть средства покупателю
     """
-    # Проверка идемпотентности
-    if x_idempotency_key:
-        idempotency_service = get_idempotency_service(db)
-        existing_response = await idempotency_service.check_and_save(
-            idempotency_key=x_idempotency_key,
-            operation_type="refund_transaction"
-        )
-        
-        if existing_response:
-            logger.info(f"Возвращаем результат предыдущей операции для ключа {x_idempotency_key}")
-            return existing_response
-    
-    try:
-        data = {"reason": status_update.reason} if status_update and status_update.reason else None
-        transaction_state_service = get_transaction_state_service(db)
-        transaction = await transaction_state_service.refund_transaction(transaction_id, data)
-        
-        # Сохраняем ответ для идемпотентности
-        if x_idempotency_key:
-            idempotency_service = get_idempotency_service(db)
-            # Создаем и сериализуем объект Pydantic вместо __dict__
-            transaction_response = TransactionResponse.model_validate(transaction)
-            await idempotency_service.save_response(x_idempotency_key, transaction_response.model_dump())
-        
-        return transaction
-    except ValueError as e:
-        logger.error(f"Ошибка возврата средств: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=str(e)
-        )
-    except Exception as e:
-        logger.error(f"Ошибка при возврате средств: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Ошибка сервера при возврате средств"
-        )
+    data = {"reason": status_update.reason} if status_update and status_update.reason else None
+    transaction_state_service = get_transaction_state_service(db)
+    return await run_transaction_action(
+        "возврате средств",
+        lambda: transaction_state_service.refund_transaction(transaction_id, data)
+    )
 
 
 @router.post(
@@ -467,6 +597,7 @@ async def refund_transaction(
     - Проверяет возможность открытия спора
     """
 )
+@idempotent("dispute_transaction", response_model=TransactionResponse)
 async def dispute_transaction(
     transaction_id: int = Path(..., description="ID транзакции"),
     x_idempotency_key: Optional[str] = Header(None, description="Ключ идемпотентности для предотвращения дублирования операций"),
@@ -477,43 +608,12 @@ async def dispute_transaction(
     """
     Открыть спор по транзакции
     """
-    # Проверка идемпотентности
-    if x_idempotency_key:
-        idempotency_service = get_idempotency_service(db)
-        existing_response = await idempotency_service.check_and_save(
-            idempotency_key=x_idempotency_key,
-            operation_type="dispute_transaction"
-        )
-        
-        if existing_response:
-            logger.info(f"Возвращаем результат предыдущей операции для ключа {x_idempotency_key}")
-            return existing_response
-    
-    try:
-        data = {"reason": dispute_data.reason} if dispute_data and dispute_data.reason else None
-        transaction_state_service = get_transaction_state_service(db)
-        transaction = await transaction_state_service.dispute_transaction(transaction_id, data)
-        
-        # Сохраняем ответ для идемпотентности
-        if x_idempotency_key:
-            idempotency_service = get_idempotency_service(db)
-            # Создаем и сериализуем объект Pydantic вместо __dict__
-            transaction_response = TransactionResponse.model_validate(transaction)
-            await idempotency_service.save_response(x_idempotency_key, transaction_response.model_dump())
-        
-        return transaction
-    except ValueError as e:
-        logger.error(f"Ошибка открытия спора: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=str(e)
-        )
-    except Exception as e:
-        logger.error(f"Ошибка при открытии спора: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Ошибка сервера при открытии спора"
-        )
+    data = {"reason": dispute_data.reason} if dispute_data and dispute_data.reason else None
+    transaction_state_service = get_transaction_state_service(db)
+    return await run_transaction_action(
+        "открытии спора",
+        lambda: transaction_state_service.dispute_transaction(transaction_id, data)
+    )
 
 
 @router.post(
@@ -530,6 +630,7 @@ async def dispute_transaction(
     - Доступно только администраторам
     """
 )
+@idempotent("resolve_dispute", response_model=TransactionResponse)
 async def resolve_dispute(
     transaction_id: int = Path(..., description="ID транзакции"),
     in_favor_of_seller: bool = Query(..., description="Решение в пользу продавца (true) или покупателя (false)"),
@@ -541,48 +642,16 @@ async def resolve_dispute(
     """
     Разрешить спор по транзакции
     """
-    # Проверка идемпотентности
-    if x_idempotency_key:
-        idempotency_service = get_idempotency_service(db)
-        existing_response = await idempotency_service.check_and_save(
-            idempotency_key=x_idempotency_key,
-            operation_type="resolve_dispute"
-        )
-        
-        if existing_response:
-            logger.info(f"Возвращаем результат предыдущей операции для ключа {x_idempotency_key}")
-            return existing_response
-    
-    try:
-        data = {"reason": dispute_resolution.reason, "resolution": "seller" if in_favor_of_seller else "buyer"} if dispute_resolution else {"resolution": "seller" if in_favor_of_seller else "buyer"}
-        transaction_state_service = get_transaction_state_service(db)
-        transaction = await transaction_state_service.resolve_dispute(
-            transaction_id, in_favor_of_seller, data
-        )
-        
-        # Сохраняем ответ для идемпотентности
-        if x_idempotency_key:
-            idempotency_service = get_idempotency_service(db)
-            # Создаем и сериализуем объект Pydantic вместо __dict__
-            transaction_response = TransactionResponse.model_validate(transaction)
-            await idempotency_service.save_response(x_idempotency_key, transaction_response.model_dump())
-        
-        return transaction
-    except ValueError as e:
-        logger.error(f"Ошибка разрешения спора: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=str(e)
-        )
-    except Exception as e:
-        logger.error(f"Ошибка при разрешении спора: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Ошибка сервера при разрешении спора"
-        )
+    data = {"reason": dispute_resolution.reason, "resolution": "seller" if in_favor_of_seller else "buyer"} if dispute_resolution else {"resolution": "seller" if in_favor_of_seller else "buyer"}
+    transaction_state_service = get_transaction_state_service(db)
+    return await run_transaction_action(
+        "разрешении спора",
+        lambda: transaction_state_service.resolve_dispute(transaction_id, in_favor_of_seller, data)
+    )
 
 
 @router.post("/{transaction_id}/cancel", response_model=TransactionResponse)
+@idempotent("cancel_transaction", response_model=TransactionResponse)
 async def cancel_transaction(
     transaction_id: int = Path(..., description="ID транзакции"),
     x_idempotency_key: Optional[str] = Header(None, description="Ключ идемпотентности для предотвращения дублирования операций"),
@@ -593,43 +662,12 @@ async def cancel_transaction(
     """
     Отменить транзакцию
     """
-    # Проверка идемпотентности
-    if x_idempotency_key:
-        idempotency_service = get_idempotency_service(db)
-        existing_response = await idempotency_service.check_and_save(
-            idempotency_key=x_idempotency_key,
-            operation_type="cancel_transaction"
-        )
-        
-        if existing_response:
-            logger.info(f"Возвращаем результат предыдущей операции для ключа {x_idempotency_key}")
-            return existing_response
-    
-    try:
-        data = {"reason": status_update.reason} if status_update and status_update.reason else None
-        transaction_state_service = get_transaction_state_service(db)
-        transaction = await transaction_state_service.cancel_transaction(transaction_id, data)
-        
-        # Сохраняем ответ для идемпотентности
-        if x_idempotency_key:
-            idempotency_service = get_idempotency_service(db)
-            # Создаем и сериализуем объект Pydantic вместо __dict__
-            transaction_response = TransactionResponse.model_validate(transaction)
-            await idempotency_service.save_response(x_idempotency_key, transaction_response.model_dump())
-        
-        return transaction
-    except ValueError as e:
-        logger.error(f"Ошибка отмены транзакции: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=str(e)
-        )
-    except Exception as e:
-        logger.error(f"Ошибка при отмене транзакции: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Ошибка сервера при отмене транзакции"
-        )
+    data = {"reason": status_update.reason} if status_update and status_update.reason else None
+    transaction_state_service = get_transaction_state_service(db)
+    return await run_transaction_action(
+        "отмене транзакции",
+        lambda: transaction_state_service.cancel_transaction(transaction_id, data)
+    )
 
 
 @router.get(
@@ -647,15 +685,20 @@ async def cancel_transaction(
     """
 )
 async def get_transaction_details(
+    request: Request,
+    response: Response,
     transaction_id: int = Path(..., description="ID транзакции"),
-    current_user: User = Depends(get_current_active_user),
-    current_user_info:str = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    user_and_token: Tuple[User, str] = Depends(get_current_user_and_token),
+    db: AsyncSession = Depends(get_async_db)
 ) -> TransactionDetailsResponse:
-    token = current_user_info.token
+    current_user, token = user_and_token
     # Получаем основную информацию о транзакции
-    transaction_service = get_transaction_service(db)
-    transaction = await transaction_service.get_transaction(transaction_id)
+    # Таймлайн меняется только при смене статуса, поэтому берется из кэша, если он там есть
+    history_data = await get_cached_timeline(transaction_id)
+    transaction_service = get_transaction_read_service(db)
+    transaction = await transaction_service.get_transaction_for_details(
+        transaction_id, with_history=history_data is None
+    )
     logger.info(f"Транзакция: {transaction}")
     if not transaction:
         raise HTTPException(
@@ -670,211 +713,153 @@ async def get_transaction_details(
             detail="У вас нет доступа к этой транзакции"
         )
     
-    # Получаем историю транзакции
-    history_service = TransactionHistoryService(db)
-    history = history_service.get_transaction_timeline(transaction_id)
+    # Клиент уже имеет актуальную версию: внешние сервисы не опрашиваем
+    not_modified = _not_modified(request, response, transaction)
+    if not_modified is not None:
+        return not_modified
     
+    user_role = "buyer" if transaction.buyer_id == current_user.id else "seller" if transaction.seller_id == current_user.id else "admin"
     
-    # Получаем информацию о продавце из auth-сервиса
-    seller = None
-    if transaction.seller_id:
-        try:
-            seller_data = await get_user_by_id(transaction.seller_id)
-            if seller_data:
-                seller = {
-                    "id": seller_data.get("id"),
-                    "username": seller_data.get("username"),
-                    "email": seller_data.get("email"),
-                    "avatar": seller_data.get("profile", {}).get("avatar_url"),
-                    "rating": seller_data.get("profile", {}).get("rating", 0),
-                    "registration_date": seller_data.get("created_at"),
-                    "verified": seller_data.get("is_verified", False),
-                    "total_sales": seller_data.get("profile", {}).get("total_sales", 0),
-                    "contacts": seller_data.get("profile", {}).get("contacts", {}),
-                }
-        except Exception as e:
-            logging.error(f"Не удалось получить информацию о продавце: {str(e)}")
-    
-    # Получаем информацию о покупателе из auth-сервиса
-    buyer = None
-    if transaction.buyer_id:
-        try:
-            buyer_data = await get_user_by_id(transaction.buyer_id)
-            if buyer_data:
-                buyer = {
-                    "id": buyer_data.get("id"),
-                    "username": buyer_data.get("username"),
-                    "email": buyer_data.get("email"),
-                    "avatar": buyer_data.get("profile", {}).get("avatar_url"),
-                    "rating": buyer_data.get("profile", {}).get("rating", 0),
-                    "registration_date": buyer_data.get("created_at"),
-                    "verified": buyer_data.get("is_verified", False),
-                    "total_purchases": buyer_data.get("profile", {}).get("total_purchases", 0),
-                    "contacts": buyer_data.get("profile", {}).get("contacts", {}),
-                }
-        except Exception as e:
-            logging.error(f"Не удалось получить информацию о покупателе: {str(e)}")
-    
-    # Получаем информацию о товаре через API marketplace
-    item_details = None
-    listing_id = transaction.listing_id
-    if listing_id:
-        try:
-            marketplace_service_url = settings.MARKETPLACE_SERVICE_URL
-            logger.info(f"Попытка получить информацию о товаре. ID листинга: {listing_id}, URL: {marketplace_service_url}")
-            async with httpx.AsyncClient() as client:
-                headers = {
-                    "Authorization": f"Bearer {token}"
-                }
-                response = await client.get(f"{marketplace_service_url}/listings/{listing_id}",headers=headers)
-                
-                if response.status_code == 200:
-                    listing_data = response.json()
-                    item_details = {
-                        "id": listing_data.get("id"),
-                        "title": listing_data.get("title"),
-                        "description": listing_data.get("description"),
-                        "price": listing_data.get("price"),
-                        "currency": listing_data.get("currency"),
-                        "category": listing_data.get("category"),
-                        "condition": listing_data.get("condition"),
-                        "images": listing_data.get("images", [])[:3],  # Первые 3 изображения
-                        "created_at": listing_data.get("created_at"),
-                        "tags": listing_data.get("tags", []),
-                        "location": listing_data.get("location"),
-                    }
-        except Exception as e:
-            logging.error(f"Не удалось получить информацию о товаре: {str(e)}")
-    
-    # Получаем информацию о продаже, если она связана с транзакцией
-    sale = None
+    # Готовый ответ для этой роли берется из кэша, минуя внешние сервисы
+    details_key = details_cache_key(transaction_id, user_role, current_user.is_admin)
+    cached_details = await _cache_get(details_key)
+    if cached_details is not None:
+        return cached_details
+    
+    # При промахе кэша таймлайн строится из истории, загруженной вместе с транзакцией,
+    # и сохраняется в кэш параллельно с запросами к внешним сервисам
+    store_timeline = _none()
+    if history_data is None:
+        history_data = _build_timeline(sorted(transaction.history, key=lambda item: item.timestamp))
+        store_timeline = cache_timeline(transaction_id, history_data)
+    
+    # Доступные действия вычисляются по уже загруженной транзакции, без обращений к БД
+    available_actions = TransactionStateService.get_actions_for_transaction(transaction)
+    
+    # Продажа, связанная с транзакцией, если она указана
+    sale_id = None
     if transaction.extra_data and "sale_id" in transaction.extra_data:
         try:
             sale_id = int(transaction.extra_data["sale_id"])
-            
-            # Получаем детали продажи через API marketplace
-            marketplace_service_url = settings.MARKETPLACE_SERVICE_URL
-            async with httpx.AsyncClient() as client:
-                headers = {
-                    "Authorization": f"Bearer {token}"
-                }
-                response = await client.get(f"{marketplace_service_url}/sales/{sale_id}",headers=headers)
-                if response.status_code == 200:
-                    sale = response.json()
-        except Exception as e:
-            logger.info(f"url: {marketplace_service_url}/sales/{sale_id}")
-            logging.error(f"Не удалось получить информацию о продаже: {str(e)}")
-
+        except (TypeError, ValueError):
+            logger.error(f"Некорректный ID продажи в транзакции {transaction_id}: {transaction.extra_data['sale_id']}")
+    
+    # Все независимые операции ввода-вывода выполняются одной группой:
+    # другая сторона сделки (обе - для администратора), товар, продажа и запись таймлайна в кэш
+    listing_id = transaction.listing_id
+    users_result, listing_result, sale_result, _ = await asyncio.gather(
+        get_users_by_ids(_participant_ids_to_fetch(transaction, user_role)),
+        get_listing_cached(listing_id, token) if listing_id else _none(),
+        sale_loader.load(sale_id, token) if sale_id is not None else _none(),
+        store_timeline,
+        return_exceptions=True
+    )
+    if isinstance(users_result, Exception):
+        logging.error(f"Не удалось получить информацию об участниках сделки: {str(users_result)}")
+        users_result = {}
+    if user_role != "admin":
+        users_result.setdefault(current_user.id, _current_participant(current_user))
+    
+    # Информация об участниках сделки из auth-сервиса
+    seller_data = users_result.get(transaction.seller_id)
+    seller = SellerView.model_validate(seller_data).model_dump() if seller_data else None
+    buyer_data = users_result.get(transaction.buyer_id)
+    buyer = BuyerView.model_validate(buyer_data).model_dump() if buyer_data else None
+    
+    # Информация о товаре из marketplace
+    item_details = None
+    if isinstance(listing_result, Exception):
+        logging.error(f"Не удалось получить информацию о товаре: {str(listing_result)}")
+    elif listing_result:
+        listing_data = listing_result
+        item_details = {
+            "id": listing_data.get("id"),
+            "title": listing_data.get("title"),
+            "description": listing_data.get("description"),
+            "price": listing_data.get("price"),
+            "currency": listing_data.get("currency"),
+            "category": listing_data.get("category"),
+            "condition": listing_data.get("condition"),
+            "images": listing_data.get("images", [])[:3],  # Первые 3 изображения
+            "created_at": listing_data.get("created_at"),
+            "tags": listing_data.get("tags", []),
+            "location": listing_data.get("location"),
+        }
+    
+    # Информация о продаже из marketplace
+    sale = None
+    if isinstance(sale_result, Exception):
+        logging.error(f"Не удалось получить информацию о продаже {sale_id}: {str(sale_result)}")
+    else:
+        sale = sale_result
+    
+    # Поля, которые используются в нескольких разделах ответа, читаем один раз
+    amount = transaction.amount or 0.0
+    fee_amount = transaction.fee_amount
+    fee_percentage = transaction.fee_percentage
+    transaction_uid = str(transaction.transaction_uid) if transaction.transaction_uid else None
+    escrow_held_at = transaction.escrow_held_at
+    expiration_date = transaction.expiration_date
+    created_at = _iso(transaction.created_at)
+    updated_at = _iso(transaction.updated_at)
+    completed_at = _iso(transaction.completed_at)
+    escrow_held_at_iso = _iso(escrow_held_at)
+    expiration_date_iso = _iso(expiration_date)
+    now = datetime.now(timezone.utc)
     
     # Информация об эскроу
     escrow_info = {
         "is_in_escrow": transaction.status == TransactionStatus.ESCROW_HELD,
         "days_in_escrow": None,
-        "escrow_start_date": transaction.escrow_held_at.isoformat() if getattr(transaction, 'escrow_held_at', None) else None,
+        "escrow_start_date": escrow_held_at_iso,
         "escrow_end_date": None,
-        "wallet_id": getattr(transaction, 'wallet_id', None)
+        "wallet_id": transaction.wallet_id
     }
     
-    if getattr(transaction, 'escrow_held_at', None):
-        from datetime import datetime
-        days_in_escrow = (datetime.now(timezone.utc) - transaction.escrow_held_at).days
+    if escrow_held_at:
+        days_in_escrow = (now - escrow_held_at).days
         escrow_info["days_in_escrow"] = days_in_escrow
         
         # Вычисляем предполагаемую дату завершения Escrow (если применимо)
-        if getattr(transaction, 'expiration_date', None):
-            escrow_info["escrow_end_date"] = transaction.expiration_date.isoformat()
+        if expiration_date:
+            escrow_info["escrow_end_date"] = expiration_date_iso
     
     # Информация о сроках
     time_info = {
         "is_expired": False,
         "days_left": None,
-        "created_date": transaction.created_at.isoformat() if getattr(transaction, 'created_at', None) else None,
-        "updated_date": transaction.updated_at.isoformat() if getattr(transaction, 'updated_at', None) else None,
-        "completed_date": transaction.completed_at.isoformat() if getattr(transaction, 'completed_at', None) else None,
-        "expiration_date": transaction.expiration_date.isoformat() if getattr(transaction, 'expiration_date', None) else None,
+        "created_date": created_at,
+        "updated_date": updated_at,
+        "completed_date": completed_at,
+        "expiration_date": expiration_date_iso,
     }
     
-    if getattr(transaction, 'expiration_date', None):
-        days_left = (transaction.expiration_date - datetime.now(timezone.utc)).days
+    if expiration_date:
+        days_left = (expiration_date - now).days
         time_info["days_left"] = days_left
         time_info["is_expired"] = days_left < 0
     
-    # Определение доступных действий
-    transaction_state_service = get_transaction_state_service(db)
-    available_actions = await transaction_state_service.get_available_actions(transaction_id)
-    
-    # Статус действий
-    action_status = {
-        "can_complete": "complete" in available_actions,
-        "can_refund": "refund" in available_actions,
-        "can_dispute": "dispute" in available_actions,
-        "can_cancel": "cancel" in available_actions,
-        "can_resolve_dispute": "resolve_dispute" in available_actions and current_user.is_admin,
-    }
+    # Статус действий одной битовой маской; разрешение спора доступно только администратору
+    action_flags = TxAction.from_actions(available_actions)
+    if not current_user.is_admin:
+        action_flags &= ~TxAction.RESOLVE_DISPUTE
     
     # Дополнительная информация о платеже
     payment_info = {
-        "amount": float(transaction.amount) if getattr(transaction, 'amount', None) else 0.0,
-        "currency": getattr(transaction, 'currency', 'USD'),
-        "fee_amount": float(transaction.fee_amount) if getattr(transaction, 'fee_amount', None) else 0.0,
-        "fee_percentage": float(transaction.fee_percentage) if getattr(transaction, 'fee_percentage', None) else 0.0,
-        "total_amount": float(transaction.amount) if getattr(transaction, 'amount', None) else 0.0,
+        "amount": amount,
+        "currency": transaction.currency,
+        "fee_amount": fee_amount or 0.0,
+        "fee_percentage": fee_percentage or 0.0,
+        "total_amount": amount,
         "payment_method": "wallet",  # По умолчанию
-        "transaction_uid": str(transaction.transaction_uid) if getattr(transaction, 'transaction_uid', None) else None,
+        "transaction_uid": transaction_uid,
     }
     
     # Преобразуем объект транзакции в словарь
-    transaction_dict = {
-        "id": transaction.id,
-        "transaction_uid": str(transaction.transaction_uid) if getattr(transaction, 'transaction_uid', None) else None,
-        "buyer_id": getattr(transaction, 'buyer_id', None),
-        "seller_id": getattr(transaction, 'seller_id', None),
-        "listing_id": getattr(transaction, 'listing_id', None),
-        "item_id": getattr(transaction, 'item_id', None),
-        "amount": float(transaction.amount) if getattr(transaction, 'amount', None) else 0.0,
-        "currency": getattr(transaction, 'currency', 'USD'),
-        "fee_amount": float(transaction.fee_amount) if getattr(transaction, 'fee_amount', None) is not None else 0,
-        "fee_percentage": float(transaction.fee_percentage) if getattr(transaction, 'fee_percentage', None) is not None else 0,
-        "status": getattr(transaction, 'status', TransactionStatus.PENDING).value,
-        "type": getattr(transaction, 'type', None).value if getattr(transaction, 'type', None) else None,
-        "created_at": transaction.created_at.isoformat() if getattr(transaction, 'created_at', None) else None,
-        "updated_at": transaction.updated_at.isoformat() if getattr(transaction, 'updated_at', None) else None,
-        "completed_at": transaction.completed_at.isoformat() if getattr(transaction, 'completed_at', None) else None,
-        "disputed_at": transaction.disputed_at.isoformat() if getattr(transaction, 'disputed_at', None) else None,
-        "refunded_at": transaction.refunded_at.isoformat() if getattr(transaction, 'refunded_at', None) else None,
-        "canceled_at": transaction.canceled_at.isoformat() if getattr(transaction, 'canceled_at', None) else None,
-        "escrow_held_at": transaction.escrow_held_at.isoformat() if getattr(transaction, 'escrow_held_at', None) else None,
-        "description": getattr(transaction, 'description', None),
-        "notes": getattr(transaction, 'notes', None),
-        "extra_data": getattr(transaction, 'extra_data', None),
-        "dispute_reason": getattr(transaction, 'dispute_reason', None),
-        "refund_reason": getattr(transaction, 'refund_reason', None),
-        "cancel_reason": getattr(transaction, 'cancel_reason', None),
-    }
-    
-    # Преобразуем историю транзакций
-    history_data = []
-    if history:
-        for item in history:
-            # Определяем тип действия на основе изменения статуса
-            action = "status_change"
-            if getattr(item, 'previous_status', None) is None and getattr(item, 'new_status', None) == TransactionStatus.PENDING:
-                action = "create"
-            
-            history_data.append({
-                "id": getattr(item, 'id', None),
-                "transaction_id": getattr(item, 'transaction_id', None),
-                "action": action,
-                "from_status": getattr(item, 'previous_status', None),
-                "to_status": getattr(item, 'new_status', None),
-                "timestamp": item.timestamp.isoformat() if getattr(item, 'timestamp', None) else None,
-                "user_id": getattr(item, 'initiator_id', None),
-                "notes": getattr(item, 'reason', None),
-                "metadata": getattr(item, 'extra_data', None)
-            })
+    transaction_dict = _build_transaction_dict(transaction)
     
     # Формируем полный ответ
-    return {
+    details = {
         "transaction": transaction_dict,
         "history": history_data,
         "seller": seller,
@@ -884,7 +869,10 @@ async def get_transaction_details(
         "escrow_info": escrow_info,
         "time_info": time_info,
         "available_actions": available_actions,
-        "action_status": action_status,
+        "action_flags": int(action_flags),
         "payment_info": payment_info,
-        "user_role": "buyer" if transaction.buyer_id == current_user.id else "seller" if transaction.seller_id == current_user.id else "admin"
-    } 
\ No newline at end of file
+        "user_role": user_role
+    }
+    await _cache_set(details_key, details, DETAILS_CACHE_TTL)
+    
+    return details 
\ No newline at end of file
@@ -2,23 +2,29 @@
 API маршруты для работы с историей транзакций
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query, Path, Response
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Path
+from fastapi.responses import ORJSONResponse, StreamingResponse
+from fastapi import status as http_status
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Optional, Iterable, Iterator
 import logging
 from datetime import datetime, timedelta
 import csv
 import io
-import json
+import itertools
+from functools import lru_cache
+import orjson
 
-from ..database.connection import get_db
+from ..database.connection import get_db, session_factory
 from ..models.transaction import TransactionStatus
+from ..models.transaction_history import TransactionHistory
 from ..schemas.transaction_history import TransactionHistoryResponse, TransactionHistoryListResponse
 from ..services.transaction_history_service import TransactionHistoryService, get_transaction_history_service
 
 router = APIRouter(
     prefix="/transactions/history",
     tags=["transaction_history"],
+    default_response_class=ORJSONResponse,
     responses={
         401: {"description": "Пользователь не авторизован"},
         403: {"description": "Нет прав доступа"},
@@ -30,9 +36,138 @@ router = APIRouter(
 
 logger = logging.getLogger(__name__)
 
+# Количество записей в одной порции потокового экспорта
+HISTORY_STREAM_BATCH = 500
+
+# Строковые значения статусов (None для отсутствующего статуса)
+_STATUS_VALUE = {member: member.value for member in TransactionStatus}
+_status_value = _STATUS_VALUE.get
+_iso = datetime.isoformat
+
+# Колонки экспорта истории транзакций
+HISTORY_EXPORT_FIELDS = (
+    "id", "transaction_id", "previous_status", "new_status",
+    "timestamp", "initiator_id", "initiator_type", "reason", "extra_data"
+)
+
+
+@lru_cache(maxsize=1024)
+def _dumps_items(items: tuple) -> str:
+    """JSON для extra_data, заданного кортежем (ключ, тип, значение) (с кэшированием)"""
+    return orjson.dumps({key: value for key, _, value in items}).decode()
+
+
+def _dumps_extra_data(extra_data: dict) -> str:
+    """
+    JSON-строка extra_data для CSV
+    
+    Одинаковые плоские словари (частый случай) сериализуются один раз;
+    словари с вложенными значениями не хэшируются и сериализуются напрямую.
+    Тип значения входит в ключ кэша, чтобы 1, 1.0 и True не совпадали.
+    """
+    try:
+        return _dumps_items(tuple((key, type(value), value) for key, value in extra_data.items()))
+    except TypeError:
+        return orjson.dumps(extra_data).decode()
+
+
+def _history_csv_row(record) -> tuple:
+    """Строка CSV для записи истории (в порядке HISTORY_EXPORT_FIELDS)"""
+    return (
+        record.id,
+        record.transaction_id,
+        _status_value(record.previous_status),
+        _STATUS_VALUE[record.new_status],
+        _iso(record.timestamp),
+        record.initiator_id,
+        record.initiator_type,
+        record.reason,
+        _dumps_extra_data(record.extra_data) if record.extra_data else None
+    )
+
+
+def _history_json_record(record) -> dict:
+    """Элемент JSON-экспорта для записи истории"""
+    return {
+        "id": record.id,
+        "transaction_id": record.transaction_id,
+        "previous_status": _status_value(record.previous_status),
+        "new_status": _STATUS_VALUE[record.new_status],
+        "timestamp": _iso(record.timestamp),
+        "initiator_id": record.initiator_id,
+        "initiator_type": record.initiator_type,
+        "reason": record.reason,
+        "extra_data": record.extra_data
+    }
+
+
+def _iter_history_csv(records: Iterable) -> Iterator[str]:
+    """
+    Потоково сериализует записи истории в CSV
+    
+    Строки пишутся в переиспользуемый буфер, который отдается и очищается
+    после каждой пачки из HISTORY_STREAM_BATCH записей.
+    """
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(HISTORY_EXPORT_FIELDS)
+    
+    records = iter(records)
+    while True:
+        batch = list(itertools.islice(records, HISTORY_STREAM_BATCH))
+        if batch:
+            writer.writerows(map(_history_csv_row, batch))
+        chunk = output.getvalue()
+        if chunk:
+            yield chunk
+            output.seek(0)
+            output.truncate(0)
+        if len(batch) < HISTORY_STREAM_BATCH:
+            break
+
+
+def _iter_history_json(records: Iterable) -> Iterator[bytes]:
+    """Потоково сериализует записи истории в JSON-массив пачками по HISTORY_STREAM_BATCH"""
+    yield b"["
+    separator = b""
+    records = iter(records)
+    while True:
+        batch = list(itertools.islice(records, HISTORY_STREAM_BATCH))
+        if batch:
+            yield separator + b",".join(orjson.dumps(_history_json_record(record)) for record in batch)
+            separator = b","
+        if len(batch) < HISTORY_STREAM_BATCH:
+            break
+    yield b"]"
+
+
+def _stream_transactions_history(**filters) -> Iterator[TransactionHistory]:
+    """
+    Итератор записей истории в собственной сессии БД
+    
+    Сессия из зависимости закрывается до отправки потокового ответа,
+    поэтому генератор открывает свою и закрывает ее по окончании выгрузки.
+    """
+    db = session_factory()
+    try:
+        yield from TransactionHistoryService(db).stream_for_report(**filters)
+    finally:
+        db.close()
+
+
+def _stream_transaction_timeline(transaction_id: int) -> Iterator[TransactionHistory]:
+    """Итератор таймлайна транзакции в собственной сессии БД (см. _stream_transactions_history)"""
+    db = session_factory()
+    try:
+        yield from TransactionHistoryService(db).iter_transaction_timeline(transaction_id)
+    finally:
+        db.close()
+
+
 @router.get(
     "",
-    response_model=TransactionHistoryListResponse,
+    response_model=None,
+    responses={200: {"model": TransactionHistoryListResponse}},
     summary="Получение истории транзакций",
     description="""
     Возвращает историю транзакций с пагинацией и фильтрацией.
@@ -58,7 +193,7 @@ async def get_transactions_history(
     Получение истории транзакций с пагинацией и фильтрацией.
     """
     logger.info(f"Запрос истории транзакций: user_id={user_id}, status={status}, page={page}, page_size={page_size}")
-    return history_service.get_transactions_history(
+    result = history_service.get_transactions_history(
         user_id=user_id,
         status=status,
         start_date=start_date,
@@ -66,6 +201,74 @@ async def get_transactions_history(
         page=page,
         page_size=page_size
     )
+    # Ответ уже провалидирован сервисом - сериализуем его напрямую, без response_model
+    return ORJSONResponse(result.model_dump(mode="json"))
+
+@router.get("/report", response_class=StreamingResponse)
+async def generate_transactions_report(
+    user_id: Optional[int] = Query(None, description="ID пользователя для фильтрации"),
+    status: Optional[TransactionStatus] = Query(None, description="Статус транзакций для фильтрации"),
+    start_date: Optional[datetime] = Query(None, description="Начальная дата фильтрации (YYYY-MM-DDTHH:MM:SS)"),
+    end_date: Optional[datetime] = Query(None, description="Конечная дата фильтрации (YYYY-MM-DDTHH:MM:SS)"),
+    format: str = Query("csv", description="Формат экспорта (csv, json)"),
+    db: Session = Depends(get_db),
+    history_service: TransactionHistoryService = Depends(get_transaction_history_service)
+):
+    """
+    Генерация отчета по истории транзакций с фильтрацией.
+    """
+    logger.info(f"Генерация отчета по транзакциям: user_id={user_id}, status={status}, format={format}")
+    
+    # Установка значений по умолчанию для дат, если не указаны
+    if end_date is None:
+        end_date = datetime.utcnow()
+    if start_date is None:
+        start_date = end_date - timedelta(days=30)  # По умолчанию отчет за 30 дней
+    
+    filters = {
+        "user_id": user_id,
+        "status": status,
+        "start_date": start_date,
+        "end_date": end_date,
+    }
+    
+    if not history_service.has_transactions_history(**filters):
+        raise HTTPException(
+            status_code=http_status.HTTP_404_NOT_FOUND,
+            detail="Не найдено записей истории транзакций с указанными параметрами"
+        )
+    
+    if format.lower() == "csv":
+        # Отдаем CSV отчет потоком по мере чтения записей из БД
+        content = _iter_history_csv(_stream_transactions_history(**filters))
+        
+        filename = f"transaction_report_{start_date.strftime('%Y%m%d')}_to_{end_date.strftime('%Y%m%d')}.csv"
+        return StreamingResponse(
+            content,
+            media_type="text/csv",
+            headers={
+                "Content-Disposition": f"attachment; filename={filename}"
+            }
+        )
+    
+    elif format.lower() == "json":
+        # Отдаем JSON отчет потоком по мере чтения записей из БД
+        content = _iter_history_json(_stream_transactions_history(**filters))
+        
+        filename = f"transaction_report_{start_date.strftime('%Y%m%d')}_to_{end_date.strftime('%Y%m%d')}.json"
+        return StreamingResponse(
+            content,
+            media_type="application/json",
+            headers={
+                "Content-Disposition": f"attachment; filename={filename}"
+            }
+        )
+    
+    else:
+        raise HTTPException(
+            status_code=http_status.HTTP_400_BAD_REQUEST,
+            detail=f"Неподдерживаемый формат экспорта: {format}. Поддерживаемые форматы: csv, json"
+        )
 
 @router.get(
     "/{transaction_id}",
@@ -118,7 +321,7 @@ async def get_transaction_timeline(
 
 @router.get(
     "/{transaction_id}/export",
-    response_class=Response,
+    response_class=StreamingResponse,
     summary="Экспорт истории транзакции",
     description="""
     Экспортирует историю транзакции в CSV или JSON формате.
@@ -149,39 +352,19 @@ async def export_transaction_history(
     """
     logger.info(f"Экспорт истории транзакции ID {transaction_id} в формате {format}")
     
-    # Получаем историю транзакции
-    history = history_service.get_transaction_timeline(transaction_id)
-    
-    if not history:
+    # Проверяем наличие истории одной строкой, сами записи читаются уже при отправке
+    if not history_service.exists_for_transaction(transaction_id):
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"История для транзакции {transaction_id} не найдена"
         )
     
     if format.lower() == "csv":
-        # Создаем CSV из данных
-        output = io.StringIO()
-        fieldnames = ["id", "transaction_id", "previous_status", "new_status", 
-                     "timestamp", "initiator_id", "initiator_type", "reason", "extra_data"]
-        
-        writer = csv.DictWriter(output, fieldnames=fieldnames)
-        writer.writeheader()
-        
-        for record in history:
-            writer.writerow({
-                "id": record.id,
-                "transaction_id": record.transaction_id,
-                "previous_status": record.previous_status,
-                "new_status": record.new_status,
-                "timestamp": record.timestamp.isoformat(),
-                "initiator_id": record.initiator_id,
-                "initiator_type": record.initiator_type,
-                "reason": record.reason,
-                "extra_data": json.dumps(record.extra_data) if record.extra_data else None
-            })
+        # Отдаем CSV потоком по мере чтения записей из БД
+        content = _iter_history_csv(_stream_transaction_timeline(transaction_id))
         
-        return Response(
-            content=output.getvalue(),
+        return StreamingResponse(
+            content,
             media_type="text/csv",
             headers={
                 "Content-Disposition": f"attachment; filename=transaction_{transaction_id}_history.csv"
@@ -189,23 +372,11 @@ async def export_transaction_history(
         )
     
     elif format.lower() == "json":
-        # Создаем JSON из данных
-        history_data = []
-        for record in history:
-            history_data.append({
-                "id": record.id,
-                "transaction_id": record.transaction_id,
-                "previous_status": record.previous_status.value if record.previous_status else None,
-                "new_status": record.new_status.value,
-                "timestamp": record.timestamp.isoformat(),
-                "initiator_id": record.initiator_id,
-                "initiator_type": record.initiator_type,
-                "reason": record.reason,
-                "extra_data": record.extra_data
-            })
-            
-        return Response(
-            content=json.dumps(history_data, ensure_ascii=False),
+        # Отдаем JSON потоком по мере чтения записей из БД
+        content = _iter_history_json(_stream_transaction_timeline(transaction_id))
+        
+        return StreamingResponse(
+            content,
             media_type="application/json",
             headers={
                 "Content-Disposition": f"attachment; filename=transaction_{transaction_id}_history.json"
@@ -217,119 +388,3 @@ async def export_transaction_history(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=f"Неподдерживаемый формат экспорта: {format}. Поддерживаемые форматы: csv, json"
         )
-
-@router.get("/report", response_class=Response)
-async def generate_transactions_report(
-    user_id: Optional[int] = Query(None, description="ID пользователя для фильтрации"),
-    status: Optional[TransactionStatus] = Query(None, description="Статус транзакций для фильтрации"),
-    start_date: Optional[datetime] = Query(None, description="Начальная дата фильтрации (YYYY-MM-DDTHH:MM:SS)"),
-    end_date: Optional[datetime] = Query(None, description="Конечная дата фильтрации (YYYY-MM-DDTHH:MM:SS)"),
-    format: str = Query("csv", description="Формат экспорта (csv, json)"),
-    db: Session = Depends(get_db),
-    history_service: TransactionHistoryService = Depends(get_transaction_history_service)
-):
-    """
-    Генерация отчета по истории транзакций с фильтрацией.
-    """
-    logger.info(f"Генерация отчета по транзакциям: user_id={user_id}, status={status}, format={format}")
-    
-    # Установка значений по умолчанию для дат, если не указаны
-    if end_date is None:
-        end_date = datetime.utcnow()
-    if start_date is None:
-        start_date = end_date - timedelta(days=30)  # По умолчанию отчет за 30 дней
-    
-    # Получаем все записи истории для отчета (без пагинации)
-    history_records = []
-    
-    # Используем TransactionHistoryService для получения данных с учетом фильтров
-    page = 1
-    page_size = 1000  # Большой размер страницы для уменьшения количества запросов
-    
-    while True:
-        response = history_service.get_transactions_history(
-            user_id=user_id,
-            status=status,
-            start_date=start_date,
-            end_date=end_date,
-            page=page,
-            page_size=page_size
-        )
-        
-        if not response.items:
-            break
-            
-        history_records.extend(response.items)
-        
-        if page >= response.pages:
-            break
-            
-        page += 1
-    
-    if not history_records:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Не найдено записей истории транзакций с указанными параметрами"
-        )
-    
-    if format.lower() == "csv":
-        # Создаем CSV отчет
-        output = io.StringIO()
-        fieldnames = ["id", "transaction_id", "previous_status", "new_status", 
-                     "timestamp", "initiator_id", "initiator_type", "reason", "extra_data"]
-        
-        writer = csv.DictWriter(output, fieldnames=fieldnames)
-        writer.writeheader()
-        
-        for record in history_records:
-            writer.writerow({
-                "id": record.id,
-                "transaction_id": record.transaction_id,
-                "previous_status": record.previous_status.value if record.previous_status else None,
-                "new_status": record.new_status.value,
-                "timestamp": record.timestamp.isoformat(),
-                "initiator_id": record.initiator_id,
-                "initiator_type": record.initiator_type,
-                "reason": record.reason,
-                "extra_data": json.dumps(record.extra_data) if record.extra_data else None
-            })
-        
-        filename = f"transaction_report_{start_date.strftime('%Y%m%d')}_to_{end_date.strftime('%Y%m%d')}.csv"
-        return Response(
-            content=output.getvalue(),
-            media_type="text/csv",
-            headers={
-                "Content-Disposition": f"attachment; filename={filename}"
-            }
-        )
-    
-    elif format.lower() == "json":
-        # Создаем JSON отчет
-        report_data = []
-        for record in history_records:
-            report_data.append({
-                "id": record.id,
-                "transaction_id": record.transaction_id,
-                "previous_status": record.previous_status.value if record.previous_status else None,
-                "new_status": record.new_status.value,
-                "timestamp": record.timestamp.isoformat(),
-                "initiator_id": record.initiator_id,
-                "initiator_type": record.initiator_type,
-                "reason": record.reason,
-                "extra_data": record.extra_data
-            })
-            
-        filename = f"transaction_report_{start_date.strftime('%Y%m%d')}_to_{end_date.strftime('%Y%m%d')}.json"
-        return Response(
-            content=json.dumps(report_data, ensure_ascii=False),
-            media_type="application/json",
-            headers={
-                "Content-Disposition": f"attachment; filename={filename}"
-            }
-        )
-    
-    else:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail=f"Неподдерживаемый формат экспорта: {format}. Поддерживаемые форматы: csv, json"
-        ) 
\ No newline at end of file
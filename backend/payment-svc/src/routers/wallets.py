@@ -2,29 +2,37 @@
 Маршруты API для работы с кошельками
 """
 
+import asyncio
+import ipaddress
 from typing import List, Dict, Any, Optional
-from fastapi import APIRouter, Depends, HTTPException, Query, Body, Path, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Query, Body, Path, Header, Request, status
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
-from datetime import datetime
+import orjson
 
 from ..database.connection import get_db
-from ..models.wallet import Currency, WalletStatus
+from ..models.wallet import Currency, Wallet, WalletStatus
 from ..models.transaction import TransactionStatus
+from ..schemas.base import page_count
 from ..schemas.wallet import (
-    WalletCreate, WalletTransactionResponseMinimal, WalletUpdate, WalletResponse, WalletListResponse,
+    WalletCreate, WalletCurrencyConversionResponse, WalletUpdate, WalletResponse, WalletListResponse,
     WalletBalanceResponse, WalletTransactionResponse, WalletTransactionListResponse,
     CurrencyConversionRequest, WithdrawalRequest, WithdrawalVerificationRequest,
     WithdrawalResponse, WithdrawalListResponse, WalletTransactionCreate
 )
-from ..services.wallet_service import get_wallet_service, WalletService
-from ..services.stripe_service import get_stripe_service, StripeService
-from ..dependencies import get_current_user, get_current_admin_user
-from ..dependencies.auth import get_token
-from ..services.auth_service import AuthService, UserInfo
+from ..services.wallet_service import get_wallet_service, WalletService, get_wallet_read_service, WalletReadService
+from ..services.stripe_service import get_stripe_service, StripeService, verify_webhook_signature
+from ..services.stripe_webhook_queue import publish_stripe_webhook
+from ..dependencies import get_current_user, get_current_admin_user, get_full_user_data, load_full_user_data
+from ..services.auth_service import UserInfo
+from ..config.settings import get_settings
+
+settings = get_settings()
 
 router = APIRouter(
     prefix="/wallets",
     tags=["wallets"],
+    default_response_class=ORJSONResponse,
     responses={
         401: {"description": "Пользователь не авторизован"},
         403: {"description": "Нет прав доступа"},
@@ -33,13 +41,125 @@ router = APIRouter(
     }
 )
 
-async def get_full_user_data(userInfo: UserInfo = Depends(get_current_user)):
-    """Получает полные данные пользователя из auth-svc"""
-    auth_service = AuthService()
-    user_data = await auth_service.get_user_data(userInfo.token)
-    if not user_data:
-        raise HTTPException(status_code=401, detail="Не удалось получить данные пользователя")
-    return user_data
+# Направление движения средств по типу транзакции кошелька (все, кроме credit, - списание)
+_TRANSACTION_DIRECTION = {"credit": "in"}.get
+
+def _withdrawal_row(w, extra_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Данные WithdrawalResponse для транзакции вывода (только чтение атрибутов)"""
+    status = w.status
+    return {
+        "transaction_id": w.id,
+        "status": status.value,
+        "amount": w.amount,
+        "currency": w.currency,
+        "created_at": w.created_at,
+        "updated_at": w.updated_at,
+        "completed_at": w.completed_at,
+        "verification_required": status == TransactionStatus.VERIFICATION_REQUIRED,
+        "verification_id": w.extra_data.get("verification_id"),
+        "withdrawal_method": w.extra_data.get("withdrawal_method", "unknown"),
+        "extra_data": extra_data
+    }
+
+def _paginated(response_cls: Any, rows: List[Any], total: int, page: int, size: int) -> ORJSONResponse:
+    """
+    Ответ списка с пагинацией
+    
+    Страница валидируется адаптером схемы ответа и сериализуется сразу в JSON,
+    без повторной проверки через response_model и jsonable_encoder.
+    size >= 1 гарантируется валидацией параметра.
+    """
+    return ORJSONResponse({
+        "total": total,
+        "items": response_cls.serialize_items(rows),
+        "page": page,
+        "size": size,
+        "pages": page_count(total, size)
+    })
+
+# Сети доверенных прокси разбираются один раз при импорте
+_TRUSTED_PROXY_NETWORKS = tuple(
+    ipaddress.ip_network(network.strip(), strict=False)
+    for network in settings.TRUSTED_PROXY_NETWORKS.split(",") if network.strip()
+)
+
+def _is_trusted_proxy(address: str) -> bool:
+    """Адрес принадлежит одной из сетей доверенных прокси"""
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in _TRUSTED_PROXY_NETWORKS)
+
+def _client_ip(request: Request) -> Optional[str]:
+    """
+    IP-адрес клиента
+    
+    X-Forwarded-For учитывается, только если соединение пришло от доверенного
+    прокси. Каждый прокси дописывает адрес своего клиента в конец заголовка,
+    поэтому адреса перебираются справа налево до первого недоверенного: левые
+    записи клиент может подставить сам.
+    """
+    client_host = request.client.host if request.client else None
+    if client_host is None or not _is_trusted_proxy(client_host):
+        return client_host
+    
+    forwarded_for = request.headers.get("x-forwarded-for")
+    if not forwarded_for:
+        return client_host
+    
+    hops = [hop.strip() for hop in forwarded_for.split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not _is_trusted_proxy(hop):
+            return hop
+    # Вся цепочка состоит из доверенных прокси
+    return hops[0] if hops else client_host
+
+def _check_wallet_access(wallet: Wallet, current_user) -> Wallet:
+    """Владелец и администраторы получают кошелек, остальные - ошибку 403"""
+    if wallet.user_id != current_user.id and not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Недостаточно прав для доступа к этому кошельку")
+    return wallet
+
+async def require_wallet_access(
+    wallet_id: int = Path(..., description="ID кошелька"),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_full_user_data)
+) -> Wallet:
+    """
+    Получает кошелек из пути запроса для изменяющих операций и проверяет доступ к нему
+    
+    Кошелек остается в сессии запроса, поэтому повторное получение
+    по ID в сервисе не выполняет запрос к БД.
+    """
+    wallet = await get_wallet_service(db).get_wallet(wallet_id)
+    return _check_wallet_access(wallet, current_user)
+
+async def require_wallet_read_access(
+    wallet_id: int = Path(..., description="ID кошелька"),
+    wallet_read_service: WalletReadService = Depends(get_wallet_read_service),
+    current_user = Depends(get_full_user_data)
+) -> Wallet:
+    """
+    Получает кошелек из пути запроса для чтения (через асинхронную сессию) и проверяет доступ к нему
+    """
+    wallet = await wallet_read_service.get_wallet(wallet_id)
+    return _check_wallet_access(wallet, current_user)
+
+async def require_wallet_owner_access(
+    wallet_id: int = Path(..., description="ID кошелька"),
+    wallet_read_service: WalletReadService = Depends(get_wallet_read_service),
+    current_user = Depends(get_full_user_data)
+) -> int:
+    """
+    Проверяет доступ к кошельку из пути запроса, когда сам кошелек не нужен
+    
+    Из БД загружается только ID владельца. Возвращает ID кошелька.
+    """
+    owner_id = await wallet_read_service.get_wallet_owner_id(wallet_id)
+    if owner_id != current_user.id and not current_user.is_admin:
+        raise HTTPException(status_code=403, detail="Недостаточно прав для доступа к этому кошельку")
+    return wallet_id
 
 @router.post(
     "",
@@ -58,24 +178,27 @@ async def get_full_user_data(userInfo: UserInfo = Depends(get_current_user)):
 async def create_wallet(
     wallet_data: WalletCreate = Body(..., description="Данные для создания кошелька"),
     db: Session = Depends(get_db),
-    current_user = Depends(get_full_user_data),
-    token: str = Depends(get_token)
+    user_info: UserInfo = Depends(get_current_user)
 ):
     """
     Создает новый кошелек для текущего пользователя.
     """
-    # Если пользователь не админ, разрешаем создать кошелек только для себя
-    if current_user.id != wallet_data.user_id and not current_user.is_admin:
-        raise HTTPException(status_code=403, detail="Недостаточно прав для создания кошелька другому пользователю")
+    # Для своего кошелька достаточно ID из проверенного токена; полные данные
+    # (признак администратора) нужны только при создании кошелька другому пользователю
+    if wallet_data.user_id != user_info.user_id:
+        current_user = await load_full_user_data(user_info)
+        if not current_user.is_admin:
+            raise HTTPException(status_code=403, detail="Недостаточно прав для создания кошелька другому пользователю")
     
     wallet_service = get_wallet_service(db)
-    wallet = await wallet_service.create_wallet(wallet_data, token)
+    wallet = await wallet_service.create_wallet(wallet_data, user_info.token)
     
     return wallet
 
 @router.get(
     "",
-    response_model=WalletListResponse,
+    response_model=None,
+    responses={200: {"model": WalletListResponse}},
     summary="Получение списка кошельков",
     description="""
     Возвращает список кошельков с пагинацией и фильтрацией.
@@ -91,7 +214,7 @@ async def get_wallets(
     size: int = Query(20, ge=1, le=100, description="Размер страницы"),
     user_id: Optional[int] = Query(None, description="Фильтр по ID пользователя"),
     status: Optional[WalletStatus] = Query(None, description="Фильтр по статусу кошелька"),
-    db: Session = Depends(get_db),
+    wallet_read_service: WalletReadService = Depends(get_wallet_read_service),
     current_user = Depends(get_full_user_data)
 ):
     """
@@ -108,23 +231,13 @@ async def get_wallets(
     if status is None:
         status = WalletStatus.ACTIVE
     
-    wallet_service = get_wallet_service(db)
-    wallets, total = await wallet_service.get_wallets(page, size, user_id, status)
-    
-    # Убеждаемся, что wallets это список
-    wallets_list = list(wallets) if wallets is not None else []
-    
-    # Вычисляем общее количество страниц
-    pages = (total + size - 1) // size if total > 0 else 0
+    # Страница и общее количество запрашиваются параллельно
+    wallets, total = await asyncio.gather(
+        wallet_read_service.list_wallets(page, size, user_id, status),
+        wallet_read_service.count_wallets(user_id, status)
+    )
     
-    # Формируем ответ в соответствии с WalletListResponse
-    return {
-        "total": total,
-        "items": wallets_list,  # Используем гарантированно список
-        "page": page,
-        "size": size,
-        "pages": pages
-    }
+    return _paginated(WalletListResponse, wallets, total, page, size)
 
 @router.get(
     "/{wallet_id}",
@@ -139,20 +252,11 @@ async def get_wallets(
     """
 )
 async def get_wallet(
-    wallet_id: int = Path(..., description="ID кошелька"),
-    db: Session = Depends(get_db),
-    current_user = Depends(get_full_user_data)
+    wallet: Wallet = Depends(require_wallet_read_access)
 ):
     """
     Возвращает информацию о кошельке по его ID.
     """
-    wallet_service = get_wallet_service(db)
-    wallet = await wallet_service.get_wallet(wallet_id)
-    
-    # Проверяем права доступа
-    if wallet.user_id != current_user.id and not current_user.is_admin:
-        raise HTTPException(status_code=403, detail="Недостаточно прав для доступа к этому кошельку")
-    
     return wallet
 
 @router.get(
@@ -170,20 +274,14 @@ async def get_wallet(
 )
 async def get_wallet_by_uid(
     wallet_uid: str = Path(..., description="Уникальный идентификатор кошелька"),
-    db: Session = Depends(get_db),
+    wallet_read_service: WalletReadService = Depends(get_wallet_read_service),
     current_user = Depends(get_full_user_data)
 ):
     """
     Возвращает информацию о кошельке по его UID.
     """
-    wallet_service = get_wallet_service(db)
-    wallet = await wallet_service.get_wallet_by_uid(wallet_uid)
-    
-    # Проверяем права доступа
-    if wallet.user_id != current_user.id and not current_user.is_admin:
-        raise HTTPException(status_code=403, detail="Недостаточно прав для доступа к этому кошельку")
-    
-    return wallet
+    wallet = await wallet_read_service.get_wallet_by_uid(wallet_uid)
+    return _check_wallet_access(wallet, current_user)
 
 @router.get(
     "/user/{user_id}",
@@ -199,7 +297,7 @@ async def get_wallet_by_uid(
 )
 async def get_user_wallet(
     user_id: int = Path(..., description="ID пользователя"),
-    db: Session = Depends(get_db),
+    wallet_read_service: WalletReadService = Depends(get_wallet_read_service),
     current_user = Depends(get_full_user_data)
 ):
     """
@@ -209,15 +307,12 @@ async def get_user_wallet(
     if user_id != current_user.id and not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Недостаточно прав для доступа к кошельку другого пользователя")
     
-    wallet_service = get_wallet_service(db)
-    wallet = await wallet_service.get_user_wallet(user_id)
-    
-    return wallet
+    return await wallet_read_service.get_user_wallet(user_id)
 
 @router.patch("/{wallet_id}", response_model=WalletResponse)
 async def update_wallet(
-    wallet_id: int,
     wallet_data: WalletUpdate,
+    wallet: Wallet = Depends(require_wallet_access),
     db: Session = Depends(get_db),
     current_user = Depends(get_full_user_data)
 ):
@@ -225,47 +320,40 @@ async def update_wallet(
     Обновляет информацию о кошельке.
     """
     wallet_service = get_wallet_service(db)
-    wallet = await wallet_service.get_wallet(wallet_id)
-    
-    # Проверяем права доступа
-    if wallet.user_id != current_user.id and not current_user.is_admin:
-        raise HTTPException(status_code=403, detail="Недостаточно прав для изменения кошелька")
     
     # Статус могут менять только админы
     if wallet_data.status is not None and not current_user.is_admin:
         raise HTTPException(status_code=403, detail="Изменение статуса кошелька доступно только администраторам")
     
-    updated_wallet = await wallet_service.update_wallet(wallet_id, wallet_data)
+    updated_wallet = await wallet_service.update_wallet(wallet.id, wallet_data)
     return updated_wallet
 
 @router.get("/{wallet_id}/balance", response_model=WalletBalanceResponse)
 async def get_wallet_balance(
-    wallet_id: int,
+    wallet_id: int = Path(..., description="ID кошелька"),
     db: Session = Depends(get_db),
     current_user = Depends(get_full_user_data)
 ):
     """
     Возвращает текущий баланс кошелька по всем валютам.
     """
+    # Проверка владельца выполняется в том же запросе, что и получение балансов
     wallet_service = get_wallet_service(db)
-    wallet = await wallet_service.get_wallet(wallet_id)
-    
-    # Проверяем права доступа
-    if wallet.user_id != current_user.id and not current_user.is_admin:
-        raise HTTPException(status_code=403, detail="Недостаточно прав для доступа к этому кошельку")
-    
-    balances = await wallet_service.get_wallet_balance(wallet_id)
+    wallet = await wallet_service.get_wallet_with_balances(
+        wallet_id, user_id=None if current_user.is_admin else current_user.id
+    )
     
     return {
         "wallet_id": wallet.id,
         "wallet_uid": wallet.wallet_uid,
-        "balances": balances,
+        "balances": wallet.balances,
         "last_updated": wallet.updated_at or wallet.created_at
     }
 
 @router.get(
     "/{wallet_id}/transactions",
-    response_model=WalletTransactionListResponse,
+    response_model=None,
+    responses={200: {"model": WalletTransactionListResponse}},
     summary="Получение транзакций кошелька",
     description="""
     Возвращает историю транзакций кошелька с пагинацией.
@@ -277,72 +365,46 @@ async def get_wallet_balance(
     """
 )
 async def get_wallet_transactions(
-    wallet_id: int = Path(..., description="ID кошелька"),
+    wallet_id: int = Depends(require_wallet_owner_access),
     page: int = Query(1, ge=1, description="Номер страницы"),
     size: int = Query(20, ge=1, le=100, description="Размер страницы"),
     currency: Optional[Currency] = Query(None, description="Фильтр по валюте"),
-    db: Session = Depends(get_db),
-    current_user = Depends(get_full_user_data)
+    wallet_read_service: WalletReadService = Depends(get_wallet_read_service)
 ):
     """
     Возвращает историю транзакций кошелька с пагинацией.
     """
-    wallet_service = get_wallet_service(db)
-    wallet = await wallet_service.get_wallet(wallet_id)
-    
-    # Проверяем права доступа
-    if wallet.user_id != current_user.id and not current_user.is_admin:
-        raise HTTPException(status_code=403, detail="Недостаточно прав для доступа к этому кошельку")
-    
-    transactions, total = await wallet_service.get_wallet_transactions(
-        wallet_id=wallet_id,
-        page=page,
-        page_size=size,
-        currency=currency
+    # Страница и общее количество запрашиваются параллельно
+    transactions, total = await asyncio.gather(
+        wallet_read_service.list_wallet_transactions(wallet_id, page, size, currency),
+        wallet_read_service.count_wallet_transactions(wallet_id, currency)
     )
     
-    # Убеждаемся, что transactions это список
-    transactions_list = list(transactions) if transactions is not None else []
-    
-    # Вычисляем общее количество страниц
-    pages = (total + size - 1) // size if total > 0 else 0
-    
-    # Преобразуем записи модели WalletTransaction в формат ответа WalletTransactionResponse
-    response_items = []
-    for tx in transactions_list:
-        # Определяем direction на основе типа транзакции
-        direction = "in" if tx.type == "credit" else "out"
-        
-        # Статус для wallet transactions всегда completed
-        status = "completed"
-        
-        # Создаем объект ответа
-        response_item = {
+    # Преобразуем записи модели WalletTransaction в формат ответа WalletTransactionResponse.
+    # Статус для wallet transactions всегда completed, у WalletTransaction нет поля updated_at
+    direction = _TRANSACTION_DIRECTION
+    response_items = [
+        {
             "id": tx.id,
             "wallet_id": tx.wallet_id,
             "amount": tx.amount,
             "currency": tx.currency,
-            "direction": direction,
+            "direction": direction(tx.type, "out"),
             "type": tx.type,
-            "status": status,
+            "status": "completed",
             "description": tx.description,
             "created_at": tx.created_at,
-            "updated_at": None,  # У WalletTransaction нет поля updated_at
+            "updated_at": None,
             "extra_data": tx.extra_data
         }
-        response_items.append(response_item)
+        for tx in transactions
+    ]
     
-    return {
-        "total": total,
-        "items": response_items,
-        "page": page,
-        "size": size,
-        "pages": pages
-    }
+    return _paginated(WalletTransactionListResponse, response_items, total, page, size)
 
 @router.post(
     "/{wallet_id}/convert",
-    response_model=Dict[str, Any],
+    response_model=WalletCurrencyConversionResponse,
     summary="Конвертация валюты",
     description="""
     Конвертирует валюту внутри кошелька.
@@ -354,50 +416,27 @@ async def get_wallet_transactions(
     """
 )
 async def convert_currency(
-    wallet_id: int = Path(..., description="ID кошелька"),
+    wallet: Wallet = Depends(require_wallet_access),
     conversion_data: CurrencyConversionRequest = Body(..., description="Данные для конвертации"),
-    db: Session = Depends(get_db),
-    current_user = Depends(get_full_user_data)
+    db: Session = Depends(get_db)
 ):
     """
     Конвертирует валюту внутри кошелька.
     """
     wallet_service = get_wallet_service(db)
-    wallet = await wallet_service.get_wallet(wallet_id)
-    
-    # Проверяем права доступа
-    if wallet.user_id != current_user.id and not current_user.is_admin:
-        raise HTTPException(status_code=403, detail="Недостаточно прав для операций с этим кошельком")
-    
-    debit_tx, credit_tx = await wallet_service.convert_currency(wallet_id, conversion_data)
-    debit_tx_response = WalletTransactionResponseMinimal(
-        id=debit_tx.id,
-        wallet_id=debit_tx.wallet_id,
-        amount=debit_tx.amount,
-        currency=debit_tx.currency,
-        type=debit_tx.type,
-
-        created_at=debit_tx.created_at,
-    )
-    credit_tx_response = WalletTransactionResponseMinimal(
-        id=credit_tx.id,
-        wallet_id=credit_tx.wallet_id,
-        amount=credit_tx.amount,
-        currency=credit_tx.currency,
-        type=credit_tx.type,
-        created_at=credit_tx.created_at,
-    )
+    debit_tx, credit_tx = await wallet_service.convert_currency(wallet.id, conversion_data)
     
+    # Транзакции валидируются из атрибутов моделей один раз - через response_model
     return {
         "success": True,
-        "debit_transaction": debit_tx_response,
-        "credit_transaction": credit_tx_response,
+        "debit_transaction": debit_tx,
+        "credit_transaction": credit_tx,
         "exchange_rate": credit_tx.amount / debit_tx.amount
     }
 
 @router.post("/{wallet_id}/deposit", response_model=Dict[str, Any])
 async def create_deposit(
-    wallet_id: int,
+    wallet: Wallet = Depends(require_wallet_access),
     amount: float = Body(..., gt=0, description="Сумма пополнения"),
     currency: Currency = Body(..., description="Валюта пополнения"),
     description: Optional[str] = Body(None, description="Описание платежа"),
@@ -408,11 +447,6 @@ async def create_deposit(
     Создает платежное намерение для пополнения кошелька через Stripe.
     """
     wallet_service = get_wallet_service(db)
-    wallet = await wallet_service.get_wallet(wallet_id)
-    
-    # Проверяем права доступа
-    if wallet.user_id != current_user.id and not current_user.is_admin:
-        raise HTTPException(status_code=403, detail="Недостаточно прав для операций с этим кошельком")
     
     # Добавляем информацию о пользователе в метаданные
     metadata = {
@@ -421,7 +455,7 @@ async def create_deposit(
     }
     
     deposit_result = await wallet_service.create_deposit(
-        wallet_id=wallet_id,
+        wallet_id=wallet.id,
         amount=amount,
         currency=currency,
         description=description,
@@ -484,28 +518,36 @@ async def simulate_successful_deposit(
         "result": result
     }
 
-@router.post("/webhooks/stripe", response_model=Dict[str, Any])
+@router.post("/webhooks/stripe", response_model=Dict[str, Any], status_code=status.HTTP_202_ACCEPTED)
 async def process_stripe_webhook(
-    event_data: Dict[str, Any] = Body(...),
-    background_tasks: BackgroundTasks = None,
-    db: Session = Depends(get_db)
+    request: Request,
+    stripe_signature: Optional[str] = Header(None, alias="Stripe-Signature")
 ):
     """
-    Обрабатывает webhook-уведомления от Stripe.
+    Принимает webhook-уведомления от Stripe.
+    
+    Подпись проверяется по исходному телу запроса до его разбора, событие
+    ставится в очередь и обрабатывается обработчиком очереди, поэтому ответ
+    не ждет обращений к БД и Stripe API.
     """
-    wallet_service = get_wallet_service(db)
+    payload = await request.body()
     
-    # В реальном приложении здесь нужно проверить подпись webhook
-    # и запустить обработку в фоновой задаче
-
-    if background_tasks:
-        # Обработка в фоновой задаче для быстрого ответа
-        background_tasks.add_task(wallet_service.process_payment_webhook, event_data)
-        return {"status": "processing"}
-    else:
-        # Синхронная обработка
-        result = await wallet_service.process_payment_webhook(event_data)
-        return result
+    if settings.STRIPE_WEBHOOK_SECRET:
+        verify_webhook_signature(
+            payload, stripe_signature, settings.STRIPE_WEBHOOK_SECRET, settings.STRIPE_WEBHOOK_TOLERANCE
+        )
+    
+    try:
+        event_data = orjson.loads(payload)
+    except orjson.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="Некорректное тело webhook")
+    
+    if not isinstance(event_data, dict):
+        raise HTTPException(status_code=400, detail="Некорректное тело webhook")
+    
+    # В очередь передается исходное тело - повторная сериализация не нужна
+    message_id = await publish_stripe_webhook(payload)
+    return {"status": "queued", "id": message_id}
 
 @router.get("/admin/health", response_model=Dict[str, Any])
 async def stripe_health_check(
@@ -529,30 +571,23 @@ async def stripe_health_check(
 
 @router.post("/{wallet_id}/withdraw", response_model=WithdrawalResponse)
 async def create_withdrawal_request(
-    wallet_id: int,
     withdrawal_data: WithdrawalRequest,
-    request_ip: str = Query(None, description="IP-адрес клиента"),
-    db: Session = Depends(get_db),
-    current_user = Depends(get_full_user_data)
+    request: Request,
+    wallet: Wallet = Depends(require_wallet_access),
+    db: Session = Depends(get_db)
 ):
     """
     Создает запрос на вывод средств с кошелька.
     Требует верификации перед обработкой.
     """
     wallet_service = get_wallet_service(db)
-    wallet = await wallet_service.get_wallet(wallet_id)
     
-    # Проверяем права доступа
-    if wallet.user_id != current_user.id and not current_user.is_admin:
-        raise HTTPException(status_code=403, detail="Недостаточно прав для операций с этим кошельком")
-    
-    # Добавляем IP в данные запроса, если не указан
-    if not withdrawal_data.request_ip and request_ip:
-        withdrawal_data.request_ip = request_ip
+    # IP берется из соединения (или от прокси), а не из данных клиента
+    withdrawal_data.request_ip = _client_ip(request)
     
     # Создаем запрос на вывод
     withdrawal_result = await wallet_service.create_withdrawal_request(
-        wallet_id=wallet_id,
+        wallet_id=wallet.id,
         withdrawal_data=withdrawal_data
     )
     
@@ -561,7 +596,7 @@ async def create_withdrawal_request(
         status=withdrawal_result["status"],
         amount=withdrawal_result["amount"],
         currency=withdrawal_result["currency"],
-        created_at=datetime.now(),  # В реальном приложении брали бы из БД
+        created_at=withdrawal_result["created_at"],
         verification_required=withdrawal_result["verification_required"],
         verification_id=withdrawal_result.get("verification_id"),
         withdrawal_method=withdrawal_data.withdrawal_method,
@@ -645,7 +680,7 @@ async def cancel_withdrawal(
         amount=result["amount"],
         currency=result["currency"],
         created_at=transaction.created_at,
-        updated_at=datetime.now(),
+        updated_at=result["updated_at"],
         verification_required=False,
         withdrawal_method=transaction.extra_data.get("withdrawal_method", "unknown"),
         extra_data={
@@ -653,117 +688,62 @@ async def cancel_withdrawal(
         }
     )
 
-@router.get("/withdrawals", response_model=WithdrawalListResponse)
+@router.get("/withdrawals", response_model=None, responses={200: {"model": WithdrawalListResponse}})
 async def get_withdrawal_requests(
     page: int = Query(1, ge=1, description="Номер страницы"),
     size: int = Query(20, ge=1, le=100, description="Размер страницы"),
     status: Optional[TransactionStatus] = Query(None, description="Фильтр по статусу"),
-    db: Session = Depends(get_db),
+    wallet_read_service: WalletReadService = Depends(get_wallet_read_service),
     current_user = Depends(get_full_user_data)
 ):
     """
     Возвращает историю запросов на вывод средств текущего пользователя.
     """
-    wallet_service = get_wallet_service(db)
-    
-    # Получаем запросы на вывод пользователя
-    withdrawals, total = await wallet_service.get_withdrawal_requests(
-        user_id=current_user.id,
-        page=page,
-        page_size=size,
-        status=status
+    # Получаем страницу запросов на вывод пользователя и их количество параллельно
+    withdrawals, total = await asyncio.gather(
+        wallet_read_service.list_withdrawals(page, size, user_id=current_user.id, status=status),
+        wallet_read_service.count_withdrawals(user_id=current_user.id, status=status)
     )
     
-    # Убеждаемся, что withdrawals это список
-    withdrawals_list = list(withdrawals) if withdrawals is not None else []
-    
-    # Вычисляем общее количество страниц
-    pages = (total + size - 1) // size if total > 0 else 0
-    
-    # Преобразуем результаты в ответ
-    items = [
-        WithdrawalResponse(
-            transaction_id=w.id,
-            status=w.status.value,
-            amount=w.amount,
-            currency=w.currency.value,
-            created_at=w.created_at,
-            updated_at=w.updated_at,
-            completed_at=w.completed_at,
-            verification_required=w.status == TransactionStatus.VERIFICATION_REQUIRED,
-            verification_id=w.extra_data.get("verification_id"),
-            withdrawal_method=w.extra_data.get("withdrawal_method", "unknown"),
-            extra_data={
-                "payout_details": w.extra_data.get("payout_details")
-            }
-        )
-        for w in withdrawals_list
+    # Преобразуем результаты в ответ одной валидацией всего списка
+    rows = [
+        _withdrawal_row(w, {
+            "payout_details": w.extra_data.get("payout_details")
+        })
+        for w in withdrawals
     ]
     
-    return {
-        "total": total,
-        "items": items,
-        "page": page,
-        "size": size,
-        "pages": pages
-    }
+    return _paginated(WithdrawalListResponse, rows, total, page, size)
 
-@router.get("/admin/withdrawals", response_model=WithdrawalListResponse)
+@router.get("/admin/withdrawals", response_model=None, responses={200: {"model": WithdrawalListResponse}})
 async def admin_get_withdrawal_requests(
     page: int = Query(1, ge=1, description="Номер страницы"),
     size: int = Query(20, ge=1, le=100, description="Размер страницы"),
     status: Optional[TransactionStatus] = Query(None, description="Фильтр по статусу"),
-    db: Session = Depends(get_db),
+    wallet_read_service: WalletReadService = Depends(get_wallet_read_service),
     current_user = Depends(get_current_admin_user)
 ):
     """
     Возвращает историю всех запросов на вывод средств (только для администраторов).
     """
-    wallet_service = get_wallet_service(db)
-    
-    # Получаем все запросы на вывод
-    withdrawals, total = await wallet_service.get_admin_withdrawal_requests(
-        page=page,
-        page_size=size,
-        status=status
+    # Получаем страницу всех запросов на вывод и их количество параллельно
+    withdrawals, total = await asyncio.gather(
+        wallet_read_service.list_withdrawals(page, size, status=status),
+        wallet_read_service.count_withdrawals(status=status)
     )
     
-    # Убеждаемся, что withdrawals это список
-    withdrawals_list = list(withdrawals) if withdrawals is not None else []
-    
-    # Вычисляем общее количество страниц
-    pages = (total + size - 1) // size if total > 0 else 0
-    
-    # Преобразуем результаты в ответ
-    items = [
-        WithdrawalResponse(
-            transaction_id=w.id,
-            status=w.status.value,
-            amount=w.amount,
-            currency=w.currency.value,
-            created_at=w.created_at,
-            updated_at=w.updated_at,
-            completed_at=w.completed_at,
-            verification_required=w.status == TransactionStatus.VERIFICATION_REQUIRED,
-            verification_id=w.extra_data.get("verification_id"),
-            withdrawal_method=w.extra_data.get("withdrawal_method", "unknown"),
-            extra_data={
-                "user_id": w.user_id,
-                "wallet_id": w.wallet_id,
-                "payout_details": w.extra_data.get("payout_details"),
-                "request_ip": w.extra_data.get("request_ip")
-            }
-        )
-        for w in withdrawals_list
+    # Преобразуем результаты в ответ одной валидацией всего списка
+    rows = [
+        _withdrawal_row(w, {
+            "user_id": w.extra_data.get("user_id"),
+            "wallet_id": w.wallet_id,
+            "payout_details": w.extra_data.get("payout_details"),
+            "request_ip": w.extra_data.get("request_ip")
+        })
+        for w in withdrawals
     ]
     
-    return {
-        "total": total,
-        "items": items,
-        "page": page,
-        "size": size,
-        "pages": pages
-    }
+    return _paginated(WithdrawalListResponse, rows, total, page, size)
 
 @router.post("/admin/withdrawals/{transaction_id}/approve", response_model=WithdrawalResponse)
 async def admin_approve_withdrawal(
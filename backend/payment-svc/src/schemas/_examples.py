@@ -0,0 +1,51 @@
+"""
+Примеры базовых схем для документации OpenAPI
+
+Примеры не входят в конфигурацию моделей и добавляются только в итоговую
+схему OpenAPI (см. custom_openapi в main.py).
+"""
+
+from typing import Any, Dict
+
+# Пример по имени схемы; для параметризованных схем имя компонента
+# начинается с имени класса
+SCHEMA_EXAMPLES: Dict[str, Dict[str, Any]] = {
+    "PaginationParams": {
+        "page": 1,
+        "limit": 20
+    },
+    "ErrorResponse": {
+        "success": False,
+        "error": "Ресурс не найден",
+        "code": 404,
+        "details": None
+    },
+    "SuccessEnvelope": {
+        "success": True,
+        "data": {},
+        "meta": {
+            "total": 100,
+            "page": 1,
+            "limit": 20
+        }
+    },
+}
+
+
+def apply_schema_examples(openapi_schema: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Добавить примеры в компоненты схемы OpenAPI
+    
+    Args:
+        openapi_schema: Схема OpenAPI приложения
+        
+    Returns:
+        Та же схема с примерами
+    """
+    components = openapi_schema.get("components", {}).get("schemas", {})
+    for name, component in components.items():
+        for prefix, example in SCHEMA_EXAMPLES.items():
+            if name == prefix or name.startswith(prefix + "_"):
+                component.setdefault("example", example)
+                break
+    return openapi_schema
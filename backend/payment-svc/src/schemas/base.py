@@ -1,26 +1,90 @@
-from typing import Any, Generic, Optional, TypeVar, List, Dict
-from pydantic import BaseModel, Field, computed_field, ConfigDict
+from functools import cached_property, lru_cache
+from operator import attrgetter
+from decimal import Decimal
+from typing import Any, Callable, Optional, Tuple, Type, TypeVar, List, Dict
+import orjson
+from fastapi import Response
+from pydantic import BaseModel, ConfigDict, Field, TypeAdapter, computed_field
+
+M = TypeVar('M', bound=BaseModel)
+
+
+@lru_cache(maxsize=None)
+def _orm_fields(model_cls: Type[BaseModel]) -> Tuple[Tuple[str, ...], Callable[[Any], Any]]:
+    """Имена полей схемы и функция, читающая их из объекта одним вызовом"""
+    names = tuple(model_cls.model_fields)
+    getter = attrgetter(*names)
+    if len(names) == 1:
+        return names, lambda obj: (getter(obj),)
+    return names, getter
+
+
+def from_orm_fast(model_cls: Type[M], obj: Any) -> M:
+    """
+    Создать схему ответа из доверенной ORM-модели без валидации полей
+    
+    Значения берутся из атрибутов объекта как есть (model_construct), поэтому
+    функция подходит только для строк БД, типы колонок которых уже совпадают
+    с типами полей схемы. Входные данные клиента по-прежнему валидируются
+    через model_validate.
+    
+    Args:
+        model_cls: Класс схемы ответа
+        obj: ORM-объект
+        
+    Returns:
+        Экземпляр схемы
+    """
+    names, getter = _orm_fields(model_cls)
+    return model_cls.model_construct(**dict(zip(names, getter(obj))))
+
+
+def serialize_items(adapter: TypeAdapter, rows: List[Any]) -> orjson.Fragment:
+    """
+    Валидировать строки страницы и сериализовать их в JSON
+    
+    Список сериализуется pydantic-core сразу в байты JSON; orjson встраивает
+    готовый фрагмент в ответ без повторного обхода элементов.
+    
+    Args:
+        adapter: Адаптер списка схем, построенный при импорте
+        rows: Элементы страницы (схемы, словари или ORM-объекты)
+        
+    Returns:
+        Фрагмент JSON для ORJSONResponse
+    """
+    return orjson.Fragment(adapter.dump_json(adapter.validate_python(rows)))
+
+
+def page_count(total: int, size: int) -> int:
+    """Количество страниц: деление с округлением вверх, 0 при нулевом размере страницы"""
+    return -(-total // size) if size else 0
+
+
+class PageCountMixin(BaseModel):
+    """
+    Поле pages для списков с пагинацией, вычисляемое по total и size при сериализации
+    
+    Поля total и size объявляются в самих схемах списков.
+    """
+    # Схемы списков описывают только ответы: pages должен попасть в OpenAPI
+    model_config = ConfigDict(json_schema_mode_override="serialization")
+
+    @computed_field(description="Общее количество страниц")
+    @property
+    def pages(self) -> int:
+        return page_count(self.total, self.size)
 
-T = TypeVar('T')
 
 class PaginationParams(BaseModel):
     """Параметры пагинации для API"""
     page: int = Field(1, ge=1, description="Номер страницы (от 1)")
     limit: int = Field(20, ge=1, le=100, description="Количество элементов на странице (от 1 до 100)")
 
-    @computed_field
-    @property
+    @cached_property
     def skip(self) -> int:
+        """Смещение первой записи страницы (вычисляется один раз, в сериализацию не входит)"""
         return (self.page - 1) * self.limit
-    
-    model_config = ConfigDict(
-        json_schema_extra={
-            "example": {
-                "page": 1,
-                "limit": 20
-            }
-        }
-    )
 
 class ErrorResponse(BaseModel):
     """Схема ответа с ошибкой"""
@@ -28,34 +92,38 @@ class ErrorResponse(BaseModel):
     error: str = Field(..., description="Сообщение об ошибке")
     code: int = Field(..., description="HTTP-код ошибки")
     details: Optional[Any] = Field(None, description="Дополнительная информация об ошибке")
-    
-    model_config = ConfigDict(
-        json_schema_extra={
-            "example": {
-                "success": False,
-                "error": "Ресурс не найден",
-                "code": 404,
-                "details": None
-            }
-        }
-    )
-
-class SuccessResponse(BaseModel, Generic[T]):
-    """Схема успешного ответа"""
+
+class SuccessEnvelope(BaseModel):
+    """Схема успешного ответа (только для документации OpenAPI, ответ строит success)"""
     success: bool = Field(default=True, description="Статус выполнения (всегда True для успешных запросов)")
-    data: T = Field(..., description="Данные ответа")
+    data: Any = Field(..., description="Данные ответа")
     meta: Optional[Dict[str, Any]] = Field(None, description="Метаданные ответа")
 
-    model_config = ConfigDict(
-        json_schema_extra={
-            "example": {
-                "success": True,
-                "data": {},
-                "meta": {
-                    "total": 100,
-                    "page": 1,
-                    "limit": 20
-                }
-            }
-        }
+
+def _json_default(value: Any) -> Any:
+    """Сериализация типов, которые orjson не поддерживает"""
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Тип {type(value).__name__} не сериализуется в JSON")
+
+
+def success(data: Any, meta: Optional[Dict[str, Any]] = None) -> Response:
+    """
+    Успешный ответ в формате {"success": true, "data": ..., "meta": ...}
+    
+    Конверт сериализуется orjson напрямую, без отдельной параметризованной
+    схемы (и ее валидатора) для каждого типа данных.
+    
+    Args:
+        data: Данные ответа
+        meta: Метаданные ответа
+        
+    Returns:
+        JSON-ответ
+    """
+    return Response(
+        orjson.dumps({"success": True, "data": data, "meta": meta}, default=_json_default),
+        media_type="application/json"
     )
\ No newline at end of file
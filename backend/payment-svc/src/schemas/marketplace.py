@@ -2,6 +2,11 @@ from typing import List, Optional, Dict, Any
 from pydantic import BaseModel, Field, ConfigDict
 from datetime import datetime
 
+from .base import PageCountMixin
+
+# Схемы статистики продавца объявлены в statistics.py и переиспользуются здесь
+from .statistics import MonthlySale, GameDistribution, SellerStatisticsResponse, TransactionSummaryResponse
+
 # Схемы для ожидающих подтверждения продаж
 class GameInfo(BaseModel):
     """Информация об игре для продажи"""
@@ -23,48 +28,11 @@ class PendingSaleResponse(BaseModel):
     expiresAt: Optional[str] = None
     gameInfo: Optional[GameInfo] = None
 
-    model_config = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(from_attributes=True, frozen=True)
 
-class PendingSaleListResponse(BaseModel):
+class PendingSaleListResponse(PageCountMixin):
     """Схема ответа для списка ожидающих подтверждения продаж с пагинацией"""
     items: List[PendingSaleResponse]
     total: int
     page: int
     size: int
-    pages: int
-
-# Схемы для статистики продавца
-class MonthlySale(BaseModel):
-    """Ежемесячные продажи"""
-    month: str
-    sales: int
-    revenue: float
-
-class GameDistribution(BaseModel):
-    """Распределение продаж по играм"""
-    game: str
-    sales: int
-    percentage: float
-
-class SellerStatisticsResponse(BaseModel):
-    """Статистика продавца"""
-    totalSales: int
-    totalRevenue: float
-    averagePrice: float
-    popularGame: str
-    completionRate: float
-    returnRate: float
-    pendingTransactions: int
-    monthlySales: List[MonthlySale]
-    gameDistribution: List[GameDistribution]
-
-    model_config = ConfigDict(from_attributes=True)
-
-class TransactionSummaryResponse(BaseModel):
-    """Сводка по транзакциям"""
-    key: str
-    count: int
-    amount: float
-    percentage: float
-
-    model_config = ConfigDict(from_attributes=True) 
\ No newline at end of file
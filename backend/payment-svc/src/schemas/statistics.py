@@ -3,7 +3,7 @@
 """
 
 from typing import List, Optional, Dict, Any
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from datetime import datetime
 
 class MonthlySale(BaseModel):
@@ -12,8 +12,7 @@ class MonthlySale(BaseModel):
     sales: int
     revenue: float
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class GameDistribution(BaseModel):
     """Распределение продаж по играм"""
@@ -21,8 +20,7 @@ class GameDistribution(BaseModel):
     sales: int
     percentage: float
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class SellerStatisticsResponse(BaseModel):
     """Статистика продавца"""
@@ -36,8 +34,7 @@ class SellerStatisticsResponse(BaseModel):
     monthlySales: List[MonthlySale]
     gameDistribution: List[GameDistribution]
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class TransactionSummaryResponse(BaseModel):
     """Сводка по транзакциям"""
@@ -46,8 +43,7 @@ class TransactionSummaryResponse(BaseModel):
     amount: float
     percentage: float
 
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class PopularGame(BaseModel):
     """Популярная игра"""
@@ -56,5 +52,4 @@ class PopularGame(BaseModel):
     logo_url: Optional[str] = None
     sales: int
 
-    class Config:
-        orm_mode = True 
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True) 
\ No newline at end of file
@@ -1,9 +1,12 @@
-from pydantic import BaseModel, Field, validator, ConfigDict
+import orjson
+from enum import IntFlag
+from pydantic import BaseModel, Field, computed_field, model_validator, ConfigDict, AliasPath, TypeAdapter
 from typing import Optional, Dict, Any, List, Union
 from datetime import datetime
 from uuid import UUID
 from ..models.transaction import TransactionStatus, TransactionType
 from .transaction_history import TransactionHistoryResponse
+from .base import PageCountMixin, serialize_items
 
 class TransactionBase(BaseModel):
     """Базовая схема для транзакций"""
@@ -28,13 +31,12 @@ class TransactionCreate(TransactionBase):
     expiration_date: Optional[datetime] = Field(default=None, description="Дата истечения срока транзакции")
     days_to_complete: Optional[int] = Field(default=3, description="Количество дней на завершение транзакции")
 
-    @validator('buyer_id', 'seller_id')
-    def validate_users(cls, v, values):
+    @model_validator(mode="after")
+    def validate_users(self) -> "TransactionCreate":
         """Проверка наличия хотя бы одного пользователя для транзакции"""
-        if 'type' in values and values['type'] == TransactionType.PURCHASE:
-            if not v and 'buyer_id' not in values and 'seller_id' not in values:
-                raise ValueError("Transaction must have at least one user (buyer or seller)")
-        return v
+        if self.type == TransactionType.PURCHASE and not self.buyer_id and not self.seller_id:
+            raise ValueError("Transaction must have at least one user (buyer or seller)")
+        return self
 
 class TransactionUpdate(BaseModel):
     """Схема для обновления транзакции"""
@@ -54,10 +56,12 @@ class TransactionDisputeCreate(BaseModel):
 class TransactionActionResponse(BaseModel):
     """Схема для ответа с доступными действиями для транзакции"""
     actions: List[str] = Field(..., description="Список доступных действий")
+    
+    model_config = ConfigDict(frozen=True)
 
 class TransactionResponse(TransactionBase):
     """Схема для ответа с транзакцией"""
-    model_config = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(from_attributes=True, frozen=True)
 
     id: int
     transaction_uid: str
@@ -80,27 +84,183 @@ class TransactionResponse(TransactionBase):
     wallet_id: Optional[int] = None
     parent_transaction_id: Optional[int] = None
 
-class TransactionListResponse(BaseModel):
+class TransactionListResponse(PageCountMixin):
     """Схема для списка транзакций с пагинацией"""
     total: int
     items: List[TransactionResponse]
     page: int
     size: int
-    pages: int 
+
+    @classmethod
+    def serialize_items(cls, rows: List[Any]) -> orjson.Fragment:
+        """Элементы страницы в виде фрагмента JSON для ORJSONResponse"""
+        return serialize_items(_TRANSACTION_LIST_ADAPTER, rows)
+
+
+class ParticipantView(BaseModel):
+    """Проекция данных пользователя из auth-сервиса для страницы деталей транзакции"""
+    id: Optional[int] = None
+    username: Optional[str] = None
+    email: Optional[str] = None
+    avatar: Optional[str] = Field(default=None, validation_alias=AliasPath("profile", "avatar_url"))
+    rating: Optional[Union[int, float]] = Field(default=0, validation_alias=AliasPath("profile", "rating"))
+    registration_date: Optional[str] = Field(default=None, validation_alias="created_at")
+    verified: Optional[bool] = Field(default=False, validation_alias="is_verified")
+    
+    # Ответ деталей транзакции кэшируется уже в виде полей проекции
+    model_config = ConfigDict(populate_by_name=True)
+
+class SellerView(ParticipantView):
+    """Проекция данных продавца"""
+    total_sales: Optional[int] = Field(default=0, validation_alias=AliasPath("profile", "total_sales"))
+    contacts: Optional[Dict[str, Any]] = Field(default_factory=dict, validation_alias=AliasPath("profile", "contacts"))
+
+class BuyerView(ParticipantView):
+    """Проекция данных покупателя"""
+    total_purchases: Optional[int] = Field(default=0, validation_alias=AliasPath("profile", "total_purchases"))
+    contacts: Optional[Dict[str, Any]] = Field(default_factory=dict, validation_alias=AliasPath("profile", "contacts"))
+
+class ItemView(BaseModel):
+    """Проекция данных товара из marketplace для страницы деталей транзакции"""
+    id: Optional[int] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    price: Optional[float] = None
+    currency: Optional[str] = None
+    category: Optional[Any] = None
+    condition: Optional[str] = None
+    images: List[Any] = Field(default_factory=list)
+    created_at: Optional[str] = None
+    tags: List[Any] = Field(default_factory=list)
+    location: Optional[Any] = None
+
+class TimelineEntry(BaseModel):
+    """Элемент таймлайна транзакции, построенный по записи истории"""
+    id: int
+    transaction_id: int
+    action: str
+    from_status: Optional[str] = None
+    to_status: Optional[str] = None
+    timestamp: Optional[str] = None
+    user_id: Optional[int] = None
+    notes: Optional[str] = None
+    metadata: Optional[Dict[str, Any]] = None
+
+class TransactionCore(BaseModel):
+    """Основная информация о транзакции на странице деталей (даты в ISO 8601, перечисления - значениями)"""
+    id: int
+    transaction_uid: Optional[str] = None
+    buyer_id: Optional[int] = None
+    seller_id: Optional[int] = None
+    listing_id: Optional[int] = None
+    item_id: Optional[int] = None
+    amount: float = 0.0
+    currency: Optional[str] = None
+    fee_amount: float = 0.0
+    fee_percentage: float = 0.0
+    status: Optional[str] = None
+    type: Optional[str] = None
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+    completed_at: Optional[str] = None
+    disputed_at: Optional[str] = None
+    refunded_at: Optional[str] = None
+    canceled_at: Optional[str] = None
+    escrow_held_at: Optional[str] = None
+    description: Optional[str] = None
+    notes: Optional[str] = None
+    extra_data: Optional[Dict[str, Any]] = None
+    dispute_reason: Optional[str] = None
+    refund_reason: Optional[str] = None
+    cancel_reason: Optional[str] = None
+
+class EscrowInfo(BaseModel):
+    """Информация об эскроу"""
+    is_in_escrow: bool = False
+    days_in_escrow: Optional[int] = None
+    escrow_start_date: Optional[str] = None
+    escrow_end_date: Optional[str] = None
+    wallet_id: Optional[int] = None
+
+class TimeInfo(BaseModel):
+    """Временная информация о транзакции"""
+    is_expired: bool = False
+    days_left: Optional[int] = None
+    created_date: Optional[str] = None
+    updated_date: Optional[str] = None
+    completed_date: Optional[str] = None
+    expiration_date: Optional[str] = None
+
+class TxAction(IntFlag):
+    """Действия с транзакцией: биты поля action_flags ответа с деталями"""
+    PROCESS_PAYMENT = 1
+    COMPLETE = 2
+    REFUND = 4
+    DISPUTE = 8
+    RESOLVE_DISPUTE = 16
+    CANCEL = 32
+    FAIL = 64
+
+    @classmethod
+    def from_actions(cls, actions: List[str]) -> "TxAction":
+        """Битовая маска по списку действий (имена из get_actions_for_transaction)"""
+        flags = cls(0)
+        for action in actions:
+            flags |= cls[action.upper()]
+        return flags
+
+class ActionStatus(BaseModel):
+    """Доступность действий с транзакцией"""
+    can_complete: bool = False
+    can_refund: bool = False
+    can_dispute: bool = False
+    can_cancel: bool = False
+    can_resolve_dispute: bool = False
+
+class PaymentInfo(BaseModel):
+    """Детальная информация о платеже"""
+    amount: float = 0.0
+    currency: Optional[str] = None
+    fee_amount: float = 0.0
+    fee_percentage: float = 0.0
+    total_amount: float = 0.0
+    payment_method: str = "wallet"
+    transaction_uid: Optional[str] = None
 
 class TransactionDetailsResponse(BaseModel):
-    """Схема для детального ответа с полной информацией о транзакции"""
-    transaction: Dict[str, Any] = Field(..., description="Основная информация о транзакции")
-    history: List[Dict[str, Any]] = Field(default_factory=list, description="История изменений статуса")
+    """
+    Схема для детального ответа с полной информацией о транзакции
+    
+    История строится из записей, загруженных вместе с транзакцией через
+    selectinload(Transaction.history) (get_transaction_for_details); участники
+    запрашиваются у auth-svc одним пакетом, товар и продажа - у marketplace.
+    """
+    transaction: TransactionCore = Field(..., description="Основная информация о транзакции")
+    history: List[TimelineEntry] = Field(default_factory=list, description="История изменений статуса")
     sale: Optional[Dict[str, Any]] = Field(default=None, description="Информация о связанной продаже")
-    buyer: Optional[Dict[str, Any]] = Field(default=None, description="Информация о покупателе")
-    seller: Optional[Dict[str, Any]] = Field(default=None, description="Информация о продавце")
-    item: Optional[Dict[str, Any]] = Field(default=None, description="Информация о товаре или услуге")
-    escrow_info: Dict[str, Any] = Field(..., description="Информация об эскроу")
-    time_info: Dict[str, Any] = Field(..., description="Временная информация о транзакции")
+    buyer: Optional[BuyerView] = Field(default=None, description="Информация о покупателе")
+    seller: Optional[SellerView] = Field(default=None, description="Информация о продавце")
+    item: Optional[ItemView] = Field(default=None, description="Информация о товаре или услуге")
+    escrow_info: EscrowInfo = Field(..., description="Информация об эскроу")
+    time_info: TimeInfo = Field(..., description="Временная информация о транзакции")
     available_actions: List[str] = Field(default_factory=list, description="Доступные действия с транзакцией")
-    action_status: Dict[str, bool] = Field(default_factory=dict, description="Статус доступности каждого действия")
-    payment_info: Dict[str, Any] = Field(default_factory=dict, description="Детальная информация о платеже")
+    action_flags: int = Field(default=0, description="Доступные действия: битовая маска TxAction")
+    payment_info: PaymentInfo = Field(default_factory=PaymentInfo, description="Детальная информация о платеже")
     user_role: Optional[str] = Field(default=None, description="Роль текущего пользователя (buyer/seller/admin)")
     
-    model_config = ConfigDict(from_attributes=True) 
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True)
+
+    @computed_field(description="Статус доступности каждого действия")
+    @property
+    def action_status(self) -> ActionStatus:
+        flags = self.action_flags
+        return ActionStatus(
+            can_complete=bool(flags & TxAction.COMPLETE),
+            can_refund=bool(flags & TxAction.REFUND),
+            can_dispute=bool(flags & TxAction.DISPUTE),
+            can_cancel=bool(flags & TxAction.CANCEL),
+            can_resolve_dispute=bool(flags & TxAction.RESOLVE_DISPUTE)
+        )
+
+# Адаптеры списков строятся один раз при импорте
+_TRANSACTION_LIST_ADAPTER = TypeAdapter(List[TransactionResponse])
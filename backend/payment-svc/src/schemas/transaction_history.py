@@ -2,6 +2,7 @@ from pydantic import BaseModel, Field, ConfigDict
 from typing import Optional, Dict, Any, List
 from datetime import datetime
 from ..models.transaction import TransactionStatus
+from .base import PageCountMixin
 
 class TransactionHistoryBase(BaseModel):
     """Базовая схема для истории транзакций"""
@@ -22,12 +23,11 @@ class TransactionHistoryResponse(TransactionHistoryBase):
     id: int
     timestamp: datetime
     
-    model_config = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(from_attributes=True, frozen=True)
 
-class TransactionHistoryListResponse(BaseModel):
+class TransactionHistoryListResponse(PageCountMixin):
     """Схема для списка записей истории транзакций с пагинацией"""
     items: List[TransactionHistoryResponse]
     total: int
     page: int
     size: int
-    pages: int 
\ No newline at end of file
@@ -1,10 +1,12 @@
-from pydantic import BaseModel, Field, validator, ConfigDict
-from typing import Optional, Dict, Any, List, Union
+import orjson
+from pydantic import BaseModel, Field, field_validator, model_validator, ConfigDict, TypeAdapter
+from typing import Annotated, Literal, Optional, Dict, Any, List, Union
 from datetime import datetime
 from uuid import UUID
 from decimal import Decimal
 from ..models.wallet import Currency, WalletStatus
 from ..models.transaction import TransactionStatus
+from .base import PageCountMixin, serialize_items
 
 class WalletBase(BaseModel):
     """Базовая схема для кошельков"""
@@ -12,18 +14,36 @@ class WalletBase(BaseModel):
     is_default: bool = Field(default=False, description="Является ли кошелёк основным для пользователя")
     notes: Optional[str] = Field(default=None, description="Примечания к кошельку")
 
+class Balances(BaseModel):
+    """
+    Балансы кошелька по валютам
+    
+    Набор валют фиксирован (Currency), поэтому балансы хранятся отдельными
+    полями, а не словарем: ключи не проверяются как Enum при каждой
+    валидации и сериализации.
+    """
+    USD: float = 0.0
+    EUR: float = 0.0
+    GBP: float = 0.0
+    RUB: float = 0.0
+    JPY: float = 0.0
+    CNY: float = 0.0
+    
+    model_config = ConfigDict(extra="forbid")
+
 class WalletCreate(WalletBase):
     """Схема для создания кошелька"""
-    initial_balances: Optional[Dict[Currency, float]] = Field(
-        default_factory=dict,
+    initial_balances: Optional[Balances] = Field(
+        default_factory=Balances,
         description="Начальные балансы в различных валютах"
     )
     
-    @validator('initial_balances')
-    def validate_initial_balances(cls, v):
+    @field_validator('initial_balances', mode="after")
+    @classmethod
+    def validate_initial_balances(cls, v: Optional[Balances]) -> Optional[Balances]:
         """Проверяет корректность начальных балансов"""
         if v:
-            for currency, amount in v.items():
+            for currency, amount in v:
                 if amount < 0:
                     raise ValueError(f"Начальный баланс в {currency} не может быть отрицательным")
         return v
@@ -37,27 +57,31 @@ class WalletUpdate(BaseModel):
 class WalletResponse(WalletBase):
     """Схема ответа с данными кошелька"""
     id: int = Field(..., description="ID кошелька")
-    balances: Dict[Currency, float] = Field(..., description="Балансы в различных валютах")
+    balances: Balances = Field(..., description="Балансы в различных валютах")
     status: WalletStatus = Field(..., description="Статус кошелька")
     created_at: datetime = Field(..., description="Дата и время создания кошелька")
     updated_at: Optional[datetime] = Field(default=None, description="Дата и время последнего обновления кошелька")
     limits: Optional[Dict[str, Any]] = Field(default=None, description="Лимиты кошелька")
     extra_data: Optional[Dict[str, Any]] = Field(default=None, description="Дополнительные данные кошелька")
     
-    model_config = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(from_attributes=True, use_enum_values=True, frozen=True)
 
-class WalletListResponse(BaseModel):
+class WalletListResponse(PageCountMixin):
     """Схема ответа со списком кошельков"""
     total: int = Field(..., description="Общее количество кошельков")
     items: List[WalletResponse] = Field(..., description="Список кошельков")
     page: int = Field(..., description="Номер текущей страницы")
     size: int = Field(..., description="Размер страницы")
-    pages: int = Field(..., description="Общее количество страниц")
+
+    @classmethod
+    def serialize_items(cls, rows: List[Any]) -> orjson.Fragment:
+        """Элементы страницы в виде фрагмента JSON для ORJSONResponse"""
+        return serialize_items(_WALLET_LIST_ADAPTER, rows)
 
 class WalletBalanceResponse(BaseModel):
     """Схема ответа с балансом кошелька"""
     wallet_id: int = Field(..., description="ID кошелька")
-    balances: Dict[Currency, float] = Field(..., description="Балансы в различных валютах")
+    balances: Balances = Field(..., description="Балансы в различных валютах")
     total_usd_equivalent: float = Field(..., description="Общая сумма в эквиваленте USD")
     updated_at: datetime = Field(..., description="Дата и время обновления баланса")
 
@@ -88,23 +112,30 @@ class WalletTransactionResponse(BaseModel):
     updated_at: Optional[datetime] = Field(default=None, description="Дата и время последнего обновления транзакции")
     extra_data: Optional[Dict[str, Any]] = Field(default=None, description="Дополнительные данные транзакции")
     
-    model_config = ConfigDict(from_attributes=True)
+    model_config = ConfigDict(from_attributes=True, frozen=True)
 
 class WalletTransactionResponseMinimal(WalletTransactionBase):
     """Схема ответа с данными транзакции кошелька"""
     id: int = Field(..., description="ID транзакции")
     wallet_id: int = Field(..., description="ID кошелька")
+    amount: float = Field(..., description="Сумма транзакции", ge=0)
     type: str = Field(..., description="Тип транзакции")
     status: Optional[str] = Field(default=None, description="Статус транзакции")
     created_at: datetime = Field(..., description="Дата и время создания транзакции")
+    
+    model_config = ConfigDict(from_attributes=True)
 
-class WalletTransactionListResponse(BaseModel):
+class WalletTransactionListResponse(PageCountMixin):
     """Схема ответа со списком транзакций кошелька"""
     total: int = Field(..., description="Общее количество транзакций")
     items: List[WalletTransactionResponse] = Field(..., description="Список транзакций")
     page: int = Field(..., description="Номер текущей страницы")
     size: int = Field(..., description="Размер страницы")
-    pages: int = Field(..., description="Общее количество страниц")
+
+    @classmethod
+    def serialize_items(cls, rows: List[Any]) -> orjson.Fragment:
+        """Элементы страницы в виде фрагмента JSON для ORJSONResponse"""
+        return serialize_items(_WALLET_TRANSACTION_LIST_ADAPTER, rows)
 
 class CurrencyConversionRequest(BaseModel):
     """Схема запроса на конвертацию валюты"""
@@ -112,11 +143,11 @@ class CurrencyConversionRequest(BaseModel):
     from_currency: Currency = Field(..., description="Исходная валюта")
     to_currency: Currency = Field(..., description="Целевая валюта")
     
-    @validator('to_currency')
-    def currencies_must_differ(cls, v, values):
-        if 'from_currency' in values and v == values['from_currency']:
+    @model_validator(mode="after")
+    def currencies_must_differ(self) -> "CurrencyConversionRequest":
+        if self.to_currency == self.from_currency:
             raise ValueError("Исходная и целевая валюты должны отличаться")
-        return v
+        return self
 
 class CurrencyConversionResponse(BaseModel):
     """Схема ответа с результатом конвертации валюты"""
@@ -134,42 +165,69 @@ class CurrencyConversionResponse(BaseModel):
     status: Optional[str] = Field(default=None, description="Статус транзакции (если выполнена)")
     timestamp: str = Field(..., description="Временная метка операции")
     completed_at: Optional[str] = Field(default=None, description="Время завершения операции")
+    
+    model_config = ConfigDict(frozen=True)
+
+class WalletCurrencyConversionResponse(BaseModel):
+    """Схема ответа с результатом конвертации валюты внутри кошелька"""
+    success: bool = Field(..., description="Успешность операции")
+    debit_transaction: WalletTransactionResponseMinimal = Field(..., description="Транзакция списания исходной валюты")
+    credit_transaction: WalletTransactionResponseMinimal = Field(..., description="Транзакция зачисления целевой валюты")
+    exchange_rate: float = Field(..., description="Фактический курс обмена")
 
 class ExchangeRatesResponse(BaseModel):
     """Схема ответа с курсами валют"""
     base_currency: Currency = Field(..., description="Базовая валюта для курсов")
     rates: Dict[Currency, float] = Field(..., description="Курсы валют относительно базовой")
     timestamp: Optional[str] = Field(default=None, description="Временная метка курсов")
+    
+    # Ключи курсов хранятся строками-значениями валют: при сериализации
+    # не нужно обращаться к .value каждого члена Currency
+    model_config = ConfigDict(use_enum_values=True, frozen=True)
+
+class BankTransferRecipient(BaseModel):
+    """Данные получателя банковского перевода"""
+    method: Literal["bank_transfer"]
+    account_number: str
+    bank_name: str
+    beneficiary_name: str
+    
+    model_config = ConfigDict(extra="allow")
+
+class CardRecipient(BaseModel):
+    """Данные получателя вывода на карту"""
+    method: Literal["card"]
+    card_number: str
+    card_holder: str
+    
+    model_config = ConfigDict(extra="allow")
+
+class CryptoRecipient(BaseModel):
+    """Данные получателя вывода в криптовалюте"""
+    method: Literal["crypto"]
+    wallet_address: str
+    network: str
+    
+    model_config = ConfigDict(extra="allow")
+
+# Метод вывода выбирается по полю method без перебора вариантов
+WithdrawalRecipient = Annotated[
+    Union[BankTransferRecipient, CardRecipient, CryptoRecipient],
+    Field(discriminator="method")
+]
 
 class WithdrawalRequest(BaseModel):
     """Схема запроса на вывод средств"""
     amount: Decimal = Field(..., description="Сумма для вывода", gt=0)
     currency: Currency = Field(..., description="Валюта вывода")
-    withdrawal_method: str = Field(..., description="Метод вывода (bank_transfer, card, crypto)")
-    recipient_details: Dict[str, Any] = Field(..., description="Данные получателя")
+    recipient: WithdrawalRecipient = Field(..., description="Метод вывода (bank_transfer, card, crypto) и данные получателя")
     description: Optional[str] = Field(default=None, description="Описание вывода")
     request_ip: Optional[str] = Field(default=None, description="IP-адрес клиента")
     
-    @validator('recipient_details')
-    def validate_recipient_details(cls, v, values):
-        if 'withdrawal_method' not in values:
-            return v
-            
-        method = values['withdrawal_method']
-        if method == 'bank_transfer':
-            required_fields = ['account_number', 'bank_name', 'beneficiary_name']
-        elif method == 'card':
-            required_fields = ['card_number', 'card_holder']
-        elif method == 'crypto':
-            required_fields = ['wallet_address', 'network']
-        else:
-            raise ValueError(f"Неподдерживаемый метод вывода: {method}")
-            
-        for field in required_fields:
-            if field not in v:
-                raise ValueError(f"Для метода {method} требуется поле {field}")
-                
-        return v
+    @property
+    def withdrawal_method(self) -> str:
+        """Метод вывода"""
+        return self.recipient.method
 
 class WithdrawalVerificationRequest(BaseModel):
     """Схема запроса на верификацию вывода"""
@@ -180,7 +238,7 @@ class WithdrawalResponse(BaseModel):
     """Схема ответа с данными запроса на вывод"""
     transaction_id: int = Field(..., description="ID транзакции")
     status: str = Field(..., description="Статус вывода")
-    amount: Decimal = Field(..., description="Сумма вывода")
+    amount: float = Field(..., description="Сумма вывода")
     currency: Currency = Field(..., description="Валюта вывода")
     created_at: datetime = Field(..., description="Дата и время создания запроса")
     updated_at: Optional[datetime] = Field(default=None, description="Дата и время последнего обновления")
@@ -189,11 +247,23 @@ class WithdrawalResponse(BaseModel):
     verification_id: Optional[str] = Field(default=None, description="ID верификации")
     withdrawal_method: str = Field(..., description="Метод вывода")
     extra_data: Optional[Dict[str, Any]] = Field(default=None, description="Дополнительные данные")
+    
+    model_config = ConfigDict(frozen=True)
 
-class WithdrawalListResponse(BaseModel):
+class WithdrawalListResponse(PageCountMixin):
     """Схема ответа со списком запросов на вывод"""
     total: int = Field(..., description="Общее количество запросов")
     items: List[WithdrawalResponse] = Field(..., description="Список запросов на вывод")
     page: int = Field(..., description="Номер текущей страницы")
     size: int = Field(..., description="Размер страницы")
-    pages: int = Field(..., description="Общее количество страниц") 
\ No newline at end of file
+
+    @classmethod
+    def serialize_items(cls, rows: List[Any]) -> orjson.Fragment:
+        """Элементы страницы в виде фрагмента JSON для ORJSONResponse"""
+        return serialize_items(_WITHDRAWAL_LIST_ADAPTER, rows)
+
+
+# Адаптеры списков строятся один раз при импорте
+_WALLET_LIST_ADAPTER = TypeAdapter(List[WalletResponse])
+_WALLET_TRANSACTION_LIST_ADAPTER = TypeAdapter(List[WalletTransactionResponse])
+_WITHDRAWAL_LIST_ADAPTER = TypeAdapter(List[WithdrawalResponse])
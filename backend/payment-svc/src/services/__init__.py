@@ -1,14 +1,33 @@
-from .rabbitmq_service import get_rabbitmq_service, RabbitMQService
-from .transaction_service import get_transaction_service, TransactionService
-from .message_handler import setup_rabbitmq_consumers
-from .event_service import get_event_service, EventService, EventType, EventPayload
-from .event_rabbit_bridge import get_event_rabbit_bridge, setup_event_rabbit_bridge
-from .state_machine import TransactionStateMachine, TransactionStateMachineFactory, TransactionEvent
-from .transaction_state_service import get_transaction_state_service, TransactionStateService
-from .transaction_timeout_service import get_transaction_timeout_service, setup_transaction_timeout_service, TransactionTimeoutService
+import importlib
+from typing import Any
+
+# Модуль, в котором объявлено каждое экспортируемое имя. Модули сервисов
+# импортируются при первом обращении к имени (PEP 562), поэтому импорт
+# пакета или одного из его модулей не загружает остальные сервисы и их схемы
+_EXPORTS = {
+    "get_rabbitmq_service": ".rabbitmq_service",
+    "RabbitMQService": ".rabbitmq_service",
+    "get_transaction_service": ".transaction_service",
+    "TransactionService": ".transaction_service",
+    "setup_rabbitmq_consumers": ".message_handler",
+    "get_event_service": ".event_service",
+    "EventService": ".event_service",
+    "EventType": ".event_service",
+    "EventPayload": ".event_service",
+    "get_event_rabbit_bridge": ".event_rabbit_bridge",
+    "setup_event_rabbit_bridge": ".event_rabbit_bridge",
+    "TransactionStateMachine": ".state_machine",
+    "TransactionStateMachineFactory": ".state_machine",
+    "TransactionEvent": ".state_machine",
+    "get_transaction_state_service": ".transaction_state_service",
+    "TransactionStateService": ".transaction_state_service",
+    "get_transaction_timeout_service": ".transaction_timeout_service",
+    "setup_transaction_timeout_service": ".transaction_timeout_service",
+    "TransactionTimeoutService": ".transaction_timeout_service",
+}
 
 __all__ = [
-    "get_rabbitmq_service", "RabbitMQService", 
+    "get_rabbitmq_service", "RabbitMQService",
     "get_transaction_service", "TransactionService",
     "setup_rabbitmq_consumers",
     "get_event_service", "EventService", "EventType", "EventPayload",
@@ -16,4 +35,19 @@ __all__ = [
     "TransactionStateMachine", "TransactionStateMachineFactory", "TransactionEvent",
     "get_transaction_state_service", "TransactionStateService",
     "get_transaction_timeout_service", "setup_transaction_timeout_service", "TransactionTimeoutService"
-] 
\ No newline at end of file
+]
+
+
+def __getattr__(name: str) -> Any:
+    """Загрузка модуля сервиса при первом обращении к экспортируемому имени"""
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    # Следующие обращения к имени не проходят через __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -1,8 +1,11 @@
 """Сервис для взаимодействия с auth-svc"""
 
-import httpx
+import asyncio
+import hashlib
 import json
-from typing import Optional, Dict, Any
+from types import MappingProxyType
+from typing import Optional, Dict, Any, Mapping, List
+from cachetools import TTLCache
 import logging
 from fastapi import HTTPException, status, Request
 from pydantic import BaseModel
@@ -13,6 +16,9 @@ import time
 from datetime import datetime, timedelta
 
 from ..config.settings import get_settings
+from .http_client import get_http_client
+from .token_batcher import get_token_batcher
+from ..cache.token_cache import token_expires_at
 
 settings = get_settings()
 
@@ -41,9 +47,129 @@ class UserResponse(BaseModel):
     roles: list[str]
     is_verified: bool
 
-# Простой кэш для хранения результатов валидации токенов
-_token_cache = {}
-_cache_ttl = 60  # время жизни кэша в секундах
+# Кэш результатов валидации токенов: ключ - BLAKE2b токена, значение -
+# (время истечения записи, данные пользователя). Запись живет не дольше
+# _validation_ttl секунд и не дольше срока действия самого токена
+_validation_cache: TTLCache = TTLCache(maxsize=10_000, ttl=60)
+_validation_ttl = 60  # время жизни кэша в секундах
+
+# Выполняющиеся проверки токенов: параллельные запросы с одним токеном
+# ожидают одну общую задачу вместо отдельных обращений к auth-svc
+_validation_inflight: Dict[bytes, "asyncio.Task[Optional[UserInfo]]"] = {}
+
+# Кэш профилей пользователей из auth-svc (ключ - ID пользователя)
+_user_cache: TTLCache = TTLCache(maxsize=10_000, ttl=60)
+
+
+async def get_user_by_id(user_id: int) -> Optional[Mapping[str, Any]]:
+    """
+    Получает информацию о пользователе из auth-сервиса по его ID
+    
+    Успешные ответы кэшируются на 60 секунд. Возвращаемое значение доступно
+    только для чтения, так как разделяется между запросами.
+    """
+    cached = _user_cache.get(user_id)
+    if cached is not None:
+        return cached
+    
+    try:
+        response = await get_http_client().get(f"{settings.AUTH_SERVICE_URL}/users/{user_id}")
+        
+        if response.status_code == 200:
+            user_data = MappingProxyType(response.json())
+            _user_cache[user_id] = user_data
+            return user_data
+        else:
+            logger.error(f"Ошибка при получении пользователя с ID {user_id}: {response.status_code}")
+            return None
+    except Exception as e:
+        logger.error(f"Ошибка при запросе к auth-сервису: {str(e)}")
+        return None
+
+
+async def get_users_by_ids(user_ids: List[int]) -> Dict[int, Mapping[str, Any]]:
+    """
+    Получает информацию о нескольких пользователях одним запросом к auth-сервису
+    
+    Пользователи из кэша не запрашиваются повторно. Остальные запрашиваются через
+    GET /users?ids=...; если auth-svc не поддерживает пакетный запрос или вернул
+    не всех пользователей, недостающие запрашиваются по одному.
+    
+    Args:
+        user_ids: Список ID пользователей (None и повторы игнорируются)
+        
+    Returns:
+        Словарь {ID пользователя: данные пользователя} для найденных пользователей
+    """
+    users: Dict[int, Mapping[str, Any]] = {}
+    missing: List[int] = []
+    for user_id in dict.fromkeys(user_ids):
+        if user_id is None:
+            continue
+        cached = _user_cache.get(user_id)
+        if cached is not None:
+            users[user_id] = cached
+        else:
+            missing.append(user_id)
+    
+    if not missing:
+        return users
+    
+    if len(missing) > 1:
+        try:
+            response = await get_http_client().get(
+                f"{settings.AUTH_SERVICE_URL}/users",
+                params={"ids": ",".join(str(user_id) for user_id in missing)}
+            )
+            
+            if response.status_code == 200:
+                for item in response.json():
+                    user_data = MappingProxyType(item)
+                    _user_cache[user_data["id"]] = user_data
+                    users[user_data["id"]] = user_data
+            else:
+                logger.warning(f"Пакетный запрос пользователей недоступен: {response.status_code}")
+        except Exception as e:
+            logger.error(f"Ошибка при пакетном запросе к auth-сервису: {str(e)}")
+        
+        missing = [user_id for user_id in missing if user_id not in users]
+    
+    # Запрашиваем по одному тех, кого не удалось получить пакетом
+    results = await asyncio.gather(*(get_user_by_id(user_id) for user_id in missing))
+    for user_id, user_data in zip(missing, results):
+        if user_data:
+            users[user_id] = user_data
+    
+    return users
+
+
+def get_cached_user(user_id: int) -> Optional[Mapping[str, Any]]:
+    """
+    Получить профиль пользователя из кэша без обращения к auth-сервису
+    
+    Returns:
+        Данные пользователя или None, если профиля нет в кэше
+    """
+    return _user_cache.get(user_id)
+
+
+def invalidate_user_cache(user_id: int) -> None:
+    """
+    Удалить профиль пользователя из кэша
+    
+    Вызывается при получении событий об изменении или удалении пользователя.
+    Вместе с профилем удаляются кэшированные результаты валидации его токенов.
+    """
+    _user_cache.pop(user_id, None)
+    
+    stale_keys = [key for key, (_, user_info) in _validation_cache.items() if user_info.user_id == user_id]
+    for key in stale_keys:
+        _validation_cache.pop(key, None)
+
+
+def _validation_cache_key(token: str) -> bytes:
+    """Ключ кэша валидации: сам токен в памяти кэша не используется как ключ"""
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
 
 
 class AuthService:
@@ -51,48 +177,73 @@ class AuthService:
 
     @staticmethod
     async def validate_token(token: str) -> Optional[UserInfo]:
-        """Проверяет валидность JWT токена через auth-svc"""
+        """
+        Проверяет валидность JWT токена через auth-svc
+        
+        Успешный результат кэшируется по хэшу токена, поэтому повторные
+        запросы с тем же токеном не обращаются к auth-svc. Отказы не кэшируются.
+        Одновременные проверки одного токена выполняются одним запросом.
+        """
+        cache_key = _validation_cache_key(token)
+        cached = _validation_cache.get(cache_key)
+        if cached is not None:
+            expires_at, user_info = cached
+            if time.time() < expires_at:
+                return user_info
+            _validation_cache.pop(cache_key, None)
+        
+        task = _validation_inflight.get(cache_key)
+        if task is None:
+            task = asyncio.create_task(AuthService._validate_and_cache(token, cache_key))
+            _validation_inflight[cache_key] = task
+            task.add_done_callback(lambda _: _validation_inflight.pop(cache_key, None))
+        # Отмена одного из ожидающих запросов не прерывает общую проверку
+        return await asyncio.shield(task)
+    
+    @staticmethod
+    async def _validate_and_cache(token: str, cache_key: bytes) -> Optional[UserInfo]:
+        """Проверка токена в auth-svc с сохранением успешного результата в кэш"""
+        user_info = await AuthService._validate_token_remote(token)
+        if user_info is not None:
+            expires_at = time.time() + _validation_ttl
+            token_exp = token_expires_at(token)
+            if token_exp is not None:
+                expires_at = min(expires_at, token_exp)
+            _validation_cache[cache_key] = (expires_at, user_info)
+        return user_info
+    
+    @staticmethod
+    async def _validate_token_remote(token: str) -> Optional[UserInfo]:
+        """Запрос проверки токена к auth-svc (объединяется с другими в пакет)"""
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                logger.info(f"Sending token to auth-svc: {token[:10]}...")
-                # Отправляем запрос на проверку токена
-                response = await client.post(
-                    f"{AUTH_SERVICE_URL}/api/auth/validate",
-                    json={"token": token},
-                )
-                
-                logger.info(f"Received response from auth-svc: {response.status_code}")
-                logger.debug(f"Response content: {response.text[:100]}")
-
-                # Проверяем успешность запроса
-                if response.status_code != 200:
-                    logger.error(f"Ошибка валидации токена: {response.status_code} - {response.text}")
-                    return None
-
-                # Разбираем ответ
-                data = response.json()
+            # Префикс токена нужен только при отладке: не форматируем строку без надобности
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Sending token to auth-svc: {token[:10]}...")
+            data = await get_token_batcher().validate(token)
+            if data is None:
+                return None
 
-                # Проверяем валидность токена
-                if not data.get('is_valid', False):
-                    logger.error(f"Токен не валиден: {data}")
-                    return None
+            # Проверяем валидность токена
+            if not data.get('is_valid', False):
+                logger.error(f"Токен не валиден: {data}")
+                return None
 
-                # Создаем объект с информацией о пользователе
-                user_id = data.get('user_id')
-                username = data.get('username')
-                
-                if not user_id or not username:
-                    logger.error(f"Недостаточно данных пользователя: {data}")
-                    return None
-                    
-                result = UserInfo(
-                    user_id=user_id,
-                    username=username,
-                    token=token
-                )
+            # Создаем объект с информацией о пользователе
+            user_id = data.get('user_id')
+            username = data.get('username')
+            
+            if not user_id or not username:
+                logger.error(f"Недостаточно данных пользователя: {data}")
+                return None
                 
-                logger.info(f"Пользователь успешно получен: {username} (ID: {user_id})")
-                return result
+            result = UserInfo(
+                user_id=user_id,
+                username=username,
+                token=token
+            )
+            
+            logger.info(f"Пользователь успешно получен: {username} (ID: {user_id})")
+            return result
 
         except Exception as e:
             logger.error(f"Ошибка при валидации токена: {str(e)}", exc_info=True)
@@ -119,15 +270,14 @@ class AuthService:
     async def get_user_data(token: str) -> Optional[UserResponse]:
         """Получение данных пользователя из auth-svc"""
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(
-                    f"{AUTH_SERVICE_URL}/api/auth/account/me",
-                    headers={"Authorization": f"Bearer {token}"},
-                )
-                if response.status_code != 200:
-                    logger.error(f"Ошибка получения данных пользователя: {response.status_code} - {response.text}")
-                    return None
-                return UserResponse(**response.json())
+            response = await get_http_client().get(
+                f"{AUTH_SERVICE_URL}/api/auth/account/me",
+                headers={"Authorization": f"Bearer {token}"},
+            )
+            if response.status_code != 200:
+                logger.error(f"Ошибка получения данных пользователя: {response.status_code} - {response.text}")
+                return None
+            return UserResponse(**response.json())
         except Exception as e:
             logger.error(f"Ошибка при получении данных пользователя: {str(e)}", exc_info=True)
             return None
@@ -2,20 +2,21 @@
 Сервис для конвертации валют и расчета комиссий
 """
 
+import asyncio
 import logging
 import time
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Dict, List, Optional, Tuple, Any, Union
 from fastapi import HTTPException, Depends
 from sqlalchemy.orm import Session
-import requests
 import json
 import os
 from decimal import Decimal, ROUND_HALF_UP
-from functools import lru_cache
+from itertools import product
 
 from ..models.wallet import Currency
 from ..database.connection import get_db
+from .http_client import get_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -48,15 +49,66 @@ FEE_SETTINGS = {
     }
 }
 
+# Ставки комиссий в плоском виде: {(уровень пользователя, тип транзакции): ставка}
+FEE_TABLE: Dict[Tuple[str, str], Decimal] = {
+    (tier, transaction_type): rate
+    for tier, tier_settings in FEE_SETTINGS.items() if tier != "tier_thresholds"
+    for transaction_type, rate in tier_settings.items()
+}
+
+# Точность сумм комиссий
+Q2 = Decimal("0.01")
+
+# Точность сконвертированных сумм
+Q6 = Decimal("0.000001")
+
+
+def _build_pair_matrix(rates: Dict[str, float]) -> Dict[Tuple[str, str], Decimal]:
+    """
+    Строит таблицу кросс-курсов для всех пар валют
+
+    Args:
+        rates: Курсы валют относительно USD
+
+    Returns:
+        Словарь {(исходная валюта, целевая валюта): курс}
+    """
+    decimal_rates = {currency: Decimal(repr(rate)) for currency, rate in rates.items()}
+    return {
+        (a, b): decimal_rates[b] / decimal_rates[a]
+        for a, b in product(decimal_rates, decimal_rates)
+    }
+
+
+# Кросс-курсы по дефолтным курсам (если API недоступен и кэш пуст)
+_DEFAULT_PAIR_MATRIX = _build_pair_matrix(DEFAULT_EXCHANGE_RATES)
+
+# Кэш курсов валют, общий для всех экземпляров CurrencyService в процессе
+_rates: Dict[str, float] = {}
+_pair_matrix: Dict[Tuple[str, str], Decimal] = {}
+_rates_time: Optional[datetime] = None
+_rates_expiry: float = 0.0
+_rates_lock = asyncio.Lock()
+
+# Время жизни кэша курсов (секунды) - обновляем курсы каждый час
+RATES_CACHE_TTL = 3600
+
+# Пауза перед повторным запросом курсов после ошибки API (секунды): пока она
+# не истекла, запросы используют последние известные или дефолтные курсы
+RATES_RETRY_BACKOFF = 30
+
+
 class CurrencyService:
     """
     Сервис для работы с валютами и комиссиями
     """
     def __init__(self, db: Session):
         self.db = db
-        self.rates_cache = {}
-        self.rates_cache_time = None
-        self.cache_duration = timedelta(hours=1)  # Обновляем курсы каждый час
+
+    @property
+    def rates_cache_time(self) -> Optional[datetime]:
+        """Время последнего обновления курсов валют"""
+        return _rates_time
     
     async def get_exchange_rates(self, force_refresh: bool = False) -> Dict[str, float]:
         """
@@ -68,27 +120,81 @@ class CurrencyService:
         Returns:
             Словарь курсов валют
         """
-        # Проверяем кэш
-        current_time = datetime.now()
-        if not force_refresh and self.rates_cache and self.rates_cache_time and \
-            current_time - self.rates_cache_time < self.cache_duration:
-            return self.rates_cache
+        await self._refresh_rates(force_refresh)
+        # Если обновить курсы не удалось, используем последние известные,
+        # а если кэш пуст - дефолтные значения
+        return _rates or DEFAULT_EXCHANGE_RATES
+
+    @staticmethod
+    def _get_pair_matrix() -> Dict[Tuple[str, str], Decimal]:
+        """
+        Получает таблицу кросс-курсов из кэша
+        
+        Returns:
+            Словарь {(исходная валюта, целевая валюта): курс}
+        """
+        return _pair_matrix or _DEFAULT_PAIR_MATRIX
+
+    async def _refresh_rates(self, force_refresh: bool = False) -> None:
+        """
+        Обновляет кэш курсов валют, если он устарел
         
+        Args:
+            force_refresh: Принудительно обновить данные из API
+        """
+        # Быстрый путь без блокировки: кэш свежий
+        if not force_refresh and time.monotonic() < _rates_expiry:
+            return
+
+        async with _rates_lock:
+            # Курсы могли обновить, пока ждали блокировку
+            if not force_refresh and time.monotonic() < _rates_expiry:
+                return
+
+            rates = await self._fetch_exchange_rates()
+            if rates is not None:
+                self._store_rates(rates)
+            else:
+                self._defer_refresh()
+
+    @staticmethod
+    def _defer_refresh() -> None:
+        """
+        Откладывает повторный запрос курсов после ошибки API
+        
+        Без паузы каждый ожидающий блокировку запрос повторял бы обращение
+        к недоступному API со своим таймаутом.
+        """
+        global _rates_expiry
+
+        _rates_expiry = time.monotonic() + RATES_RETRY_BACKOFF
+
+    @staticmethod
+    def _store_rates(rates: Dict[str, float]) -> None:
+        """Сохраняет курсы валют и кросс-курсы в кэш процесса"""
+        global _rates, _pair_matrix, _rates_time, _rates_expiry
+
+        _rates = rates
+        _pair_matrix = _build_pair_matrix(rates)
+        _rates_time = datetime.now()
+        _rates_expiry = time.monotonic() + RATES_CACHE_TTL
+
+    async def _fetch_exchange_rates(self) -> Optional[Dict[str, float]]:
+        """
+        Получает курсы валют из API (или моки вне продакшена)
+        
+        Returns:
+            Словарь курсов валют или None при ошибке
+        """
         # В неконечной среде используем моки
         if os.environ.get("ENVIRONMENT", "development") != "production":
             # Вносим немного вариативности в курсы
             import random
-            rates = {
+            return {
                 k: v * (1 + (random.random() - 0.5) * 0.01)  # ±0.5% изменения
                 for k, v in DEFAULT_EXCHANGE_RATES.items()
             }
             
-            # Сохраняем в кэш
-            self.rates_cache = rates
-            self.rates_cache_time = current_time
-            
-            return rates
-            
         # В продакшене используем реальный API
         try:
             # Здесь был бы запрос к реальному API курсов валют
@@ -96,39 +202,32 @@ class CurrencyService:
             api_key = os.environ.get("EXCHANGE_RATE_API_KEY")
             if not api_key:
                 logger.warning("EXCHANGE_RATE_API_KEY не настроен, используем дефолтные курсы")
-                rates = DEFAULT_EXCHANGE_RATES
-            else:
-                # Запрос к реальному API курсов валют
-                response = requests.get(
-                    f"https://openexchangerates.org/api/latest.json?app_id={api_key}",
-                    timeout=5
-                )
-                response.raise_for_status()
-                data = response.json()
-                rates = {currency: 1/data["rates"][currency] for currency in Currency}
-                
-            # Сохраняем в кэш
-            self.rates_cache = rates
-            self.rates_cache_time = current_time
-                
-            return rates
+                return DEFAULT_EXCHANGE_RATES
+
+            # Запрос к реальному API курсов валют
+            response = await get_http_client().get(
+                f"https://openexchangerates.org/api/latest.json?app_id={api_key}",
+                timeout=5.0
+            )
+            response.raise_for_status()
+            data = response.json()
+            return {currency: 1/data["rates"][currency] for currency in Currency}
             
         except Exception as e:
             logger.error(f"Ошибка при получении курсов валют: {str(e)}")
-            # В случае ошибки используем последние известные курсы
-            if self.rates_cache:
-                return self.rates_cache
-            # Если кэш пуст, возвращаем дефолтные значения
-            return DEFAULT_EXCHANGE_RATES
+            return None
     
-    async def convert_currency(
+    def convert_currency(
         self, 
         amount: Decimal, 
         from_currency: Currency, 
         to_currency: Currency
     ) -> Decimal:
         """
-        Конвертирует сумму из одной валюты в другую
+        Конвертирует сумму из одной валюты в другую по кэшированным курсам
+        
+        Курсы не обновляются: перед конвертацией вызывающий код должен
+        дождаться get_exchange_rates()
         
         Args:
             amount: Сумма для конвертации
@@ -141,16 +240,12 @@ class CurrencyService:
         if from_currency == to_currency:
             return amount
             
-        rates = await self.get_exchange_rates()
-        
-        # Конвертируем в USD (базовая валюта), затем в целевую валюту
-        amount_in_usd = Decimal(str(amount)) / Decimal(str(rates[from_currency]))
-        converted_amount = amount_in_usd * Decimal(str(rates[to_currency]))
+        pair_matrix = self._get_pair_matrix()
         
         # Округляем до 6 знаков после запятой
-        return converted_amount.quantize(Decimal('0.000001'), rounding=ROUND_HALF_UP)
+        return (amount * pair_matrix[(from_currency, to_currency)]).quantize(Q6, rounding=ROUND_HALF_UP)
     
-    async def calculate_fee(
+    def calculate_fee(
         self, 
         amount: Decimal, 
         transaction_type: str, 
@@ -168,14 +263,12 @@ class CurrencyService:
             Сумма комиссии
         """
         # Получаем ставку комиссии для данного типа транзакции и уровня пользователя
-        if transaction_type not in FEE_SETTINGS[user_tier]:
+        fee_rate = FEE_TABLE.get((user_tier, transaction_type))
+        if fee_rate is None:
             raise ValueError(f"Неизвестный тип транзакции: {transaction_type}")
-            
-        fee_rate = FEE_SETTINGS[user_tier][transaction_type]
-        fee_amount = amount * fee_rate
         
         # Округляем до 2 знаков после запятой
-        return fee_amount.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        return (amount * fee_rate).quantize(Q2, rounding=ROUND_HALF_UP)
     
     async def preview_conversion(
         self, 
@@ -210,18 +303,19 @@ class CurrencyService:
                 "timestamp": datetime.now().isoformat()
             }
             
+        # Обновляем курсы, если кэш устарел
+        await self.get_exchange_rates()
+
         # Рассчитываем комиссию
-        fee = await self.calculate_fee(amount, "conversion", user_tier)
+        fee = self.calculate_fee(amount, "conversion", user_tier)
         amount_after_fee = amount - fee
         
         # Конвертируем валюту
-        converted_amount = await self.convert_currency(amount_after_fee, from_currency, to_currency)
+        converted_amount = self.convert_currency(amount_after_fee, from_currency, to_currency)
         
-        # Рассчитываем обменный курс
-        rates = await self.get_exchange_rates()
-        from_rate = Decimal(str(rates[from_currency]))
-        to_rate = Decimal(str(rates[to_currency]))
-        exchange_rate = to_rate / from_rate
+        # Обменный курс из той же таблицы кросс-курсов
+        pair_matrix = self._get_pair_matrix()
+        exchange_rate = pair_matrix[(from_currency, to_currency)]
         
         return {
             "original_amount": amount,
@@ -236,7 +330,6 @@ class CurrencyService:
             "timestamp": datetime.now().isoformat()
         }
 
-@lru_cache
 def get_currency_service(
     db: Session = Depends(get_db)
 ) -> CurrencyService:
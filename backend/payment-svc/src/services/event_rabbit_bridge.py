@@ -4,13 +4,59 @@
 
 import logging
 import asyncio
-from typing import Dict, Any, List, Optional
+from types import MappingProxyType
+from typing import Dict, Any, List, Mapping, Optional, Set, Tuple
 
 from .event_service import EventService, EventType, EventPayload, get_event_service
 from .rabbitmq_service import RabbitMQService, get_rabbitmq_service
 
 logger = logging.getLogger(__name__)
 
+# События, связанные с транзакциями (в сообщение выносятся идентификаторы продажи)
+_TRANSACTION_EVENTS = frozenset({
+    EventType.TRANSACTION_CREATED,
+    EventType.TRANSACTION_UPDATED,
+    EventType.TRANSACTION_COMPLETED,
+    EventType.TRANSACTION_REFUNDED,
+    EventType.TRANSACTION_DISPUTED,
+    EventType.TRANSACTION_CANCELED,
+    EventType.TRANSACTION_FAILED,
+    EventType.ESCROW_FUNDS_HELD,
+    EventType.ESCROW_FUNDS_RELEASED,
+    EventType.ESCROW_FUNDS_REFUNDED,
+})
+
+# Поля data, копируемые в корень сообщения для лучшей доступности в marketplace-svc
+_IMPORTANT_FIELDS = ("transaction_id", "buyer_id", "seller_id", "listing_id", "item_id", "amount", "currency")
+
+# Максимальное число одновременных публикаций событий в RabbitMQ
+RABBIT_PUBLISH_CONCURRENCY = 64
+
+# Маппинг типов событий на обменники и ключи маршрутизации
+_ROUTING_MAP: Mapping[EventType, Tuple[str, str]] = MappingProxyType({
+    # События транзакций
+    EventType.TRANSACTION_CREATED: ("payment", "transaction.created"),
+    EventType.TRANSACTION_UPDATED: ("payment", "transaction.updated"),
+    EventType.TRANSACTION_COMPLETED: ("payment", "transaction.completed"),
+    EventType.TRANSACTION_REFUNDED: ("payment", "transaction.refunded"),
+    EventType.TRANSACTION_DISPUTED: ("payment", "transaction.disputed"),
+    EventType.TRANSACTION_CANCELED: ("payment", "transaction.canceled"),
+    EventType.TRANSACTION_FAILED: ("payment", "transaction.failed"),
+    
+    # События Escrow
+    EventType.ESCROW_FUNDS_HELD: ("payment", "escrow.funds_held"),
+    EventType.ESCROW_FUNDS_RELEASED: ("payment", "escrow.funds_released"),
+    EventType.ESCROW_FUNDS_REFUNDED: ("payment", "escrow.funds_refunded"),
+    
+    # События кошельков
+    EventType.WALLET_CREATED: ("payment", "wallet.created"),
+    EventType.WALLET_UPDATED: ("payment", "wallet.updated"),
+    EventType.WALLET_BALANCE_CHANGED: ("payment", "wallet.balance_changed"),
+    EventType.WALLET_BLOCKED: ("payment", "wallet.blocked"),
+    EventType.WALLET_UNBLOCKED: ("payment", "wallet.unblocked"),
+    EventType.WALLET_CLOSED: ("payment", "wallet.closed"),
+})
+
 class EventRabbitBridge:
     """
     Мост для передачи событий из системы событий в RabbitMQ
@@ -24,31 +70,12 @@ class EventRabbitBridge:
         self.event_service = get_event_service()
         self.rabbitmq_service = get_rabbitmq_service()
         self._initialized = False
-        
-        # Маппинг типов событий на обменники и ключи маршрутизации
-        self.routing_map = {
-            # События транзакций
-            EventType.TRANSACTION_CREATED: ("payment", "transaction.created"),
-            EventType.TRANSACTION_UPDATED: ("payment", "transaction.updated"),
-            EventType.TRANSACTION_COMPLETED: ("payment", "transaction.completed"),
-            EventType.TRANSACTION_REFUNDED: ("payment", "transaction.refunded"),
-            EventType.TRANSACTION_DISPUTED: ("payment", "transaction.disputed"),
-            EventType.TRANSACTION_CANCELED: ("payment", "transaction.canceled"),
-            EventType.TRANSACTION_FAILED: ("payment", "transaction.failed"),
-            
-            # События Escrow
-            EventType.ESCROW_FUNDS_HELD: ("payment", "escrow.funds_held"),
-            EventType.ESCROW_FUNDS_RELEASED: ("payment", "escrow.funds_released"),
-            EventType.ESCROW_FUNDS_REFUNDED: ("payment", "escrow.funds_refunded"),
-            
-            # События кошельков
-            EventType.WALLET_CREATED: ("payment", "wallet.created"),
-            EventType.WALLET_UPDATED: ("payment", "wallet.updated"),
-            EventType.WALLET_BALANCE_CHANGED: ("payment", "wallet.balance_changed"),
-            EventType.WALLET_BLOCKED: ("payment", "wallet.blocked"),
-            EventType.WALLET_UNBLOCKED: ("payment", "wallet.unblocked"),
-            EventType.WALLET_CLOSED: ("payment", "wallet.closed"),
-        }
+        self._publish_semaphore = asyncio.Semaphore(RABBIT_PUBLISH_CONCURRENCY)
+        # Фоновые задачи публикации (ссылки держим, чтобы задачи не собрал GC)
+        self._tasks: Set[asyncio.Task] = set()
+        # Последняя задача публикации по каждой транзакции: события одной
+        # транзакции публикуются в порядке их появления
+        self._last_task_by_transaction: Dict[Any, asyncio.Task] = {}
     
     async def initialize(self) -> None:
         """Инициализация моста и настройка обработчиков событий"""
@@ -56,11 +83,63 @@ class EventRabbitBridge:
             return
         
         # Подписываемся на все события
-        self.event_service.subscribe_to_all(self.handle_event)
+        self.event_service.subscribe_to_all(self.schedule_event)
         logger.info("Установлена подписка на все события в системе")
         
         self._initialized = True
     
+    async def schedule_event(self, event: EventPayload) -> None:
+        """
+        Постановка события в очередь на публикацию в RabbitMQ
+        
+        Публикация выполняется в фоновой задаче, поэтому код, публикующий событие,
+        не ждет подтверждения от RabbitMQ.
+        
+        Args:
+            event: Данные события
+        """
+        transaction_id = event.data.get("transaction_id")
+        previous = self._last_task_by_transaction.get(transaction_id) if transaction_id is not None else None
+        
+        task = asyncio.create_task(self._publish_after(event, previous))
+        self._tasks.add(task)
+        task.add_done_callback(self._on_task_done)
+        
+        if transaction_id is not None:
+            self._last_task_by_transaction[transaction_id] = task
+            
+            def forget(done: asyncio.Task) -> None:
+                # Удаляем запись, только если за это время не появилось более позднее событие
+                if self._last_task_by_transaction.get(transaction_id) is done:
+                    del self._last_task_by_transaction[transaction_id]
+            
+            task.add_done_callback(forget)
+    
+    async def _publish_after(self, event: EventPayload, previous: Optional[asyncio.Task]) -> None:
+        """
+        Публикация события после завершения предыдущей публикации той же транзакции
+        
+        Args:
+            event: Данные события
+            previous: Задача публикации предыдущего события транзакции
+        """
+        if previous is not None:
+            await asyncio.wait([previous])
+        
+        async with self._publish_semaphore:
+            await self.handle_event(event)
+    
+    def _on_task_done(self, task: asyncio.Task) -> None:
+        """Удаление завершенной задачи публикации и логирование ее ошибки"""
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Ошибка фоновой публикации события в RabbitMQ: {str(task.exception())}")
+    
+    async def drain(self) -> None:
+        """Ожидание завершения всех фоновых публикаций"""
+        while self._tasks:
+            await asyncio.wait(list(self._tasks))
+    
     async def handle_event(self, event: EventPayload) -> None:
         """
         Обработчик событий из системы событий
@@ -69,13 +148,13 @@ class EventRabbitBridge:
             event: Данные события
         """
         try:
-            # Проверяем, нужно ли отправлять это событие в RabbitMQ
-            if event.event_type not in self.routing_map:
+            # Проверяем, нужно ли отправлять это событие в RabbitMQ, и получаем настройки маршрутизации
+            route = _ROUTING_MAP.get(event.event_type)
+            if route is None:
                 logger.debug(f"Событие {event.event_type} не настроено для публикации в RabbitMQ")
                 return
             
-            # Получаем настройки маршрутизации
-            exchange_name, routing_key = self.routing_map[event.event_type]
+            exchange_name, routing_key = route
             
             # Формируем сообщение
             message = {
@@ -85,29 +164,15 @@ class EventRabbitBridge:
             }
             
             # Добавляем в корень сообщения важные данные для идентификации продажи
-            transaction_events = [
-                EventType.TRANSACTION_CREATED,
-                EventType.TRANSACTION_UPDATED,
-                EventType.TRANSACTION_COMPLETED,
-                EventType.TRANSACTION_REFUNDED,
-                EventType.TRANSACTION_DISPUTED,
-                EventType.TRANSACTION_CANCELED,
-                EventType.TRANSACTION_FAILED,
-                EventType.ESCROW_FUNDS_HELD,
-                EventType.ESCROW_FUNDS_RELEASED,
-                EventType.ESCROW_FUNDS_REFUNDED
-            ]
-            
-            if event.event_type in transaction_events:
-                # Копируем важные поля из data в корень сообщения для лучшей доступности в marketplace-svc
-                important_fields = ["transaction_id", "buyer_id", "seller_id", "listing_id", "item_id", "amount", "currency"]
-                for field in important_fields:
-                    if field in event.data:
-                        message[field] = event.data[field]
+            if event.event_type in _TRANSACTION_EVENTS:
+                data = event.data
+                for field in _IMPORTANT_FIELDS:
+                    if field in data:
+                        message[field] = data[field]
                         
                 # Обеспечиваем наличие transaction_id в корне сообщения
-                if "transaction_id" in event.data:
-                    logger.info(f"Добавлен transaction_id={event.data['transaction_id']} в корень сообщения для события {event.event_type.value}")
+                if "transaction_id" in message:
+                    logger.info(f"Добавлен transaction_id={message['transaction_id']} в корень сообщения для события {event.event_type.value}")
             
             # Отправляем в RabbitMQ
             await self.rabbitmq_service.publish(exchange_name, routing_key, message)
@@ -134,20 +199,7 @@ class EventRabbitBridge:
         }
         
         # Добавляем transaction_id в корень сообщения для всех событий, связанных с транзакциями
-        transaction_events = [
-            EventType.TRANSACTION_CREATED,
-            EventType.TRANSACTION_UPDATED,
-            EventType.TRANSACTION_COMPLETED,
-            EventType.TRANSACTION_REFUNDED,
-            EventType.TRANSACTION_DISPUTED,
-            EventType.TRANSACTION_CANCELED,
-            EventType.TRANSACTION_FAILED,
-            EventType.ESCROW_FUNDS_HELD,
-            EventType.ESCROW_FUNDS_RELEASED,
-            EventType.ESCROW_FUNDS_REFUNDED
-        ]
-        
-        if event.event_type in transaction_events:
+        if event.event_type in _TRANSACTION_EVENTS:
             if "transaction_id" in event.data:
                 message["transaction_id"] = event.data["transaction_id"]
                 logger.info(f"Добавлен transaction_id={event.data['transaction_id']} в корень сообщения для события {event.event_type.value}")
@@ -179,4 +231,11 @@ async def setup_event_rabbit_bridge() -> None:
     """
     Настройка моста между событиями и RabbitMQ
     """
-    await get_event_rabbit_bridge() 
\ No newline at end of file
+    await get_event_rabbit_bridge()
+
+async def close_event_rabbit_bridge() -> None:
+    """
+    Завершение моста: дожидается публикации событий, поставленных в очередь
+    """
+    if _event_rabbit_bridge_instance is not None:
+        await _event_rabbit_bridge_instance.drain() 
\ No newline at end of file
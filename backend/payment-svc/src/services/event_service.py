@@ -2,13 +2,14 @@
 Сервис управления событиями для транзакций и кошельков
 """
 import logging
+from collections import deque
 from enum import Enum
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Dict, Any, List, Callable, Awaitable, Optional, Set, Type
 import asyncio
 import json
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 logger = logging.getLogger(__name__)
 
@@ -42,7 +43,8 @@ class EventType(str, Enum):
 class EventPayload(BaseModel):
     """Базовая модель данных события"""
     event_type: EventType
-    timestamp: datetime = datetime.utcnow()
+    # Фабрика: время вычисляется для каждого события, а не один раз при объявлении класса
+    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     data: Dict[str, Any]
     
     class Config:
@@ -74,8 +76,9 @@ class EventService:
             
         self._subscribers: Dict[EventType, List[EventHandler]] = {}
         self._all_events_subscribers: List[EventHandler] = []
-        self._event_history: List[EventPayload] = []
         self._max_history_size = 1000  # Максимальный размер истории событий
+        # При переполнении самые старые события вытесняются за O(1)
+        self._event_history: deque = deque(maxlen=self._max_history_size)
         self._initialized = True
         
         logger.info("EventService инициализирован")
@@ -91,23 +94,25 @@ class EventService:
         
         # Сохраняем событие в истории
         self._event_history.append(event)
-        if len(self._event_history) > self._max_history_size:
-            self._event_history.pop(0)
         
-        # Вызываем обработчики для конкретного типа события
-        if event.event_type in self._subscribers:
-            for handler in self._subscribers[event.event_type]:
-                try:
-                    await handler(event)
-                except Exception as e:
-                    logger.error(f"Ошибка при обработке события {event.event_type}: {str(e)}")
-        
-        # Вызываем обработчики для всех событий
-        for handler in self._all_events_subscribers:
-            try:
-                await handler(event)
-            except Exception as e:
-                logger.error(f"Ошибка при обработке события {event.event_type} в глобальном обработчике: {str(e)}")
+        handlers = self._subscribers.get(event.event_type, ())
+        global_handlers = self._all_events_subscribers
+
+        # Обработчики независимы, поэтому вызываем их конкурентно:
+        # сначала обработчики конкретного типа события, затем обработчики всех событий
+        results = await asyncio.gather(
+            *(handler(event) for handler in handlers),
+            *(handler(event) for handler in global_handlers),
+            return_exceptions=True
+        )
+
+        for index, result in enumerate(results):
+            if not isinstance(result, Exception):
+                continue
+            if index < len(handlers):
+                logger.error(f"Ошибка при обработке события {event.event_type}: {str(result)}")
+            else:
+                logger.error(f"Ошибка при обработке события {event.event_type} в глобальном обработчике: {str(result)}")
     
     def subscribe(self, event_type: EventType, handler: EventHandler) -> None:
         """
@@ -167,7 +172,7 @@ class EventService:
             Список событий
         """
         if event_type is None:
-            return self._event_history
+            return list(self._event_history)
         
         return [event for event in self._event_history if event.event_type == event_type]
 
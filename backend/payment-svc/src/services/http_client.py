@@ -0,0 +1,57 @@
+"""
+Общий HTTP-клиент для запросов к другим сервисам
+"""
+
+import logging
+from typing import Optional
+
+import httpx
+
+from ..config.settings import get_settings
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# Ограничения пула соединений и таймауты исходящих запросов
+HTTP_LIMITS = httpx.Limits(
+    max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    max_connections=settings.HTTP_MAX_CONNECTIONS,
+)
+HTTP_TIMEOUT = httpx.Timeout(connect=2.0, read=5.0, write=2.0, pool=1.0)
+
+# Клиент (создается при первом обращении)
+_http_client: Optional[httpx.AsyncClient] = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Получение общего асинхронного HTTP-клиента
+
+    Клиент создается один раз на процесс и переиспользует соединения между
+    запросами. По HTTP/2 параллельные запросы к одному сервису мультиплексируются
+    в одном TCP-соединении.
+
+    Returns:
+        HTTP-клиент
+    """
+    global _http_client
+
+    if _http_client is None or _http_client.is_closed:
+        _http_client = httpx.AsyncClient(
+            http2=True,
+            limits=HTTP_LIMITS,
+            timeout=HTTP_TIMEOUT,
+        )
+
+    return _http_client
+
+
+async def close_http_client() -> None:
+    """Закрытие общего HTTP-клиента"""
+    global _http_client
+
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+        logger.info("HTTP-клиент закрыт")
@@ -3,145 +3,112 @@
 """
 
 import logging
-import json
-from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import Column, String, DateTime, Text
-from ..database.connection import Base
+import functools
+from typing import Optional, Callable, Type
+import orjson
+from cachetools import TTLCache
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from pydantic import BaseModel
+from redis.exceptions import RedisError
+from ..database.redis import get_redis
+from ..config.settings import get_settings
 
 logger = logging.getLogger(__name__)
 
-# Кастомный JSON энкодер для обработки объектов datetime
-class DateTimeEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, datetime):
-            return obj.isoformat()
-        return super().default(obj)
+settings = get_settings()
 
-class IdempotencyRecord(Base):
-    """
-    Модель для хранения информации об идемпотентных операциях
-    """
-    __tablename__ = "idempotency_records"
-    
-    key = Column(String(255), primary_key=True, index=True)
-    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
-    expires_at = Column(DateTime, nullable=False)
-    operation_type = Column(String(100), nullable=False, index=True)
-    response_data = Column(Text, nullable=True)
+# Значение-маркер для операции, которая еще выполняется
+IN_PROGRESS_MARKER = b"__in_progress__"
 
-class IdempotencyService:
-    """
-    Сервис для обеспечения идемпотентности операций
-    
-    Предотвращает дублирование операций путем отслеживания выполненных операций
-    по уникальным ключам идемпотентности.
-    """
-    
-    def __init__(self, db: Session):
-        """
-        Инициализация сервиса
-        
-        Args:
-            db: Сессия базы данных
-        """
-        self.db = db
-        self.ttl_days = 7  # По умолчанию записи хранятся 7 дней
-        
-    async def check_and_save(self, 
-                      idempotency_key: str, 
-                      operation_type: str,
-                      response_data: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
-        """
-        Проверить существование операции с указанным ключом идемпотентности и 
-        сохранить новую запись, если операция еще не выполнялась
-        
-        Args:
-            idempotency_key: Уникальный ключ операции
-            operation_type: Тип операции
-            response_data: Данные ответа операции
-            
-        Returns:
-            None, если операция новая, или данные существующей операции
-        """
-        # Проверяем существование записи
-        existing_record = self.db.query(IdempotencyRecord).filter(
-            IdempotencyRecord.key == idempotency_key
-        ).first()
-        
-        if existing_record:
-            logger.info(f"Найдена существующая операция с ключом идемпотентности {idempotency_key}")
-            # Если запись существует, возвращаем сохраненные данные
-            if existing_record.response_data:
-                return json.loads(existing_record.response_data)
-            # Если данные не были сохранены, возвращаем пустой словарь
-            return {}
-        
-        # Создаем новую запись
-        expires_at = datetime.utcnow() + timedelta(days=self.ttl_days)
-        
-        new_record = IdempotencyRecord(
-            key=idempotency_key,
-            operation_type=operation_type,
-            expires_at=expires_at,
-            response_data=json.dumps(response_data, cls=DateTimeEncoder) if response_data else None
-        )
-        
-        self.db.add(new_record)
-        self.db.commit()
-        
-        logger.info(f"Создана новая запись идемпотентности для ключа {idempotency_key}")
-        return None
-    
-    async def save_response(self, idempotency_key: str, response_data: Dict[str, Any]) -> None:
-        """
-        Сохранить данные ответа для существующей операции
-        
-        Args:
-            idempotency_key: Уникальный ключ операции
-            response_data: Данные ответа операции
-        """
-        existing_record = self.db.query(IdempotencyRecord).filter(
-            IdempotencyRecord.key == idempotency_key
-        ).first()
-        
-        if existing_record:
-            existing_record.response_data = json.dumps(response_data, cls=DateTimeEncoder)
-            self.db.commit()
-            logger.info(f"Обновлены данные ответа для ключа идемпотентности {idempotency_key}")
-    
-    async def cleanup_expired(self) -> int:
-        """
-        Очистить истекшие записи идемпотентности
-        
-        Returns:
-            Количество удаленных записей
-        """
-        # Находим и удаляем истекшие записи
-        now = datetime.utcnow()
-        expired_records = self.db.query(IdempotencyRecord).filter(
-            IdempotencyRecord.expires_at < now
-        ).all()
-        
-        count = len(expired_records)
-        
-        if count > 0:
-            for record in expired_records:
-                self.db.delete(record)
-            self.db.commit()
-            logger.info(f"Удалено {count} истекших записей идемпотентности")
-        
-        return count
+# Локальный кэш завершенных операций процесса: повторы в течение минуты
+# обслуживаются из памяти без обращения к Redis
+_IDEM_CACHE: TTLCache = TTLCache(maxsize=10_000, ttl=60)
 
-def get_idempotency_service(db: Session) -> IdempotencyService:
+
+def idempotent(operation_type: str,
+               response_model: Optional[Type[BaseModel]] = None,
+               ttl: Optional[int] = None) -> Callable:
     """
-    Получение экземпляра сервиса идемпотентности
+    Декоратор идемпотентности эндпоинта на основе Redis
+    
+    Ключ берется из параметра эндпоинта x_idempotency_key. Захват ключа выполняется
+    одной атомарной командой SET NX EX, готовый ответ сохраняется одной командой SET.
+    Повторный запрос с тем же ключом получает сохраненный ответ, а параллельный
+    запрос, пока операция выполняется, получает ошибку 409.
     
     Args:
-        db: Сессия базы данных
+        operation_type: Тип операции (входит в ключ Redis)
+        response_model: Pydantic-модель для сериализации ответа
+        ttl: Время жизни записи в секундах (по умолчанию IDEMPOTENCY_TTL_SECONDS)
         
     Returns:
-        Экземпляр IdempotencyService
+        Декоратор эндпоинта
     """
-    return IdempotencyService(db) 
\ No newline at end of file
+    expire = ttl or settings.IDEMPOTENCY_TTL_SECONDS
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            idempotency_key = kwargs.get("x_idempotency_key")
+            if not idempotency_key:
+                return await func(*args, **kwargs)
+
+            local_key = (operation_type, idempotency_key)
+            local_response = _IDEM_CACHE.get(local_key)
+            if local_response is not None:
+                logger.info(f"Возвращаем результат предыдущей операции для ключа {idempotency_key} из локального кэша")
+                return local_response
+
+            redis_client = get_redis()
+            cache_key = f"idem:{operation_type}:{idempotency_key}"
+
+            try:
+                acquired = await redis_client.set(cache_key, IN_PROGRESS_MARKER, nx=True, ex=expire)
+                cached = None if acquired else await redis_client.get(cache_key)
+            except RedisError as e:
+                logger.error(f"Ошибка Redis при проверке идемпотентности: {str(e)}")
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Сервис идемпотентности недоступен"
+                )
+
+            if not acquired:
+                if cached is None or cached == IN_PROGRESS_MARKER:
+                    raise HTTPException(
+                        status_code=status.HTTP_409_CONFLICT,
+                        detail="Операция с этим ключом идемпотентности уже выполняется"
+                    )
+                logger.info(f"Возвращаем результат предыдущей операции для ключа {idempotency_key}")
+                response = orjson.loads(cached)
+                _IDEM_CACHE[local_key] = response
+                return response
+
+            try:
+                result = await func(*args, **kwargs)
+            except Exception:
+                # Освобождаем ключ, чтобы клиент мог повторить неудавшуюся операцию
+                try:
+                    await redis_client.delete(cache_key)
+                except RedisError as e:
+                    logger.error(f"Не удалось освободить ключ идемпотентности {idempotency_key}: {str(e)}")
+                raise
+
+            # Модель ответа строится один раз: она же сохраняется и возвращается клиенту
+            if response_model is not None:
+                result = response_model.model_validate(result)
+                payload = result.model_dump(mode="json")
+            else:
+                payload = jsonable_encoder(result)
+            _IDEM_CACHE[local_key] = payload
+
+            try:
+                await redis_client.set(cache_key, orjson.dumps(payload), xx=True, ex=expire)
+            except RedisError as e:
+                logger.error(f"Не удалось сохранить ответ для ключа идемпотентности {idempotency_key}: {str(e)}")
+
+            return result
+
+        return wrapper
+
+    return decorator
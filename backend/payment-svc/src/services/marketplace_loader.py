@@ -0,0 +1,138 @@
+"""
+Загрузка объявлений и продаж из marketplace-сервиса с объединением запросов
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from ..config.settings import get_settings
+from .http_client import get_http_client
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# Окно накопления идентификаторов перед отправкой запросов (секунды)
+BATCH_WINDOW = 0.002
+
+
+class MarketplaceLoader:
+    """
+    Загрузчик ресурсов marketplace-сервиса с объединением запросов
+
+    Идентификаторы, запрошенные конкурентными обработчиками в течение короткого
+    окна, собираются вместе: повторный запрос того же идентификатора ожидает
+    уже созданный future, а разные идентификаторы запрашиваются параллельно
+    через GET /{resource}/{id}. Пакетного запроса по списку ID marketplace-сервис
+    не предоставляет (GET /{resource} - постраничный список без фильтра по ID).
+    """
+
+    def __init__(self, resource: str, shared: bool = True, window: float = BATCH_WINDOW):
+        """
+        Инициализация загрузчика
+
+        Args:
+            resource: Путь ресурса в marketplace-сервисе (listings, sales)
+            shared: Данные одинаковы для всех пользователей - пакет общий для всех
+                токенов; иначе пакеты собираются отдельно для каждого токена
+            window: Окно накопления идентификаторов в секундах
+        """
+        self.resource = resource
+        self.shared = shared
+        self.window = window
+        self._pending: Dict[Optional[str], Dict[int, asyncio.Future]] = {}
+        self._tokens: Dict[Optional[str], str] = {}
+
+    async def load(self, item_id: int, token: str) -> Optional[Dict[str, Any]]:
+        """
+        Получить запись по ID
+
+        Args:
+            item_id: ID записи
+            token: Токен пользователя для запроса к marketplace-сервису
+
+        Returns:
+            Данные записи или None, если запись не найдена
+        """
+        batch_key = None if self.shared else token
+        batch = self._pending.get(batch_key)
+        if batch is None:
+            batch = self._pending[batch_key] = {}
+            self._tokens[batch_key] = token
+            asyncio.get_running_loop().create_task(self._flush(batch_key))
+
+        future = batch.get(item_id)
+        if future is None:
+            future = batch[item_id] = asyncio.get_running_loop().create_future()
+
+        # shield: отмена одного ожидающего не должна отменять результат для остальных
+        return await asyncio.shield(future)
+
+    async def _flush(self, batch_key: Optional[str]) -> None:
+        """Отправка накопленного пакета и разрешение future по каждому ID"""
+        await asyncio.sleep(self.window)
+        batch = self._pending.pop(batch_key)
+        token = self._tokens.pop(batch_key)
+
+        try:
+            results = await self._fetch_many(list(batch), token)
+        except Exception as e:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for item_id, future in batch.items():
+            if future.done():
+                continue
+            result = results.get(item_id)
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    async def _fetch_many(self, item_ids: List[int], token: str) -> Dict[int, Any]:
+        """
+        Запросить записи по списку ID
+
+        Args:
+            item_ids: Список ID записей
+            token: Токен пользователя
+
+        Returns:
+            Словарь {ID: данные записи, None или исключение запроса}
+        """
+        headers = {"Authorization": f"Bearer {token}"}
+        results = await asyncio.gather(
+            *(self._fetch_one(item_id, headers) for item_id in item_ids),
+            return_exceptions=True
+        )
+        return dict(zip(item_ids, results))
+
+    async def _fetch_one(self, item_id: int, headers: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        """
+        Запрос одной записи по ID
+
+        Returns:
+            Данные записи без обертки SuccessResponse или None, если запись не найдена
+        """
+        response = await get_http_client().get(
+            f"{settings.MARKETPLACE_SERVICE_URL}/{self.resource}/{item_id}",
+            headers=headers
+        )
+
+        if response.status_code != 200:
+            return None
+
+        payload = response.json()
+        # Объявления возвращаются в обертке {"success", "data", "meta"}, продажи - без нее
+        if isinstance(payload, dict) and "data" in payload and "success" in payload:
+            return payload["data"]
+        return payload
+
+
+# Данные объявления одинаковы для всех авторизованных пользователей,
+# продажа запрашивается с токеном пользователя, чьи права на нее проверяются
+listing_loader = MarketplaceLoader("listings")
+sale_loader = MarketplaceLoader("sales", shared=False)
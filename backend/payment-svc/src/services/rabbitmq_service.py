@@ -2,7 +2,7 @@
 Сервис для работы с RabbitMQ
 """
 
-import json
+import orjson
 import pika
 import aio_pika
 import asyncio
@@ -84,13 +84,14 @@ class RabbitMQService:
             durable=True
         )
 
-        # Преобразуем сообщение в JSON
-        message_body = json.dumps(message).encode('utf-8')
+        # Преобразуем сообщение в JSON (orjson сразу возвращает байты UTF-8)
+        message_body = orjson.dumps(message, option=orjson.OPT_NON_STR_KEYS)
 
         # Создаем и публикуем сообщение
         await exchange.publish(
             aio_pika.Message(
                 body=message_body,
+                content_type="application/json",
                 delivery_mode=aio_pika.DeliveryMode.PERSISTENT
             ),
             routing_key=routing_key
@@ -137,8 +138,7 @@ class RabbitMQService:
             """Обработка входящего сообщения"""
             async with message.process():
                 try:
-                    message_body = message.body.decode('utf-8')
-                    message_data = json.loads(message_body)
+                    message_data = orjson.loads(message.body)
                     await callback(message_data)
                 except Exception as e:
                     logger.error(f"Error processing message: {str(e)}")
@@ -9,6 +9,7 @@ from datetime import datetime, timedelta
 from ..models.transaction import Transaction, TransactionStatus, TransactionType
 from ..models.core import User
 from ..database.connection import get_db
+from ..schemas.base import page_count
 
 class SalesService:
     """
@@ -88,7 +89,7 @@ class SalesService:
             })
         
         # Вычисляем количество страниц
-        pages = (total_count + page_size - 1) // page_size if page_size > 0 else 0
+        pages = page_count(total_count, page_size)
         
         return {
             "items": sales_list,
@@ -307,7 +308,7 @@ class SalesService:
             })
         
         # Вычисляем количество страниц
-        pages = (total_count + page_size - 1) // page_size if page_size > 0 else 0
+        pages = page_count(total_count, page_size)
         
         return {
             "items": sales_list,
@@ -9,7 +9,6 @@ from sqlalchemy import func, desc, and_, extract, case, text, literal, String
 from datetime import datetime, timedelta, date
 import calendar
 from dateutil.relativedelta import relativedelta
-import httpx
 import logging
 from decimal import Decimal
 from ..config import get_settings
@@ -17,6 +16,7 @@ from ..models.transaction import Transaction, TransactionStatus, TransactionType
 from ..models.core import Sale, SaleStatus
 from ..models.statistics import SellerStatistics, BuyerStatistics, ProductStatistics
 from ..services.currency_service import get_currency_service
+from ..services.http_client import get_http_client
 
 logger = logging.getLogger(__name__)
 settings = get_settings()
@@ -67,8 +67,9 @@ class StatisticsService:
             else:  # all
                 start_date = end_date - timedelta(days=365 * 2)  # за 2 года
         
-        # Инициализируем сервис конвертации валют
+        # Инициализируем сервис конвертации валют и обновляем курсы один раз на весь расчет
         currency_service = get_currency_service(self.db)
+        await currency_service.get_exchange_rates()
         
         # Фильтр по продавцу и временному диапазону
         date_filter = and_(
@@ -89,7 +90,7 @@ class StatisticsService:
         
         for transaction in transactions:
             # Конвертируем сумму в базовую валюту
-            converted_amount = await currency_service.convert_currency(
+            converted_amount = currency_service.convert_currency(
                 Decimal(str(transaction.amount)), 
                 transaction.currency, 
                 base_currency
@@ -136,48 +137,46 @@ class StatisticsService:
         game_results = []
         try:
             api_url = f"{settings.MARKETPLACE_SERVICE_URL}/statistics/listings/by-ids"
-            async with httpx.AsyncClient() as client:
-                response = await client.get(api_url, params={"listing_ids": listing_ids})
-                logger.info(f"Получен ответ от marketplace-svc: {response.status_code}")
-                if response.status_code == 200:
-                    result_data = response.json()
-                    if "data" in result_data:
-                        listings_data = result_data["data"]
-                        # Преобразуем данные в формат [(game_name, sales_count), ...]
-                        game_sales = {}
-                        for listing in listings_data:
-                            game_name = listing.get("game_name", "Неизвестно")
-                            if game_name in game_sales:
-                                game_sales[game_name] += 1
-                            else:
-                                game_sales[game_name] = 1
+            response = await get_http_client().get(api_url, params={"listing_ids": listing_ids})
+            logger.info(f"Получен ответ от marketplace-svc: {response.status_code}")
+            if response.status_code == 200:
+                result_data = response.json()
+                if "data" in result_data:
+                    listings_data = result_data["data"]
+                    # Преобразуем данные в формат [(game_name, sales_count), ...]
+                    game_sales = {}
+                    for listing in listings_data:
+                        game_name = listing.get("game_name", "Неизвестно")
+                        if game_name in game_sales:
+                            game_sales[game_name] += 1
+                        else:
+                            game_sales[game_name] = 1
                         
-                        game_results = [(game, count) for game, count in game_sales.items()]
-                        # Сортируем по количеству продаж (убывание)
-                        game_results.sort(key=lambda x: x[1], reverse=True)
-                else:
-                    # Если произошла ошибка, попробуем по старому способу (получаем данные по одному)
-                    api_url = f"{settings.MARKETPLACE_SERVICE_URL}/statistics/listing"
-                    for listing_id in listing_ids:
-                        async with httpx.AsyncClient() as client:
-                            response = await client.get(f"{api_url}/{listing_id}")
-                            if response.status_code == 200:
-                                listing_data = response.json()
-                                if "data" in listing_data:
-                                    listing_info = listing_data["data"]
-                                    game_name = listing_info.get("game", "Неизвестно")
-                                    # Добавляем информацию об игре в результаты
-                                    found = False
-                                    for i, (name, count) in enumerate(game_results):
-                                        if name == game_name:
-                                            # Обновляем счетчик для существующей игры
-                                            game_results[i] = (name, count + 1)
-                                            found = True
-                                            break
-                                    
-                                    if not found:
-                                        # Добавляем новую игру
-                                        game_results.append((game_name, 1))
+                    game_results = [(game, count) for game, count in game_sales.items()]
+                    # Сортируем по количеству продаж (убывание)
+                    game_results.sort(key=lambda x: x[1], reverse=True)
+            else:
+                # Если произошла ошибка, попробуем по старому способу (получаем данные по одному)
+                api_url = f"{settings.MARKETPLACE_SERVICE_URL}/statistics/listing"
+                for listing_id in listing_ids:
+                    response = await get_http_client().get(f"{api_url}/{listing_id}")
+                    if response.status_code == 200:
+                        listing_data = response.json()
+                        if "data" in listing_data:
+                            listing_info = listing_data["data"]
+                            game_name = listing_info.get("game", "Неизвестно")
+                            # Добавляем информацию об игре в результаты
+                            found = False
+                            for i, (name, count) in enumerate(game_results):
+                                if name == game_name:
+                                    # Обновляем счетчик для существующей игры
+                                    game_results[i] = (name, count + 1)
+                                    found = True
+                                    break
+                                
+                            if not found:
+                                # Добавляем новую игру
+                                game_results.append((game_name, 1))
         except Exception as e:
             # В случае ошибки, просто логируем и продолжаем
             print(f"Ошибка при получении данных из marketplace-svc: {str(e)}")
@@ -186,10 +185,9 @@ class StatisticsService:
             api_url = f"{settings.MARKETPLACE_SERVICE_URL}/listings"
             for listing_id in listing_ids:
                 try:
-                    async with httpx.AsyncClient() as client:
-                        response = await client.get(f"{api_url}/{listing_id}")
-                        if response.status_code == 200:
-                            game_results.append(response.json())
+                    response = await get_http_client().get(f"{api_url}/{listing_id}")
+                    if response.status_code == 200:
+                        game_results.append(response.json())
                 except Exception as inner_e:
                     print(f"Ошибка при получении данных о листинге {listing_id}: {str(inner_e)}")
         
@@ -494,12 +492,11 @@ class StatisticsService:
             if end_date:
                 params["end_date"] = end_date.isoformat()
                 
-            async with httpx.AsyncClient() as client:
-                response = await client.get(api_url, params=params)
-                if response.status_code == 200:
-                    result_data = response.json()
-                    if "data" in result_data:
-                        return result_data["data"]
+            response = await get_http_client().get(api_url, params=params)
+            if response.status_code == 200:
+                result_data = response.json()
+                if "data" in result_data:
+                    return result_data["data"]
                     
             # Если данные не получены, возвращаем пустой результат
             return [{
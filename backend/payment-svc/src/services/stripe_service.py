@@ -3,6 +3,8 @@
 Эмулирует основные функции Stripe для обработки платежей.
 """
 
+import hashlib
+import hmac
 import logging
 import uuid
 import time
@@ -405,6 +407,48 @@ class StripeService:
         
         return {"status": "processed"}
 
+def verify_webhook_signature(payload: bytes, sig_header: Optional[str], secret: str,
+                             tolerance: int = 300) -> None:
+    """
+    Проверяет подпись webhook-уведомления по заголовку Stripe-Signature
+    
+    Подпись - HMAC-SHA256 от "{timestamp}.{тело запроса}", заголовок имеет вид
+    "t=<timestamp>,v1=<подпись>[,v1=...]".
+    
+    Args:
+        payload: Тело запроса без изменений
+        sig_header: Значение заголовка Stripe-Signature
+        secret: Секрет подписи webhook
+        tolerance: Допустимый возраст подписи в секундах
+        
+    Raises:
+        HTTPException: Если подпись отсутствует, устарела или не совпадает
+    """
+    if not sig_header:
+        raise HTTPException(status_code=400, detail="Отсутствует подпись webhook")
+    
+    timestamp = None
+    signatures = []
+    for item in sig_header.split(","):
+        key, _, value = item.strip().partition("=")
+        if key == "t":
+            timestamp = value
+        elif key == "v1":
+            signatures.append(value)
+    
+    if not timestamp or not timestamp.isdigit() or not signatures:
+        raise HTTPException(status_code=400, detail="Некорректная подпись webhook")
+    
+    if abs(time.time() - int(timestamp)) > tolerance:
+        raise HTTPException(status_code=400, detail="Подпись webhook устарела")
+    
+    expected = hmac.new(
+        secret.encode(), timestamp.encode() + b"." + payload, hashlib.sha256
+    ).hexdigest()
+    
+    if not any(hmac.compare_digest(expected, signature) for signature in signatures):
+        raise HTTPException(status_code=400, detail="Неверная подпись webhook")
+
 def get_stripe_service(db: Session = None) -> StripeService:
     """
     Фабричная функция для получения экземпляра сервиса Stripe
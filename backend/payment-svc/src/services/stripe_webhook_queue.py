@@ -0,0 +1,282 @@
+"""
+Очередь webhook-уведомлений Stripe на Redis Streams
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import orjson
+from fastapi import HTTPException
+from redis.exceptions import RedisError, ResponseError
+
+from ..config.settings import get_settings
+from ..database.connection import session_factory
+from ..database.redis import get_redis
+from .wallet_service import WalletService
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# Группа потребителей, общая для всех экземпляров сервиса
+CONSUMER_GROUP = "payment-svc"
+
+
+async def publish_stripe_webhook(event_data: bytes) -> str:
+    """
+    Поставить webhook-уведомление Stripe в очередь
+
+    Args:
+        event_data: Тело события в JSON
+
+    Returns:
+        ID записи в потоке
+    """
+    message_id = await get_redis().xadd(
+        settings.STRIPE_WEBHOOK_STREAM,
+        {"data": event_data},
+        maxlen=settings.STRIPE_WEBHOOK_STREAM_MAXLEN,
+        approximate=True
+    )
+    return message_id.decode()
+
+
+class StripeWebhookConsumer:
+    """
+    Обработчик очереди webhook-уведомлений Stripe
+
+    Читает поток через группу потребителей: каждое событие получает один
+    экземпляр сервиса, и подтверждается (XACK) только после обработки.
+    Необработанные из-за сбоя события остаются в списке ожидающих группы.
+    Периодически обработчик забирает (XAUTOCLAIM) ожидающие дольше
+    STRIPE_WEBHOOK_RECLAIM_IDLE_MS события любого потребителя группы, в том
+    числе остановленного или перезапущенного экземпляра, и обрабатывает их
+    повторно. Событие, доставленное STRIPE_WEBHOOK_MAX_DELIVERIES раз и так
+    и не обработанное, переносится в поток STRIPE_WEBHOOK_DEAD_LETTER_STREAM.
+    """
+
+    def __init__(self, block_ms: int = 5000, batch_size: int = 10):
+        """
+        Инициализация обработчика
+
+        Args:
+            block_ms: Время ожидания новых событий в XREADGROUP (мс)
+            batch_size: Максимальное число событий за одно чтение
+        """
+        self.block_ms = block_ms
+        self.batch_size = batch_size
+        self.consumer_name = f"{socket.gethostname()}-{os.getpid()}"
+        self.reclaim_idle_ms = settings.STRIPE_WEBHOOK_RECLAIM_IDLE_MS
+        self.max_deliveries = settings.STRIPE_WEBHOOK_MAX_DELIVERIES
+        self._task: Optional[asyncio.Task] = None
+
+    async def initialize(self) -> None:
+        """Создание группы потребителей и запуск фоновой задачи"""
+        if self._task is not None:
+            return
+
+        try:
+            await get_redis().xgroup_create(
+                settings.STRIPE_WEBHOOK_STREAM, CONSUMER_GROUP, id="0", mkstream=True
+            )
+        except ResponseError as e:
+            # Группа уже создана другим экземпляром сервиса
+            if "BUSYGROUP" not in str(e):
+                raise
+
+        self._task = asyncio.create_task(self._consume_loop())
+        self._task.add_done_callback(self._on_task_done)
+        logger.info(f"Обработчик webhook-уведомлений Stripe запущен ({self.consumer_name})")
+
+    async def _consume_loop(self) -> None:
+        """Фоновая задача чтения и обработки событий"""
+        # Зависшие события проверяются сразу при запуске, затем - с периодом,
+        # равным минимальному времени простоя
+        next_reclaim = 0.0
+
+        while True:
+            try:
+                if time.monotonic() >= next_reclaim:
+                    await self._reclaim_pending()
+                    next_reclaim = time.monotonic() + self.reclaim_idle_ms / 1000
+
+                response = await get_redis().xreadgroup(
+                    CONSUMER_GROUP,
+                    self.consumer_name,
+                    {settings.STRIPE_WEBHOOK_STREAM: ">"},
+                    count=self.batch_size,
+                    block=self.block_ms
+                )
+
+                messages: List[Tuple[bytes, Dict[bytes, bytes]]] = response[0][1] if response else []
+
+                for message_id, fields in messages:
+                    await self._process(message_id, fields)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Неподтвержденные события остаются в списке ожидающих и будут забраны XAUTOCLAIM
+                logger.error(f"Ошибка при чтении очереди webhook-уведомлений Stripe: {str(e)}")
+                await asyncio.sleep(1)
+
+    async def _reclaim_pending(self) -> None:
+        """
+        Повторная обработка зависших событий
+
+        Забирает у любого потребителя группы события, не подтвержденные дольше
+        reclaim_idle_ms, и обрабатывает их. События, превысившие число доставок,
+        переносятся в поток недоставленных.
+        """
+        redis = get_redis()
+        start_id = "0-0"
+
+        while True:
+            response = await redis.xautoclaim(
+                settings.STRIPE_WEBHOOK_STREAM,
+                CONSUMER_GROUP,
+                self.consumer_name,
+                min_idle_time=self.reclaim_idle_ms,
+                start_id=start_id,
+                count=self.batch_size
+            )
+            start_id, messages = response[0], response[1]
+
+            for message_id, fields in messages:
+                if message_id is None:
+                    continue
+                if fields is None:
+                    # Запись удалена из потока (обрезка по MAXLEN) - обрабатывать нечего
+                    await redis.xack(settings.STRIPE_WEBHOOK_STREAM, CONSUMER_GROUP, message_id)
+                    continue
+
+                pending = await redis.xpending_range(
+                    settings.STRIPE_WEBHOOK_STREAM, CONSUMER_GROUP,
+                    min=message_id, max=message_id, count=1
+                )
+                deliveries = pending[0]["times_delivered"] if pending else 0
+                if deliveries > self.max_deliveries:
+                    await self._dead_letter(message_id, fields, deliveries)
+                    continue
+
+                logger.info(f"Повторная обработка webhook-уведомления Stripe {message_id.decode()} (попытка {deliveries})")
+                await self._process(message_id, fields)
+
+            if start_id in (b"0-0", "0-0"):
+                break
+
+    async def _process(self, message_id: bytes, fields: Dict[bytes, bytes]) -> None:
+        """Обработка события и его подтверждение при успехе"""
+        if not await self._handle(message_id, fields):
+            return
+
+        try:
+            await get_redis().xack(settings.STRIPE_WEBHOOK_STREAM, CONSUMER_GROUP, message_id)
+        except RedisError as e:
+            # Событие останется в списке ожидающих и будет обработано повторно
+            logger.error(f"Не удалось подтвердить webhook-уведомление Stripe {message_id.decode()}: {str(e)}")
+
+    async def _dead_letter(self, message_id: bytes, fields: Dict[bytes, bytes], deliveries: int) -> None:
+        """
+        Перенос события в поток недоставленных
+
+        Args:
+            message_id: ID записи в потоке
+            fields: Поля записи
+            deliveries: Число доставок события
+        """
+        redis = get_redis()
+        await redis.xadd(
+            settings.STRIPE_WEBHOOK_DEAD_LETTER_STREAM,
+            {**fields, b"source_id": message_id, b"deliveries": str(deliveries).encode()},
+            maxlen=settings.STRIPE_WEBHOOK_STREAM_MAXLEN,
+            approximate=True
+        )
+        await redis.xack(settings.STRIPE_WEBHOOK_STREAM, CONSUMER_GROUP, message_id)
+        logger.error(
+            f"Webhook-уведомление Stripe {message_id.decode()} не обработано за {deliveries - 1} попыток "
+            f"и перенесено в {settings.STRIPE_WEBHOOK_DEAD_LETTER_STREAM}"
+        )
+
+    async def _handle(self, message_id: bytes, fields: Dict[bytes, bytes]) -> bool:
+        """
+        Обработка одного события
+
+        Args:
+            message_id: ID записи в потоке
+            fields: Поля записи
+
+        Returns:
+            True, если событие можно подтвердить
+        """
+        try:
+            event_data: Dict[str, Any] = orjson.loads(fields[b"data"])
+        except (KeyError, orjson.JSONDecodeError):
+            logger.error(f"Некорректное webhook-уведомление Stripe {message_id.decode()} пропущено")
+            return True
+
+        db = session_factory()
+        try:
+            await WalletService(db).process_payment_webhook(event_data)
+            return True
+        except HTTPException as e:
+            # Ошибка данных события: повторная обработка не поможет
+            logger.warning(f"Webhook-уведомление Stripe {message_id.decode()} отклонено: {e.detail}")
+            db.rollback()
+            return True
+        except Exception as e:
+            logger.error(f"Ошибка при обработке webhook-уведомления Stripe {message_id.decode()}: {str(e)}")
+            db.rollback()
+            return False
+        finally:
+            db.close()
+
+    def _on_task_done(self, task: asyncio.Task) -> None:
+        """Логирование аварийного завершения фоновой задачи"""
+        if not task.cancelled() and task.exception() is not None:
+            logger.critical(
+                f"Обработчик webhook-уведомлений Stripe остановлен из-за ошибки: {str(task.exception())}",
+                exc_info=task.exception()
+            )
+
+    async def stop(self) -> None:
+        """Остановка фоновой задачи"""
+        if self._task is None:
+            return
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("Обработчик webhook-уведомлений Stripe остановлен")
+
+
+# Синглтон обработчика очереди
+_stripe_webhook_consumer_instance: Optional[StripeWebhookConsumer] = None
+
+
+def get_stripe_webhook_consumer() -> StripeWebhookConsumer:
+    """
+    Получение экземпляра обработчика очереди webhook-уведомлений Stripe
+
+    Returns:
+        Экземпляр StripeWebhookConsumer
+    """
+    global _stripe_webhook_consumer_instance
+
+    if _stripe_webhook_consumer_instance is None:
+        _stripe_webhook_consumer_instance = StripeWebhookConsumer()
+
+    return _stripe_webhook_consumer_instance
+
+
+async def setup_stripe_webhook_consumer() -> None:
+    """
+    Настройка обработчика очереди webhook-уведомлений Stripe
+    """
+    await get_stripe_webhook_consumer().initialize()
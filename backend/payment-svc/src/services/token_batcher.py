@@ -0,0 +1,157 @@
+"""
+Пакетная проверка токенов в auth-svc
+"""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+from ..config.settings import get_settings
+from .http_client import get_http_client
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# Окно накопления токенов перед отправкой пакета (секунды)
+TOKEN_BATCH_WINDOW = 0.01
+
+# Максимальное число токенов в одном пакете
+TOKEN_BATCH_MAX_SIZE = 20
+
+
+class TokenBatcher:
+    """
+    Проверка токенов с объединением запросов
+
+    Токены, проверяемые конкурентными обработчиками в течение короткого окна,
+    отправляются в auth-svc одним POST /api/auth/validate/batch. Полный пакет
+    отправляется сразу, не дожидаясь конца окна. Если auth-svc не поддерживает
+    пакетный запрос или вернул некорректный ответ, токены проверяются по одному.
+    """
+
+    def __init__(self, window: float = TOKEN_BATCH_WINDOW, max_batch_size: int = TOKEN_BATCH_MAX_SIZE):
+        """
+        Инициализация
+
+        Args:
+            window: Окно накопления токенов в секундах
+            max_batch_size: Максимальное число токенов в пакете
+        """
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._batch: Optional[Dict[str, asyncio.Future]] = None
+        self._batch_supported = True
+
+    async def validate(self, token: str) -> Optional[Dict[str, Any]]:
+        """
+        Проверить токен
+
+        Args:
+            token: JWT токен
+
+        Returns:
+            Ответ auth-svc для токена ({"is_valid", "user_id", "username"})
+            или None, если проверить токен не удалось
+        """
+        loop = asyncio.get_running_loop()
+        batch = self._batch
+        if batch is None:
+            batch = self._batch = {}
+            loop.create_task(self._flush_after_window(batch))
+
+        future = batch.get(token)
+        if future is None:
+            future = batch[token] = loop.create_future()
+
+        if len(batch) >= self.max_batch_size:
+            self._batch = None
+            loop.create_task(self._flush(batch))
+
+        # shield: отмена одного ожидающего не должна отменять результат для остальных
+        return await asyncio.shield(future)
+
+    async def _flush_after_window(self, batch: Dict[str, asyncio.Future]) -> None:
+        """Отправка пакета по окончании окна, если он не был отправлен заполненным"""
+        await asyncio.sleep(self.window)
+        if self._batch is batch:
+            self._batch = None
+            await self._flush(batch)
+
+    async def _flush(self, batch: Dict[str, asyncio.Future]) -> None:
+        """Проверка накопленных токенов и разрешение future по каждому из них"""
+        tokens = list(batch)
+        try:
+            results = await self._validate_many(tokens)
+        except Exception as e:
+            logger.error(f"Ошибка при пакетной проверке токенов: {str(e)}")
+            results = [None] * len(tokens)
+
+        for token, result in zip(tokens, results):
+            future = batch[token]
+            if not future.done():
+                future.set_result(result)
+
+    async def _validate_many(self, tokens: List[str]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Проверить пакет токенов
+
+        Args:
+            tokens: Список токенов
+
+        Returns:
+            Ответы auth-svc в порядке токенов
+        """
+        if len(tokens) > 1 and self._batch_supported:
+            response = await get_http_client().post(
+                f"{settings.AUTH_SERVICE_URL}/api/auth/validate/batch",
+                json={"tokens": tokens}
+            )
+
+            if response.status_code == 200:
+                results = response.json()
+                if isinstance(results, list) and len(results) == len(tokens):
+                    return results
+                logger.error("Некорректный ответ auth-svc на пакетную проверку токенов")
+            elif response.status_code in (404, 405):
+                logger.warning("auth-svc не поддерживает пакетную проверку токенов, проверяем по одному")
+                self._batch_supported = False
+            else:
+                logger.error(f"Ошибка пакетной проверки токенов: {response.status_code} - {response.text}")
+
+        return list(await asyncio.gather(*(self._validate_one(token) for token in tokens)))
+
+    async def _validate_one(self, token: str) -> Optional[Dict[str, Any]]:
+        """Проверка одного токена"""
+        try:
+            response = await get_http_client().post(
+                f"{settings.AUTH_SERVICE_URL}/api/auth/validate",
+                json={"token": token}
+            )
+        except Exception as e:
+            logger.error(f"Ошибка при валидации токена: {str(e)}")
+            return None
+
+        if response.status_code != 200:
+            logger.error(f"Ошибка валидации токена: {response.status_code} - {response.text}")
+            return None
+        return response.json()
+
+
+# Синглтон для использования в сервисах
+_token_batcher_instance: Optional[TokenBatcher] = None
+
+
+def get_token_batcher() -> TokenBatcher:
+    """
+    Получение экземпляра пакетной проверки токенов
+
+    Returns:
+        Экземпляр TokenBatcher
+    """
+    global _token_batcher_instance
+
+    if _token_batcher_instance is None:
+        _token_batcher_instance = TokenBatcher()
+
+    return _token_batcher_instance
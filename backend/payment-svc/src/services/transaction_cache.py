@@ -0,0 +1,43 @@
+"""
+Ключи Redis-кэша транзакций и их сброс после смены статуса
+"""
+
+import logging
+
+from redis.exceptions import RedisError
+
+from ..database.redis import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Варианты ответа деталей: роль пользователя и признак администратора
+DETAILS_CACHE_VARIANTS = [
+    (role, is_admin) for role in ("buyer", "seller", "admin") for is_admin in (False, True)
+]
+
+
+def timeline_cache_key(transaction_id: int) -> str:
+    """Ключ закэшированного таймлайна транзакции"""
+    return f"txn:{transaction_id}:tl"
+
+
+def details_cache_key(transaction_id: int, user_role: str, is_admin: bool) -> str:
+    """Ключ закэшированных деталей транзакции для роли пользователя"""
+    return f"tx:detail:{transaction_id}:{user_role}:{int(is_admin)}"
+
+
+async def invalidate_transaction_cache(transaction_id: int) -> None:
+    """
+    Удаляет таймлайн и детали транзакции из кэша после смены ее статуса
+
+    Args:
+        transaction_id: ID транзакции
+    """
+    keys = [timeline_cache_key(transaction_id)]
+    keys.extend(
+        details_cache_key(transaction_id, role, is_admin) for role, is_admin in DETAILS_CACHE_VARIANTS
+    )
+    try:
+        await get_redis().delete(*keys)
+    except RedisError as e:
+        logger.warning(f"Не удалось сбросить кэш транзакции {transaction_id}: {str(e)}")
@@ -2,16 +2,17 @@
 Сервис для работы с историей транзакций
 """
 
-from sqlalchemy.orm import Session
-from sqlalchemy import desc, func, and_, case, literal_column, extract
+from sqlalchemy.orm import Session, raiseload
+from sqlalchemy import select, desc, func, and_, case, literal_column, extract
 from fastapi import Depends
-from typing import List, Optional, Dict, Any, Tuple
+from typing import List, Optional, Dict, Any, Tuple, Iterator
 import logging
 from datetime import datetime, timedelta
 
 from ..models.transaction import Transaction, TransactionStatus, TransactionType
 from ..models.transaction_history import TransactionHistory
 from ..schemas.transaction_history import TransactionHistoryCreate, TransactionHistoryResponse, TransactionHistoryListResponse
+from ..schemas.base import from_orm_fast
 from ..database.connection import get_db
 
 logger = logging.getLogger(__name__)
@@ -41,9 +42,19 @@ class TransactionHistoryService:
         logger.info(f"Created transaction history record: {history_record.id} for transaction {data.transaction_id}")
         return history_record
     
+    def _history_query(self):
+        """
+        Базовый запрос к истории транзакций
+        
+        Сериализация истории использует только колонки записи, поэтому связь
+        с транзакцией не загружается; случайное обращение к ней вызовет ошибку
+        вместо скрытого запроса на каждую строку.
+        """
+        return self.db.query(TransactionHistory).options(raiseload(TransactionHistory.transaction))
+    
     def get_transaction_history(self, transaction_id: int) -> List[TransactionHistory]:
         """Получение истории для конкретной транзакции"""
-        return self.db.query(TransactionHistory).filter(
+        return self._history_query().filter(
             TransactionHistory.transaction_id == transaction_id
         ).order_by(TransactionHistory.timestamp.desc()).all()
     
@@ -57,10 +68,71 @@ class TransactionHistoryService:
         page_size: int = 20
     ) -> TransactionHistoryListResponse:
         """Получение истории транзакций с пагинацией и фильтрацией"""
-        # Подготовка базового запроса
-        query = self.db.query(TransactionHistory)
+        query = self._filter_history(self._history_query(), user_id, status, start_date, end_date)
+        
+        # Получение общего количества записей
+        total = query.count()
+        
+        # Рассчет пагинации
+        offset = (page - 1) * page_size
+        
+        # Получение результатов с пагинацией и сортировкой
+        items = query.order_by(TransactionHistory.timestamp.desc()).offset(offset).limit(page_size).all()
+        
+        return TransactionHistoryListResponse(
+            items=[from_orm_fast(TransactionHistoryResponse, item) for item in items],
+            total=total,
+            page=page,
+            size=page_size
+        )
+    
+    def stream_for_report(
+        self,
+        user_id: Optional[int] = None,
+        status: Optional[TransactionStatus] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None,
+        batch_size: int = 1000
+    ) -> Iterator[TransactionHistory]:
+        """
+        Потоковое получение истории транзакций для отчетов, без пагинации
         
-        # Применение фильтров
+        Все записи выбираются одним запросом без OFFSET. В PostgreSQL используется
+        серверный курсор (stream_results), строки читаются пачками по batch_size,
+        поэтому в памяти не держится вся выборка сразу. Сортировка по времени
+        обслуживается индексами (new_status, timestamp) и (transaction_id, timestamp).
+        
+        Returns:
+            Итератор записей истории (новые сверху)
+        """
+        statement = self._filter_history(
+            select(TransactionHistory).options(raiseload(TransactionHistory.transaction)),
+            user_id, status, start_date, end_date
+        ).order_by(TransactionHistory.timestamp.desc()).execution_options(
+            stream_results=True, yield_per=batch_size
+        )
+        yield from self.db.execute(statement).scalars()
+    
+    def has_transactions_history(
+        self,
+        user_id: Optional[int] = None,
+        status: Optional[TransactionStatus] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ) -> bool:
+        """Проверка наличия записей истории по фильтрам (запрос одной строки, без COUNT)"""
+        query = self._filter_history(self.db.query(TransactionHistory.id), user_id, status, start_date, end_date)
+        return query.first() is not None
+    
+    def _filter_history(
+        self,
+        query,
+        user_id: Optional[int] = None,
+        status: Optional[TransactionStatus] = None,
+        start_date: Optional[datetime] = None,
+        end_date: Optional[datetime] = None
+    ):
+        """Применение фильтров по пользователю, статусу и датам к запросу истории"""
         if user_id is not None:
             # Находим транзакции, где пользователь является покупателем или продавцом
             transaction_ids = self.db.query(Transaction.id).filter(
@@ -78,33 +150,32 @@ class TransactionHistoryService:
         if end_date is not None:
             query = query.filter(TransactionHistory.timestamp <= end_date)
         
-        # Получение общего количества записей
-        total = query.count()
-        
-        # Рассчет пагинации
-        pages = (total + page_size - 1) // page_size if total > 0 else 0
-        offset = (page - 1) * page_size
-        
-        # Получение результатов с пагинацией и сортировкой
-        items = query.order_by(TransactionHistory.timestamp.desc()).offset(offset).limit(page_size).all()
-        
-        return TransactionHistoryListResponse(
-            items=items,
-            total=total,
-            page=page,
-            size=page_size,
-            pages=pages
-        )
+        return query
     
     def get_transaction_timeline(self, transaction_id: int) -> List[TransactionHistory]:
         """Получение таймлайна для конкретной транзакции"""
-        return self.db.query(TransactionHistory).filter(
+        return self._history_query().filter(
             TransactionHistory.transaction_id == transaction_id
         ).order_by(TransactionHistory.timestamp.asc()).all()
     
+    def iter_transaction_timeline(self, transaction_id: int, batch_size: int = 1000) -> Iterator[TransactionHistory]:
+        """
+        Потоковое получение таймлайна транзакции
+        
+        Записи читаются из БД порциями по batch_size, без загрузки всего таймлайна в память.
+        """
+        query = self._history_query().filter(TransactionHistory.transaction_id == transaction_id)
+        yield from query.order_by(TransactionHistory.timestamp.asc()).yield_per(batch_size)
+    
+    def exists_for_transaction(self, transaction_id: int) -> bool:
+        """Проверка наличия истории у транзакции (запрос одной строки, без COUNT)"""
+        return self.db.query(TransactionHistory.id).filter(
+            TransactionHistory.transaction_id == transaction_id
+        ).first() is not None
+    
     def get_recent_history(self, limit: int = 50) -> List[TransactionHistory]:
         """Получение последних изменений в истории транзакций"""
-        return self.db.query(TransactionHistory).order_by(
+        return self._history_query().order_by(
             TransactionHistory.timestamp.desc()
         ).limit(limit).all()
 
@@ -2,21 +2,70 @@
 Сервис для работы с транзакциями и механизмом Escrow
 """
 
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
+from sqlalchemy.orm import Session, selectinload, configure_mappers
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, or_, func, select, bindparam
 from datetime import datetime, timedelta, timezone
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 import logging
+from functools import lru_cache
 from uuid import UUID
 
 from .transaction_history_service import TransactionHistoryService
 from ..models.transaction import Transaction, TransactionStatus, TransactionType
+from ..models.transaction_history import TransactionHistory
 from ..models.wallet import Wallet, WalletTransaction, Currency, WalletStatus
 from ..schemas.transaction import TransactionCreate, TransactionUpdate
 from .rabbitmq_service import get_rabbitmq_service
 
 logger = logging.getLogger(__name__)
 
+# Запрос транзакции по ID строится один раз при импорте; его скомпилированный
+# SQL переиспользуется из кэша движка при каждом вызове
+_SELECT_TRANSACTION_BY_ID = select(Transaction).where(Transaction.id == bindparam("transaction_id"))
+
+
+@lru_cache(maxsize=None)
+def _select_transaction_for_details():
+    """
+    Запрос транзакции для страницы деталей: история загружается сразу, без ленивых запросов
+    
+    Строится при первом вызове, так как атрибут Transaction.history (backref)
+    появляется только после настройки мапперов.
+    """
+    configure_mappers()
+    return _SELECT_TRANSACTION_BY_ID.options(selectinload(Transaction.history))
+
+
+def _filter_user_transactions(query, user_id: int, status: Optional[TransactionStatus] = None, role: Optional[str] = None):
+    """
+    Применить к запросу фильтры по пользователю, роли и статусу
+    
+    Подходит как для ORM Query, так и для select().
+    
+    Args:
+        query: Исходный запрос
+        user_id: ID пользователя
+        status: Фильтр по статусу транзакций (опционально)
+        role: Роль пользователя (опционально)
+    Returns:
+        Запрос с фильтрами
+    """
+    query = query.filter(
+        or_(
+            Transaction.buyer_id == user_id,
+            Transaction.seller_id == user_id
+        )
+    )
+    if role == "buyer":
+        query = query.filter(Transaction.buyer_id == user_id)
+    elif role == "seller":
+        query = query.filter(Transaction.seller_id == user_id)
+    if status:
+        query = query.filter(Transaction.status == status)
+    
+    return query
+
 class TransactionService:
     """Сервис для работы с транзакциями и механизмом Escrow"""
 
@@ -446,7 +495,9 @@ class TransactionService:
         Returns:
             Транзакция или None, если не найдена
         """
-        return self.db.query(Transaction).filter(Transaction.id == transaction_id).first()
+        return self.db.execute(
+            _SELECT_TRANSACTION_BY_ID, {"transaction_id": transaction_id}
+        ).scalars().first()
     
     async def get_user_transactions(self, user_id: int, status: Optional[TransactionStatus] = None,skip: int = 0, limit: int = 10,role: Optional[str] = None) -> List[Transaction]:
         """
@@ -461,35 +512,13 @@ class TransactionService:
         Returns:
             Список транзакций
         """
-        query = self.db.query(Transaction).filter(
-            or_(
-                Transaction.buyer_id == user_id,
-                Transaction.seller_id == user_id
-            )
-        )
-        if role == "buyer":
-            query = query.filter(Transaction.buyer_id == user_id)
-        elif role == "seller":
-            query = query.filter(Transaction.seller_id == user_id)
-        if status:
-            query = query.filter(Transaction.status == status)
+        query = _filter_user_transactions(self.db.query(Transaction), user_id, status, role)
         
         return query.order_by(Transaction.created_at.desc()).offset(skip).limit(limit).all()
      
     async def count_user_transactions(self, user_id: int, status: Optional[TransactionStatus] = None,role: Optional[str] = None) -> int:
         """Подсчет количества транзакций пользователя"""
-        query = self.db.query(func.count(Transaction.id)).filter(
-            or_(
-                Transaction.buyer_id == user_id,
-                Transaction.seller_id == user_id
-            )
-        )
-        if role == "buyer":
-            query = query.filter(Transaction.buyer_id == user_id)
-        elif role == "seller":
-            query = query.filter(Transaction.seller_id == user_id)
-        if status:
-            query = query.filter(Transaction.status == status)
+        query = _filter_user_transactions(self.db.query(func.count(Transaction.id)), user_id, status, role)
         
         return query.scalar()
     
@@ -624,6 +653,114 @@ class TransactionService:
         return TransactionHistoryService(db)
 
 
+class TransactionReadService:
+    """
+    Сервис чтения транзакций через асинхронную сессию
+    
+    Используется эндпоинтами, которые только читают данные, чтобы запросы
+    к БД не блокировали event loop.
+    """
+    
+    def __init__(self, db: AsyncSession):
+        """
+        Инициализация сервиса
+        
+        Args:
+            db: Асинхронная сессия базы данных
+        """
+        self.db = db
+    
+    async def get_transaction(self, transaction_id: int) -> Optional[Transaction]:
+        """
+        Получить транзакцию по ID
+        
+        Args:
+            transaction_id: ID транзакции
+            
+        Returns:
+            Транзакция или None, если не найдена
+        """
+        result = await self.db.execute(_SELECT_TRANSACTION_BY_ID, {"transaction_id": transaction_id})
+        return result.scalars().first()
+    
+    async def get_transaction_for_details(self, transaction_id: int, with_history: bool = True) -> Optional[Transaction]:
+        """
+        Получить транзакцию по ID вместе с историей изменений
+        
+        История загружается через selectinload, поэтому обращение к
+        transaction.history не порождает дополнительных запросов.
+        
+        Args:
+            transaction_id: ID транзакции
+            with_history: Загружать ли историю (не нужно, если она уже есть в кэше)
+            
+        Returns:
+            Транзакция или None, если не найдена
+        """
+        query = _select_transaction_for_details() if with_history else _SELECT_TRANSACTION_BY_ID
+        result = await self.db.execute(query, {"transaction_id": transaction_id})
+        return result.scalars().first()
+    
+    async def count_user_transactions(self, user_id: int, status: Optional[TransactionStatus] = None, role: Optional[str] = None) -> int:
+        """Подсчет количества транзакций пользователя"""
+        query = _filter_user_transactions(select(func.count(Transaction.id)), user_id, status, role)
+        result = await self.db.execute(query)
+        return result.scalar()
+    
+    async def list_and_count_user_transactions(self, user_id: int, status: Optional[TransactionStatus] = None, skip: int = 0, limit: int = 10, role: Optional[str] = None) -> Tuple[List[Transaction], int]:
+        """
+        Получить страницу транзакций пользователя и их общее количество одним запросом
+        
+        Общее количество вычисляется оконной функцией COUNT(*) OVER () в том же
+        запросе, что и страница.
+        
+        Args:
+            user_id: ID пользователя
+            status: Фильтр по статусу транзакций (опционально)
+            skip: Количество транзакций для пропуска
+            limit: Количество транзакций для получения
+            role: Роль пользователя (опционально)
+        Returns:
+            Кортеж (список транзакций, общее количество)
+        """
+        query = _filter_user_transactions(
+            select(Transaction, func.count().over().label("total")), user_id, status, role
+        )
+        result = await self.db.execute(
+            query.order_by(Transaction.created_at.desc()).offset(skip).limit(limit)
+        )
+        rows = result.all()
+        
+        if not rows:
+            # Страница за пределами выборки: оконная функция не вернула строк
+            total = await self.count_user_transactions(user_id, status, role) if skip else 0
+            return [], total
+        
+        return [row.Transaction for row in rows], rows[0].total
+    
+    async def get_transaction_timeline(self, transaction_id: int) -> List[TransactionHistory]:
+        """Получение таймлайна для конкретной транзакции"""
+        result = await self.db.execute(
+            select(TransactionHistory)
+            .where(TransactionHistory.transaction_id == transaction_id)
+            .order_by(TransactionHistory.timestamp.asc())
+        )
+        return list(result.scalars().all())
+
+
+def get_transaction_read_service(db: AsyncSession) -> TransactionReadService:
+    """
+    Получить экземпляр сервиса чтения транзакций
+    
+    Args:
+        db: Асинхронная сессия базы данных
+        
+    Returns:
+        Экземпляр TransactionReadService
+    """
+    return TransactionReadService(db)
+
+
 def get_transaction_service(db: Session) -> TransactionService:
     """
     Получить экземпляр сервиса транзакций
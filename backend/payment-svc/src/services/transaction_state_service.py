@@ -5,6 +5,7 @@
 
 import logging
 from typing import Optional, List, Dict, Any
+from cachetools import TTLCache
 from sqlalchemy.orm import Session
 from datetime import datetime
 from sqlalchemy.orm.attributes import flag_modified
@@ -15,9 +16,13 @@ from ..schemas.transaction_history import TransactionHistoryCreate
 from .state_machine import TransactionStateMachine, TransactionStateMachineFactory, TransactionEvent, InvalidTransitionError
 from .event_service import EventType, EventPayload, get_event_service
 from .transaction_history_service import TransactionHistoryService
+from .transaction_cache import invalidate_transaction_cache
 
 logger = logging.getLogger(__name__)
 
+# Доступные действия по паре (ID транзакции, статус)
+_actions_cache: TTLCache = TTLCache(maxsize=10_000, ttl=30)
+
 class TransactionStateService:
     """Сервис для управления состояниями транзакций с использованием конечного автомата"""
     
@@ -32,7 +37,7 @@ class TransactionStateService:
         self.event_service = get_event_service()
         self.history_service = TransactionHistoryService(db)
     
-    def _record_state_change(self, 
+    async def _record_state_change(self, 
                              transaction_id: int, 
                              previous_status: TransactionStatus, 
                              new_status: TransactionStatus, 
@@ -41,7 +46,11 @@ class TransactionStateService:
                              reason: Optional[str] = None,
                              extra_data: Optional[Dict[str, Any]] = None) -> None:
         """
-        Записывает изменение статуса транзакции в историю
+        Записывает изменение статуса транзакции в историю и сбрасывает
+        закэшированные таймлайн и детали транзакции
+        
+        Вызывается после каждого успешного перехода, поэтому кэш сбрасывается
+        при любом источнике смены статуса (API, таймауты, обработчики сообщений).
         
         Args:
             transaction_id: ID транзакции
@@ -68,6 +77,9 @@ class TransactionStateService:
         except Exception as e:
             logger.error(f"Failed to record state change for transaction {transaction_id}: {str(e)}")
             # Не выбрасываем исключение, чтобы не блокировать основной процесс
+        
+        # Статус уже изменен, поэтому кэш сбрасывается даже при ошибке записи истории
+        await invalidate_transaction_cache(transaction_id)
     
     async def get_transaction_state_machine(self, transaction_id: int) -> TransactionStateMachine:
         """
@@ -87,6 +99,21 @@ class TransactionStateService:
         if not transaction:
             raise ValueError(f"Транзакция с ID {transaction_id} не найдена")
         
+        return self.get_state_machine_for(transaction)
+    
+    @staticmethod
+    def get_state_machine_for(transaction: Transaction) -> TransactionStateMachine:
+        """
+        Получение конечного автомата для уже загруженной транзакции
+        
+        Args:
+            transaction: Транзакция
+            
+        Returns:
+            Конечный автомат для транзакции
+        """
+        transaction_id = transaction.id
+        
         # Получаем или создаем конечный автомат
         state_machine = TransactionStateMachineFactory.get_state_machine(transaction_id, transaction.status)
         
@@ -248,7 +275,7 @@ class TransactionStateService:
             initiator_type = data.get("initiator_type", "user") if data else "system"
             reason = data.get("reason") if data else "Средства переведены в Escrow"
             
-            self._record_state_change(
+            await self._record_state_change(
                 transaction_id=transaction_id,
                 previous_status=previous_status,
                 new_status=new_state,
@@ -475,7 +502,7 @@ class TransactionStateService:
             initiator_type = data.get("initiator_type", "user") if data else "system"
             reason = data.get("reason") if data else "Транзакция успешно завершена"
             
-            self._record_state_change(
+            await self._record_state_change(
                 transaction_id=transaction_id,
                 previous_status=previous_status,
                 new_status=new_state,
@@ -648,7 +675,7 @@ class TransactionStateService:
             initiator_type = data.get("initiator_type", "user") if data else "system"
             reason = data.get("reason") if data else "Возврат средств покупателю"
             
-            self._record_state_change(
+            await self._record_state_change(
                 transaction_id=transaction_id,
                 previous_status=previous_status,
                 new_status=new_state,
@@ -717,7 +744,7 @@ class TransactionStateService:
             initiator_type = data.get("initiator_type", "user") if data else "system"
             reason = data.get("reason") if data else "Открыт спор по транзакции"
             
-            self._record_state_change(
+            await self._record_state_change(
                 transaction_id=transaction_id,
                 previous_status=previous_status,
                 new_status=new_state,
@@ -811,7 +838,7 @@ class TransactionStateService:
             initiator_type = "admin"
             reason = full_data.get("resolution", "Спор разрешен в пользу " + ("продавца" if in_favor_of_seller else "покупателя"))
             
-            self._record_state_change(
+            await self._record_state_change(
                 transaction_id=transaction_id,
                 previous_status=previous_status,
                 new_status=new_state,
@@ -886,7 +913,7 @@ class TransactionStateService:
                 initiator_type = data.get("initiator_type", "user") if data else "system"
                 reason = data.get("reason") if data else "Транзакция отменена"
                 
-                self._record_state_change(
+                await self._record_state_change(
                     transaction_id=transaction_id,
                     previous_status=previous_status,
                     new_status=new_state,
@@ -924,10 +951,32 @@ class TransactionStateService:
         # Получаем конечный автомат
         state_machine = await self.get_transaction_state_machine(transaction_id)
         
-        # Получаем доступные события
-        available_events = state_machine.get_available_events()
+        return self._events_to_actions(state_machine.get_available_events())
+    
+    @classmethod
+    def get_actions_for_transaction(cls, transaction: Transaction) -> List[str]:
+        """
+        Получение списка доступных действий для уже загруженной транзакции
         
-        # Преобразуем события в действия для пользовательского интерфейса
+        Не обращается к базе данных. Результат кэшируется по паре (ID, статус):
+        при смене статуса меняется ключ, поэтому явная инвалидация не нужна.
+        
+        Args:
+            transaction: Транзакция
+            
+        Returns:
+            Список доступных действий
+        """
+        key = (transaction.id, transaction.status)
+        actions = _actions_cache.get(key)
+        if actions is None:
+            state_machine = cls.get_state_machine_for(transaction)
+            actions = _actions_cache[key] = tuple(cls._events_to_actions(state_machine.get_available_events()))
+        return list(actions)
+    
+    @staticmethod
+    def _events_to_actions(available_events: List[TransactionEvent]) -> List[str]:
+        """Преобразование событий конечного автомата в действия для пользовательского интерфейса"""
         action_map = {
             TransactionEvent.PROCESS_PAYMENT: "process_payment",
             TransactionEvent.RELEASE_FROM_ESCROW: "complete",
@@ -10,6 +10,8 @@ from datetime import datetime
 from ..models.core import User
 from ..database.connection import get_db
 from .rabbitmq_service import get_rabbitmq_service
+from .auth_service import invalidate_user_cache
+from ..cache.token_cache import get_token_cache
 
 logger = logging.getLogger(__name__)
 
@@ -119,6 +121,9 @@ class UserConsumerService:
                 logger.error("Invalid user_updated message format")
                 return
             
+            invalidate_user_cache(user_data["id"])
+            await get_token_cache().invalidate_user(user_data["id"])
+            
             # Получаем сессию БД
             db = next(get_db())
             
@@ -168,6 +173,9 @@ class UserConsumerService:
                     logger.error("Invalid user_deleted message format")
                     return
             
+            invalidate_user_cache(user_id)
+            await get_token_cache().invalidate_user(user_id)
+            
             # Получаем сессию БД
             db = next(get_db())
             
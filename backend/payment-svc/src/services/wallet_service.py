@@ -4,15 +4,17 @@
 
 from decimal import Decimal
 import logging
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Dict, List, Optional, Tuple, Any, Union
 from fastapi import HTTPException, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, or_, desc, update
+from sqlalchemy.orm import Session, load_only
+from sqlalchemy import func, and_, or_, desc, update, select
+from sqlalchemy.ext.asyncio import async_sessionmaker
 import uuid  # Добавляем импорт uuid для генерации идентификаторов
 import random  # Добавляем импорт random для генерации случайных чисел
 
 
+from ..database.connection import AsyncSessionLocal
 from ..models.wallet import Wallet, WalletTransaction, Currency, WalletStatus
 from ..models.transaction import Transaction, TransactionStatus, TransactionType
 from ..schemas.wallet import (
@@ -26,6 +28,13 @@ from ..dependencies.auth import get_token
 
 logger = logging.getLogger(__name__)
 
+# Колонки транзакции, из которых строится WithdrawalResponse в списках выводов
+WITHDRAWAL_LIST_COLUMNS = (
+    Transaction.id, Transaction.status, Transaction.currency, Transaction.amount,
+    Transaction.created_at, Transaction.updated_at, Transaction.completed_at,
+    Transaction.extra_data, Transaction.wallet_id,
+)
+
 class WalletService:
     """
     Сервис для управления кошельками пользователей и транзакциями
@@ -77,11 +86,8 @@ class WalletService:
         # Инициализация балансов
         initial_balances = {}
         if wallet_data.initial_balances:
-            # Преобразуем Enum ключи в строки для хранения в JSON
-            initial_balances = {
-                currency.value: amount 
-                for currency, amount in wallet_data.initial_balances.items()
-            }
+            # В JSON сохраняются только явно переданные валюты
+            initial_balances = wallet_data.initial_balances.model_dump(exclude_unset=True)
         
         # Инициализация лимитов
         limits = None
@@ -139,50 +145,14 @@ class WalletService:
         Returns:
             Объект кошелька
         """
-        wallet = self.db.query(Wallet).filter(Wallet.id == wallet_id).first()
+        # Session.get берет уже загруженный в сессии кошелек без повторного запроса к БД
+        wallet = self.db.get(Wallet, wallet_id)
         
         if not wallet:
             raise HTTPException(status_code=404, detail=f"Кошелек с ID {wallet_id} не найден")
         
         return wallet
     
-    async def get_wallet_by_uid(self, wallet_uid: str) -> Wallet:
-        """
-        Получает кошелек по UID
-        
-        Args:
-            wallet_uid: UID кошелька
-            
-        Returns:
-            Объект кошелька
-        """
-        wallet = self.db.query(Wallet).filter(Wallet.wallet_uid == wallet_uid).first()
-        
-        if not wallet:
-            raise HTTPException(status_code=404, detail=f"Кошелек с UID {wallet_uid} не найден")
-        
-        return wallet
-    
-    async def get_user_wallet(self, user_id: int) -> Wallet:
-        """
-        Получает кошелек пользователя
-        
-        Args:
-            user_id: ID пользователя
-            
-        Returns:
-            Объект кошелька
-        """
-        wallet = self.db.query(Wallet).filter(
-            Wallet.user_id == user_id
-        ).first()
-        
-        if not wallet:
-            raise HTTPException(status_code=404, 
-                              detail=f"Кошелек для пользователя с ID {user_id} не найден")
-        
-        return wallet
-    
     async def update_wallet(self, wallet_id: int, wallet_data: WalletUpdate) -> Wallet:
         """
         Обновляет кошелек
@@ -276,6 +246,39 @@ class WalletService:
         
         return wallet.balances
     
+    async def get_wallet_with_balances(self, wallet_id: int, user_id: Optional[int] = None) -> Any:
+        """
+        Получает кошелек с балансами и отмечает время последней активности
+        
+        Выполняется одним запросом UPDATE ... RETURNING: отдельная выборка
+        кошелька для проверки владельца и повторная загрузка после фиксации
+        не нужны. Дополнительный запрос выполняется только при отказе, чтобы
+        отличить отсутствующий кошелек от чужого.
+        
+        Args:
+            wallet_id: ID кошелька
+            user_id: ID владельца, которым ограничен доступ (None - без ограничения)
+            
+        Returns:
+            Строка с полями id, wallet_uid, balances, created_at, updated_at
+        """
+        stmt = update(Wallet).where(Wallet.id == wallet_id)
+        if user_id is not None:
+            stmt = stmt.where(Wallet.user_id == user_id)
+        
+        row = self.db.execute(
+            stmt.values(last_activity_at=func.now())
+            .returning(Wallet.id, Wallet.wallet_uid, Wallet.balances, Wallet.created_at, Wallet.updated_at)
+            .execution_options(synchronize_session=False)
+        ).one_or_none()
+        
+        if row is None:
+            await self.get_wallet(wallet_id)
+            raise HTTPException(status_code=403, detail="Недостаточно прав для доступа к этому кошельку")
+        
+        self.db.commit()
+        return row
+    
     async def create_wallet_transaction(self, tx_data: WalletTransactionCreate) -> WalletTransaction:
         """
         Создает новую транзакцию кошелька
@@ -365,41 +368,6 @@ class WalletService:
         
         return transaction
     
-    async def get_wallet_transactions(self, wallet_id: int, 
-                                    page: int = 1, page_size: int = 20,
-                                    currency: Optional[Currency] = None) -> Tuple[List[WalletTransaction], int]:
-        """
-        Получает историю транзакций кошелька с пагинацией
-        
-        Args:
-            wallet_id: ID кошелька
-            page: Номер страницы
-            page_size: Размер страницы
-            currency: Фильтр по валюте
-            
-        Returns:
-            Кортеж (список транзакций, общее количество)
-        """
-        # Проверяем, что кошелек существует
-        await self.get_wallet(wallet_id)
-        
-        query = self.db.query(WalletTransaction).filter(WalletTransaction.wallet_id == wallet_id)
-        
-        # Применяем фильтр по валюте, если указан
-        if currency:
-            query = query.filter(WalletTransaction.currency == currency)
-        
-        # Получаем общее количество записей
-        total = query.count()
-        
-        # Применяем пагинацию и сортировку
-        transactions = query.order_by(desc(WalletTransaction.created_at))\
-            .offset((page - 1) * page_size)\
-            .limit(page_size)\
-            .all()
-        
-        return transactions, total
-    
     async def convert_currency(self, wallet_id: int, conversion_data: CurrencyConversionRequest) -> Tuple[WalletTransaction, WalletTransaction]:
         """
         Конвертирует валюту внутри кошелька
@@ -733,7 +701,7 @@ class WalletService:
                 "provider": "stripe",
                 "user_id": wallet.user_id,
                 "withdrawal_method": withdrawal_data.withdrawal_method,
-                "recipient_details": withdrawal_data.recipient_details,
+                "recipient_details": withdrawal_data.recipient.model_dump(exclude={"method"}),
                 "verification_id": str(uuid.uuid4()),  # Генерируем ID для верификации
                 "request_ip": withdrawal_data.request_ip
             }
@@ -758,7 +726,8 @@ class WalletService:
             "amount": transaction.amount,
             "currency": transaction.currency.value,
             "verification_required": True,
-            "verification_id": transaction.extra_data["verification_id"]
+            "verification_id": transaction.extra_data["verification_id"],
+            "created_at": transaction.created_at
         }
     
     def _generate_verification_code(self) -> str:
@@ -964,7 +933,7 @@ class WalletService:
         # Меняем статус на "Отменена"
         transaction.status = TransactionStatus.CANCELED
         transaction.updated_at = func.now()
-        transaction.extra_data["canceled_at"] = datetime.now().isoformat()
+        transaction.extra_data["canceled_at"] = datetime.now(timezone.utc).isoformat()
         
         self.db.commit()
         self.db.refresh(transaction)
@@ -973,77 +942,10 @@ class WalletService:
             "transaction_id": transaction.id,
             "status": transaction.status.value,
             "amount": transaction.amount,
-            "currency": transaction.currency.value
+            "currency": transaction.currency.value,
+            "updated_at": transaction.updated_at
         }
     
-    async def get_withdrawal_requests(self, user_id: int, 
-                                    page: int = 1, page_size: int = 20,
-                                    status: Optional[TransactionStatus] = None) -> Tuple[List[Transaction], int]:
-        """
-        Получает историю запросов на вывод средств пользователя с пагинацией
-        
-        Args:
-            user_id: ID пользователя
-            page: Номер страницы
-            page_size: Размер страницы
-            status: Фильтр по статусу
-            
-        Returns:
-            Кортеж (список транзакций, общее количество)
-        """
-        query = self.db.query(Transaction).filter(
-            Transaction.user_id == user_id,
-            Transaction.type == TransactionType.WITHDRAWAL
-        )
-        
-        # Применяем фильтр по статусу, если указан
-        if status:
-            query = query.filter(Transaction.status == status)
-        
-        # Получаем общее количество записей
-        total = query.count()
-        
-        # Применяем пагинацию и сортировку
-        transactions = query.order_by(desc(Transaction.created_at))\
-            .offset((page - 1) * page_size)\
-            .limit(page_size)\
-            .all()
-        
-        return transactions, total
-    
-    async def get_admin_withdrawal_requests(self, 
-                                        page: int = 1, page_size: int = 20,
-                                        status: Optional[TransactionStatus] = None) -> Tuple[List[Transaction], int]:
-        """
-        Получает историю запросов на вывод средств для администраторов с пагинацией
-        
-        Args:
-            page: Номер страницы
-            page_size: Размер страницы
-            status: Фильтр по статусу
-            
-        Returns:
-            Кортеж (список транзакций, общее количество)
-        """
-        query = self.db.query(Transaction).filter(
-            Transaction.type == TransactionType.WITHDRAWAL
-        )
-        
-        # Применяем фильтр по статусу, если указан
-        if status:
-            query = query.filter(Transaction.status == status)
-        
-        # Получаем общее количество записей
-        total = query.count()
-        
-        # Применяем пагинацию и сортировку
-        transactions = query.order_by(desc(Transaction.created_at))\
-            .offset((page - 1) * page_size)\
-            .limit(page_size)\
-            .all()
-        
-        return transactions, total
-        
     async def admin_approve_withdrawal(self, transaction_id: int) -> Dict[str, Any]:
         """
         Подтверждает запрос на вывод средств администратором
@@ -1101,49 +1003,205 @@ class WalletService:
         
         return transaction
 
+
+
+
+
+def get_wallet_service(db: Session) -> WalletService:
+    """
+    Фабричная функция для получения экземпляра сервиса кошельков
     
-    async def get_wallets(self, page: int = 1, size: int = 20, user_id: Optional[int] = None, status: Optional[WalletStatus] = None) -> Tuple[List[Wallet], int]:
+    Args:
+        db: Сессия базы данных
+        
+    Returns:
+        Экземпляр сервиса кошельков
+    """
+    return WalletService(db) 
+
+
+def _filter_wallets(statement, user_id: Optional[int] = None, status: Optional[WalletStatus] = None):
+    """Применение фильтров по пользователю и статусу к запросу кошельков"""
+    if user_id:
+        statement = statement.where(Wallet.user_id == user_id)
+    if status:
+        statement = statement.where(Wallet.status == status.value)
+    return statement
+
+
+def _filter_wallet_transactions(statement, wallet_id: int, currency: Optional[Currency] = None):
+    """Применение фильтров по кошельку и валюте к запросу транзакций кошелька"""
+    statement = statement.where(WalletTransaction.wallet_id == wallet_id)
+    if currency:
+        statement = statement.where(WalletTransaction.currency == currency)
+    return statement
+
+
+def _filter_withdrawals(statement, user_id: Optional[int] = None, status: Optional[TransactionStatus] = None):
+    """
+    Применение фильтров к запросу выводов средств
+    
+    Владелец вывода определяется по кошельку, с которого он выполняется.
+    """
+    statement = statement.where(Transaction.type == TransactionType.WITHDRAWAL)
+    if user_id is not None:
+        statement = statement.join(Wallet, Transaction.wallet_id == Wallet.id).where(Wallet.user_id == user_id)
+    if status:
+        statement = statement.where(Transaction.status == status)
+    return statement
+
+
+class WalletReadService:
+    """
+    Сервис чтения кошельков, их транзакций и выводов через asyncpg
+    
+    Запросы не блокируют event loop. Каждый запрос выполняется в собственной
+    асинхронной сессии, поэтому страница и общее количество запрашиваются
+    параллельно через asyncio.gather. Операции, изменяющие кошелек,
+    остаются в WalletService.
+    """
+    
+    def __init__(self, sessions: async_sessionmaker):
         """
-        Получает список кошельков с пагинацией и фильтрацией
+        Инициализация сервиса
         
         Args:
-            page: Номер страницы
-            size: Размер страницы
-            user_id: ID пользователя
-            status: Статус кошелька
-
+            sessions: Фабрика асинхронных сессий
+        """
+        self.sessions = sessions
+    
+    async def _scalars(self, statement) -> List[Any]:
+        """Выполнить запрос в отдельной сессии и вернуть список объектов"""
+        async with self.sessions() as db:
+            result = await db.scalars(statement)
+            return list(result)
+    
+    async def _scalar(self, statement) -> Any:
+        """Выполнить запрос в отдельной сессии и вернуть одно значение"""
+        async with self.sessions() as db:
+            return await db.scalar(statement)
+    
+    async def get_wallet(self, wallet_id: int) -> Wallet:
+        """
+        Получает кошелек по ID
+        
+        Args:
+            wallet_id: ID кошелька
+            
         Returns:
-            Кортеж (список кошельков, общее количество)
+            Объект кошелька
         """
-        query = self.db.query(Wallet)
+        async with self.sessions() as db:
+            wallet = await db.get(Wallet, wallet_id)
         
-        if user_id:
-            query = query.filter(Wallet.user_id == user_id)
+        if not wallet:
+            raise HTTPException(status_code=404, detail=f"Кошелек с ID {wallet_id} не найден")
         
-        if status:
-            query = query.filter(Wallet.status == status.value)
+        return wallet
+    
+    async def get_wallet_owner_id(self, wallet_id: int) -> int:
+        """
+        Получает ID владельца кошелька без загрузки остальных полей
         
-        total = query.count()
+        Args:
+            wallet_id: ID кошелька
+            
+        Returns:
+            ID пользователя-владельца
+        """
+        user_id = await self._scalar(select(Wallet.user_id).where(Wallet.id == wallet_id))
         
-        # Получаем кошельки и явно преобразуем в список
-        wallets = list(query.order_by(desc(Wallet.created_at))\
-            .offset((page - 1) * size)\
-            .limit(size)\
-            .all())
+        if user_id is None:
+            raise HTTPException(status_code=404, detail=f"Кошелек с ID {wallet_id} не найден")
         
-        return wallets, total
-
-
+        return user_id
+    
+    async def get_wallet_by_uid(self, wallet_uid: str) -> Wallet:
+        """
+        Получает кошелек по UID
+        
+        Args:
+            wallet_uid: UID кошелька
+            
+        Returns:
+            Объект кошелька
+        """
+        wallet = await self._scalar(select(Wallet).where(Wallet.wallet_uid == wallet_uid).limit(1))
+        
+        if not wallet:
+            raise HTTPException(status_code=404, detail=f"Кошелек с UID {wallet_uid} не найден")
+        
+        return wallet
+    
+    async def get_user_wallet(self, user_id: int) -> Wallet:
+        """
+        Получает кошелек пользователя
+        
+        Args:
+            user_id: ID пользователя
+            
+        Returns:
+            Объект кошелька
+        """
+        wallet = await self._scalar(select(Wallet).where(Wallet.user_id == user_id).limit(1))
+        
+        if not wallet:
+            raise HTTPException(status_code=404, 
+                              detail=f"Кошелек для пользователя с ID {user_id} не найден")
+        
+        return wallet
+    
+    async def list_wallets(self, page: int, size: int, user_id: Optional[int] = None,
+                           status: Optional[WalletStatus] = None) -> List[Wallet]:
+        """Страница кошельков (новые сверху)"""
+        statement = _filter_wallets(select(Wallet), user_id, status)
+        return await self._scalars(
+            statement.order_by(desc(Wallet.created_at)).offset((page - 1) * size).limit(size)
+        )
+    
+    async def count_wallets(self, user_id: Optional[int] = None, status: Optional[WalletStatus] = None) -> int:
+        """Общее количество кошельков по фильтрам"""
+        return await self._scalar(_filter_wallets(select(func.count(Wallet.id)), user_id, status))
+    
+    async def list_wallet_transactions(self, wallet_id: int, page: int, page_size: int,
+                                       currency: Optional[Currency] = None) -> List[WalletTransaction]:
+        """Страница транзакций кошелька (новые сверху)"""
+        statement = _filter_wallet_transactions(select(WalletTransaction), wallet_id, currency)
+        return await self._scalars(
+            statement.order_by(desc(WalletTransaction.created_at)).offset((page - 1) * page_size).limit(page_size)
+        )
+    
+    async def count_wallet_transactions(self, wallet_id: int, currency: Optional[Currency] = None) -> int:
+        """Общее количество транзакций кошелька"""
+        return await self._scalar(
+            _filter_wallet_transactions(select(func.count(WalletTransaction.id)), wallet_id, currency)
+        )
+    
+    async def list_withdrawals(self, page: int, page_size: int, user_id: Optional[int] = None,
+                               status: Optional[TransactionStatus] = None) -> List[Transaction]:
+        """
+        Страница выводов средств (новые сверху)
+        
+        Загружаются только колонки, нужные для WithdrawalResponse.
+        """
+        statement = _filter_withdrawals(select(Transaction), user_id, status)
+        return await self._scalars(
+            statement.options(load_only(*WITHDRAWAL_LIST_COLUMNS))
+            .order_by(desc(Transaction.created_at))
+            .offset((page - 1) * page_size)
+            .limit(page_size)
+        )
+    
+    async def count_withdrawals(self, user_id: Optional[int] = None, status: Optional[TransactionStatus] = None) -> int:
+        """Общее количество выводов средств (без подзапроса, COUNT по ID)"""
+        return await self._scalar(_filter_withdrawals(select(func.count(Transaction.id)), user_id, status))
 
 
-def get_wallet_service(db: Session) -> WalletService:
+def get_wallet_read_service() -> WalletReadService:
     """
-    Фабричная функция для получения экземпляра сервиса кошельков
+    Получение экземпляра сервиса чтения кошельков
     
-    Args:
-        db: Сессия базы данных
-        
     Returns:
-        Экземпляр сервиса кошельков
+        Экземпляр WalletReadService
     """
-    return WalletService(db) 
\ No newline at end of file
+    return WalletReadService(AsyncSessionLocal)